@@ -0,0 +1 @@
+"""Workaround for pylint to recognize directory."""
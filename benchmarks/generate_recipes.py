@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Generate a deterministic synthetic game to benchmark the calculator with."""
+
+import argparse
+import logging
+import random
+from pathlib import Path
+from typing import Any, Dict, List
+
+# 3rd party
+from yaml import safe_dump
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse given command line arguments."""
+    parser = argparse.ArgumentParser(
+        allow_abbrev=False, formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("game", help="name of the game folder to create")
+    parser.add_argument(
+        "--output", type=Path, default=Path("recipes"), help="recipes folder"
+    )
+    parser.add_argument("--items", type=int, default=1000, help="number of items")
+    parser.add_argument("--depth", type=int, default=4, help="crafting levels")
+    parser.add_argument("--fan-out", type=int, default=3, help="child items per recipe")
+    parser.add_argument(
+        "--shared-ratio",
+        type=float,
+        default=0.3,
+        help="share of child items picked from a small pool of common items",
+    )
+    parser.add_argument("--sources", type=int, default=8, help="number of recipe files")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    return parser.parse_args()
+
+
+def generate_recipes(
+    items: int = 1000,
+    depth: int = 4,
+    fan_out: int = 3,
+    shared_ratio: float = 0.3,
+    sources: int = 8,
+    seed: int = 1,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Generate recipes grouped by source, the same arguments give the same recipes.
+
+    A third of the items are base items, the rest are spread evenly over the
+    crafting levels. Child items always come from a lower level, so the
+    recipes never contain a cycle.
+
+    Args:
+        items (int): Total number of items.
+        depth (int): Number of crafting levels above the base items.
+        fan_out (int): Number of child items per recipe.
+        shared_ratio (float): Share of child items picked from common items.
+        sources (int): Number of sources, one recipe file each.
+        seed (int): Seed of the random number generator.
+
+    Returns:
+        dict: List of recipes for each source.
+    """
+    generator = random.Random(seed)
+    base_count = max(fan_out, items // 3)
+    per_level = max(1, (items - base_count) // max(depth, 1))
+
+    levels: List[List[str]] = [[f"Base {number}" for number in range(base_count)]]
+    for level in range(1, depth + 1):
+        levels.append([f"Item {level}-{number}" for number in range(per_level)])
+    common = levels[0][: max(fan_out, base_count // 20)]
+
+    recipes: Dict[str, List[Dict[str, Any]]] = {}
+    for number, item_name in enumerate(levels[0]):
+        recipe: Dict[str, Any] = {"name": item_name, "source": "gathering"}
+        if number % 5 == 0:
+            recipe["buy_from_vendor"] = generator.randint(1, 50)
+        recipes.setdefault("gathering", []).append(recipe)
+
+    for level in range(1, depth + 1):
+        lower = [item for lower in levels[:level] for item in lower]
+        for item_name in levels[level]:
+            children: Dict[str, int] = {}
+            while len(children) < min(fan_out, len(lower)):
+                if generator.random() < shared_ratio:
+                    child_name = generator.choice(common)
+                else:
+                    child_name = generator.choice(lower)
+                children[child_name] = generator.randint(1, 5)
+
+            source = f"profession-{generator.randrange(sources)}"
+            recipe = {
+                "name": item_name,
+                "source": source,
+                "crafting_cost": generator.randint(1, 100) * level,
+                "items": children,
+            }
+            if generator.random() < 0.2:
+                recipe["sell_to_vendor"] = generator.randint(100, 5000) * level
+            if generator.random() < 0.1:
+                recipe["buy_from_vendor"] = generator.randint(100, 5000) * level
+            recipes.setdefault(source, []).append(recipe)
+
+    return recipes
+
+
+def write_game(
+    path: Path, recipes: Dict[str, List[Dict[str, Any]]], title: str
+) -> None:
+    """Write recipes as one YAML file per source, plus the meta.yml of the game."""
+    path.mkdir(parents=True, exist_ok=True)
+    meta = {"title": title, "developer": "Synthetic", "recipe_version": 1}
+    (path / "meta.yml").write_text("---\n" + safe_dump(meta, sort_keys=False))
+    for source, source_recipes in recipes.items():
+        content = safe_dump(source_recipes, sort_keys=False, width=120)
+        (path / f"{source}.yml").write_text("---\n" + content)
+    logging.info("Wrote %s recipes to %s.", sum(map(len, recipes.values())), path)
+
+
+def main() -> None:
+    """Generate a synthetic game into the recipes folder."""
+    options = parse_arguments()
+    logging.basicConfig(format="%(levelname)s: %(message)s", level=logging.INFO)
+    recipes = generate_recipes(
+        options.items,
+        options.depth,
+        options.fan_out,
+        options.shared_ratio,
+        options.sources,
+        options.seed,
+    )
+    write_game(options.output / options.game, recipes, f"Synthetic {options.game}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""Replay a mix of requests against a locally started recipe server."""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from urllib.parse import quote
+
+# internal
+from benchmarks.run_benchmarks import (
+    REAL_GAMES,
+    REPOSITORY,
+    QuietRequestHandler,
+    working_directory,
+)
+from crafting_calculator import load_recipe_graph
+
+DEFAULT_MIX = "discover_games=1,discover_specialisations=1,filter_recipes=2,calculate=4"
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse given command line arguments."""
+    parser = argparse.ArgumentParser(
+        allow_abbrev=False, formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "--games", nargs="*", default=REAL_GAMES, help="games from recipes/"
+    )
+    parser.add_argument(
+        "--mix", default=DEFAULT_MIX, help="weight of each route as route=weight"
+    )
+    parser.add_argument("--requests", type=int, default=500, help="total requests")
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="requests in flight at once"
+    )
+    parser.add_argument("--warmup", type=int, default=10, help="untimed requests")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    parser.add_argument(
+        "--threaded",
+        action="store_true",
+        help="serve every request in its own thread",
+    )
+    parser.add_argument("--max-p95", type=float, help="fail above this p95 in ms")
+    parser.add_argument(
+        "--min-rps", type=float, help="fail below this many requests per second"
+    )
+    parser.add_argument("--output", type=Path, help="save the results as JSON")
+    parser.add_argument(
+        "--compare", type=Path, help="compare against previously saved results"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="allowed change before --compare reports a regression",
+    )
+    return parser.parse_args()
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parse route=weight pairs separated by commas."""
+    weights = {}
+    for pair in mix.split(","):
+        route, _, weight = pair.partition("=")
+        weights[route.strip()] = float(weight or 1)
+    return weights
+
+
+def plan_requests(
+    games: List[str], weights: Dict[str, float], count: int, seed: int
+) -> List[Tuple[str, str]]:
+    """Return a reproducible list of (route, path) pairs to request."""
+    generator = random.Random(seed)
+    craftable = {}
+    specialisations = {}
+    for game in games:
+        graph = load_recipe_graph(game)
+        craftable[game] = [name for name in graph.names if graph.is_craftable(name)]
+        specialisations[game] = ["- None -"] + sorted(
+            entry.stem
+            for entry in Path(f"recipes/{game}").rglob("*.yml")
+            if entry.stem != "meta"
+        )
+
+    routes = list(weights)
+    planned = []
+    for route in generator.choices(routes, [weights[r] for r in routes], k=count):
+        game = generator.choice(games)
+        if route == "discover_games":
+            path = "/discover_games"
+        elif route == "discover_specialisations":
+            path = f"/discover_specialisations?game={quote(game)}"
+        elif route == "filter_recipes":
+            specialisation = generator.choice(specialisations[game])
+            path = f"/filter_recipes/{quote(game)}/{quote(specialisation)}"
+        elif route == "calculate":
+            item = generator.choice(craftable[game])
+            amount = generator.randint(1, 10)
+            path = f"/calculate?game={quote(game)}&item={quote(item)}&amount={amount}"
+        else:
+            raise ValueError(f"Unknown route {route}.")
+        planned.append((route, path))
+    return planned
+
+
+async def fetch(port: int, path: str) -> int:
+    """Send one GET request and return the status code."""
+    reader, writer = await asyncio.open_connection("localhost", port)
+    writer.write(
+        f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode()
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    await writer.wait_closed()
+    return int(response.split(b" ", 2)[1])
+
+
+async def replay(
+    port: int, planned: List[Tuple[str, str]], concurrency: int
+) -> Tuple[Dict[str, List[float]], int, float]:
+    """Replay all requests and return latencies per route, errors and duration."""
+    latencies: Dict[str, List[float]] = {}
+    errors = 0
+    pending = iter(planned)
+
+    async def worker() -> None:
+        nonlocal errors
+        for route, path in pending:
+            start = time.perf_counter()
+            try:
+                status = await fetch(port, path)
+            except (OSError, ValueError, IndexError):
+                status = 0
+            latencies.setdefault(route, []).append(time.perf_counter() - start)
+            if not 200 <= status < 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def percentile(values: List[float], share: float) -> float:
+    """Return the nearest-rank percentile of the values."""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(share * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def summarise(values: List[float]) -> Dict[str, float]:
+    """Return the request count and latency percentiles in milliseconds."""
+    return {
+        "requests": len(values),
+        "p50_ms": percentile(values, 0.50) * 1000,
+        "p95_ms": percentile(values, 0.95) * 1000,
+        "p99_ms": percentile(values, 0.99) * 1000,
+    }
+
+
+def run_load_test(options: argparse.Namespace) -> Dict[str, Any]:
+    """Start a server on an ephemeral port and replay the planned requests."""
+    server_class = socketserver.TCPServer
+    if options.threaded:
+        server_class = socketserver.ThreadingTCPServer
+    httpd = server_class(("localhost", 0), QuietRequestHandler)
+    port = httpd.server_address[1]
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    try:
+        planned = plan_requests(
+            options.games,
+            parse_mix(options.mix),
+            options.warmup + options.requests,
+            options.seed,
+        )
+        asyncio.run(replay(port, planned[: options.warmup], options.concurrency))
+        latencies, errors, duration = asyncio.run(
+            replay(port, planned[options.warmup :], options.concurrency)
+        )
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+    every = [latency for values in latencies.values() for latency in values]
+    return {
+        "requests_per_second": len(every) / duration,
+        "errors": errors,
+        "concurrency": options.concurrency,
+        "threaded": options.threaded,
+        "overall": summarise(every),
+        "routes": {route: summarise(values) for route, values in latencies.items()},
+    }
+
+
+def check_results(results: Dict[str, Any], options: argparse.Namespace) -> List[str]:
+    """Return a message for every threshold the results do not meet."""
+    failures = []
+    if results["errors"]:
+        failures.append(f"{results['errors']} requests failed")
+    if options.max_p95 and results["overall"]["p95_ms"] > options.max_p95:
+        failures.append(f"p95 {results['overall']['p95_ms']:.2f} ms")
+    if options.min_rps and results["requests_per_second"] < options.min_rps:
+        failures.append(f"{results['requests_per_second']:.1f} requests/s")
+    if options.compare:
+        previous = json.loads(options.compare.read_text())
+        allowed = 1 + options.threshold
+        if results["requests_per_second"] * allowed < previous["requests_per_second"]:
+            failures.append(
+                f"requests/s {previous['requests_per_second']:.1f} -> "
+                f"{results['requests_per_second']:.1f}"
+            )
+        for route, summary in results["routes"].items():
+            before = previous.get("routes", {}).get(route)
+            if before and summary["p95_ms"] > before["p95_ms"] * allowed:
+                failures.append(
+                    f"{route} p95 {before['p95_ms']:.2f} ms -> "
+                    f"{summary['p95_ms']:.2f} ms"
+                )
+    return failures
+
+
+def format_results(results: Dict[str, Any]) -> str:
+    """Format load test results for printing to stdout."""
+    lines = [
+        f"requests/s: {results['requests_per_second']:.1f}, "
+        f"errors: {results['errors']}"
+    ]
+    summaries = {"overall": results["overall"], **results["routes"]}
+    for route, summary in summaries.items():
+        lines.append(
+            f"{route}: requests: {summary['requests']}, "
+            f"p50: {summary['p50_ms']:.2f} ms, p95: {summary['p95_ms']:.2f} ms, "
+            f"p99: {summary['p99_ms']:.2f} ms"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    """Run the load test, then save and check the results."""
+    options = parse_arguments()
+    logging.basicConfig(format="%(levelname)s: %(message)s", level=logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as directory:
+        root = Path(directory)
+        for game in options.games:
+            shutil.copytree(REPOSITORY / "recipes" / game, root / "recipes" / game)
+        with working_directory(root):
+            results = run_load_test(options)
+
+    print(format_results(results))
+    if options.output:
+        options.output.parent.mkdir(parents=True, exist_ok=True)
+        options.output.write_text(json.dumps(results, indent=4, sort_keys=True))
+
+    failures = check_results(results, options)
+    for failure in failures:
+        logging.error("Regression %s", failure)
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
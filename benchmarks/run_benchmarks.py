@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""Benchmark loading, expanding and serving recipes for real and synthetic games."""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
+
+# internal
+from benchmarks.generate_recipes import generate_recipes, write_game
+from crafting import serializer
+from crafting.graph import RecipeGraph
+from crafting.matrix import export_matrix
+from crafting.shoppinglist import ShoppingList
+from crafting_calculator import craft_items, load_recipes, process_inventory
+from crafting_calculator_gui_html_server import MyRequestHandler
+
+REPOSITORY = Path(__file__).resolve().parent.parent
+REAL_GAMES = ["corepunk", "swchronicles", "yonder"]
+SAMPLE_SIZE = 25
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse given command line arguments."""
+    parser = argparse.ArgumentParser(
+        allow_abbrev=False, formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "--games", nargs="*", default=REAL_GAMES, help="games from recipes/"
+    )
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        action="append",
+        default=[],
+        metavar="ITEMS",
+        help="also benchmark a synthetic game with this many items, can be repeated",
+    )
+    parser.add_argument("--depth", type=int, default=4, help="synthetic levels")
+    parser.add_argument("--fan-out", type=int, default=3, help="synthetic fan-out")
+    parser.add_argument(
+        "--shared-ratio", type=float, default=0.3, help="synthetic shared ratio"
+    )
+    parser.add_argument("--seed", type=int, default=1, help="synthetic seed")
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="keep the best of this many runs"
+    )
+    parser.add_argument(
+        "--no-http", action="store_true", help="skip the HTTP handler stages"
+    )
+    parser.add_argument("--output", type=Path, help="save the results as JSON")
+    parser.add_argument(
+        "--compare", type=Path, help="compare against previously saved results"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="allowed slowdown before --compare reports a regression",
+    )
+    return parser.parse_args()
+
+
+@contextlib.contextmanager
+def working_directory(path: Path) -> Iterator[None]:
+    """Temporarily change the working directory, recipes are found relative to it."""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def best_time(function: Callable[[], Any], repeat: int, setup=None) -> float:
+    """Return the fastest of several runs in seconds, setup is not timed."""
+    timings = []
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            function(argument) if setup else function()
+            timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def peak_memory(function: Callable[[], Any]) -> int:
+    """Return the peak memory allocated by Python while running a function."""
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def root_items(graph: RecipeGraph) -> List[str]:
+    """Return the craftable items that are not used by any other recipe."""
+    used = {child for edges in graph.children for child, _ in edges}
+    return [
+        graph.names[node]
+        for node in range(len(graph))
+        if graph.children[node] and node not in used
+    ]
+
+
+def simplify_items(inventory: Dict[str, Dict], item_names: List[str]) -> None:
+    """Expand items one at a time the way the desktop GUI does."""
+    for item_name in item_names:
+        shopping_list = ShoppingList.create_empty()
+        shopping_list.inventory = inventory
+        target = {item_name: inventory[item_name]}
+        shopping_list.target_items.update(target)
+        shopping_list.items.update(target)
+        shopping_list.simplifyV2()
+
+
+def expand_items(graph: RecipeGraph, item_names: List[str]) -> None:
+    """Expand items one at a time through the compiled graph."""
+    for item_name in item_names:
+        shopping_list = ShoppingList(graph.inventory, item_name, 1)
+        shopping_list.target_items[item_name] = {"quantity": 1}
+        shopping_list.expand(graph)
+
+
+class QuietRequestHandler(MyRequestHandler):
+    """Request handler that does not log every request to stderr."""
+
+    def log_access(self, route, duration):
+        pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def benchmark_http(game: str, repeat: int) -> Dict[str, float]:
+    """Time the HTTP handlers of a game against a server on an ephemeral port."""
+    httpd = socketserver.TCPServer(("localhost", 0), QuietRequestHandler)
+    port = httpd.server_address[1]
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+
+    def get(path: str) -> None:
+        with urllib.request.urlopen(f"http://localhost:{port}{path}") as response:
+            response.read()
+
+    try:
+        return {
+            "http_discover_specialisations": best_time(
+                lambda: get(f"/discover_specialisations?game={game}"), repeat
+            ),
+            "http_select_game": best_time(
+                lambda: get(f"/select_game?game={game}"), repeat
+            ),
+            "http_filter_recipes": best_time(
+                lambda: get(f"/filter_recipes/{game}/null"), repeat
+            ),
+        }
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def benchmark_game(game: str, repeat: int, http: bool) -> Dict[str, Any]:
+    """Benchmark every stage for a game in recipes/ of the working directory."""
+    logging.info("Benchmarking %s.", game)
+    with contextlib.redirect_stdout(io.StringIO()):
+        inventory, meta = load_recipes(game)
+    graph = RecipeGraph(inventory)
+    roots = root_items(graph)
+    sample = roots[:SAMPLE_SIZE]
+    craftable, gatherable = process_inventory(copy.deepcopy(inventory))
+    payload = serializer.dumps(craftable)
+
+    def fresh_inventory(_=None):
+        return copy.deepcopy(inventory)
+
+    with contextlib.redirect_stderr(io.StringIO()):
+        roots_list = craft_items(dict.fromkeys(roots, 1), inventory, graph=graph)
+
+    def aggregate_costs():
+        roots_list.invalidate_costs()
+        return roots_list.costs
+
+    seconds = {
+        "load_recipes": best_time(lambda: load_recipes(game), repeat),
+        "compile_graph": best_time(RecipeGraph, repeat, fresh_inventory),
+        "process_inventory": best_time(process_inventory, repeat, fresh_inventory),
+        "expand_roots_together": best_time(
+            lambda: graph.expand({item_name: 1 for item_name in roots}), repeat
+        ),
+        "expand_sample": best_time(lambda: expand_items(graph, sample), repeat),
+        "aggregate_costs": best_time(aggregate_costs, repeat),
+        "render_text": best_time(lambda: roots_list.render(io.StringIO()), repeat),
+        "render_csv": best_time(
+            lambda: roots_list.render(io.StringIO(), "csv"), repeat
+        ),
+        "serialize_stdlib": best_time(lambda: json.dumps(craftable).encode(), repeat),
+        "serialize_stdlib_pretty": best_time(
+            lambda: json.dumps(craftable, indent=4, sort_keys=True), repeat
+        ),
+        "serialize_compact": best_time(lambda: serializer.dumps(craftable), repeat),
+        "serialize_pretty": best_time(
+            lambda: serializer.dumps(craftable, pretty=True, sort_keys=True), repeat
+        ),
+        "serialize_graph": best_time(lambda: serializer.dumps_graph(graph), repeat),
+    }
+    try:
+        seconds["simplify_v2_sample"] = best_time(
+            lambda inventory: simplify_items(inventory, sample),
+            repeat,
+            fresh_inventory,
+        )
+    except (AttributeError, KeyError, TypeError) as error:
+        logging.warning("simplifyV2 failed for %s: %r", game, error)
+    with tempfile.TemporaryDirectory() as directory:
+        seconds["export_matrix"] = best_time(
+            lambda: export_matrix(graph, Path(directory)), repeat
+        )
+    if http:
+        seconds.update(benchmark_http(game, repeat))
+
+    return {
+        "recipes": len(inventory),
+        "items": len(graph),
+        "roots": len(roots),
+        "sample_size": len(sample),
+        "payload_bytes": len(payload),
+        "peak_memory_bytes": {
+            "load_recipes": peak_memory(lambda: load_recipes(game)),
+            "process_inventory": peak_memory(
+                lambda: process_inventory(fresh_inventory())
+            ),
+        },
+        "seconds": seconds,
+    }
+
+
+def compare_results(
+    previous: Dict[str, Any], current: Dict[str, Any], threshold: float
+) -> List[str]:
+    """Return a message for every stage that got slower than the threshold allows."""
+    regressions = []
+    for game, result in current["results"].items():
+        before = previous.get("results", {}).get(game, {}).get("seconds", {})
+        for stage, seconds in result["seconds"].items():
+            if stage in before and seconds > before[stage] * (1 + threshold):
+                regressions.append(
+                    f"{game} {stage}: {before[stage]:.4f}s -> {seconds:.4f}s"
+                )
+    return regressions
+
+
+def format_results(results: Dict[str, Any]) -> str:
+    """Format benchmark results for printing to stdout."""
+    lines = []
+    for game, result in results["results"].items():
+        lines.append(
+            f"{game}: recipes: {result['recipes']}, items: {result['items']}, "
+            f"payload: {result['payload_bytes']} bytes"
+        )
+        for stage, seconds in result["seconds"].items():
+            lines.append(f"  {stage}: {seconds * 1000:.2f} ms")
+        for stage, peak in result["peak_memory_bytes"].items():
+            lines.append(f"  peak memory {stage}: {peak / 1024:.0f} KiB")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    """Run all benchmarks, then save and compare the results if requested."""
+    options = parse_arguments()
+    logging.basicConfig(format="%(levelname)s: %(message)s", level=logging.INFO)
+
+    results: Dict[str, Any] = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": options.repeat,
+            "json_backend": serializer.BACKEND,
+        },
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        root = Path(directory)
+        for game in options.games:
+            shutil.copytree(REPOSITORY / "recipes" / game, root / "recipes" / game)
+        games = list(options.games)
+        for items in options.synthetic:
+            game = f"synthetic-{items}"
+            recipes = generate_recipes(
+                items,
+                options.depth,
+                options.fan_out,
+                options.shared_ratio,
+                8,
+                options.seed,
+            )
+            write_game(root / "recipes" / game, recipes, f"Synthetic {items}")
+            games.append(game)
+
+        with working_directory(root):
+            for game in games:
+                results["results"][game] = benchmark_game(
+                    game, options.repeat, not options.no_http
+                )
+
+    print(format_results(results))
+    if options.output:
+        options.output.parent.mkdir(parents=True, exist_ok=True)
+        options.output.write_text(json.dumps(results, indent=4, sort_keys=True))
+        logging.info("Saved results to %s.", options.output)
+
+    if options.compare:
+        previous = json.loads(options.compare.read_text())
+        regressions = compare_results(previous, results, options.threshold)
+        for regression in regressions:
+            logging.error("Regression %s", regression)
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
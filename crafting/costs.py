@@ -0,0 +1,102 @@
+"""Decide whether crafting or buying each item is the cheapest option."""
+
+import logging
+from typing import Dict, List, Set, Tuple
+
+# internal
+from crafting.graph import RecipeGraph
+
+CRAFT = "craft"
+BUY = "buy"
+GATHER = "gather"
+
+# Recipe prices held per node by cost_columns, in this order.
+COST_KEYS = ("crafting_cost", "buy_from_vendor", "sell_to_vendor")
+
+
+class CostPlan:
+    """
+    The cheapest way to obtain one unit of every item in a recipe graph.
+
+    Items without child items are bought when they have a buy_from_vendor price
+    and gathered for free otherwise. Craftable items are bought instead of
+    crafted when buy_from_vendor is cheaper than their crafting_cost plus the
+    cheapest cost of their child items.
+    """
+
+    def __init__(self, graph: RecipeGraph):
+        self.graph = graph
+        self.unit_costs: Dict[str, float] = {}
+        self.crafted_costs: Dict[str, float] = {}
+        self.decisions: Dict[str, str] = {}
+
+        # One bottom-up pass, every child is settled before its parents.
+        unit_costs = [0.0] * len(graph)
+        crafted_costs = [0.0] * len(graph)
+        for node in graph.order:
+            item_name = graph.names[node]
+            recipe = graph.recipe(item_name)
+            buy_cost = recipe.get("buy_from_vendor")
+            edges = graph.children[node]
+
+            if not edges:
+                unit_costs[node] = crafted_costs[node] = buy_cost or 0.0
+                self.decisions[item_name] = GATHER if buy_cost is None else BUY
+                continue
+
+            craft_cost = recipe.get("crafting_cost") or 0.0
+            full_cost = craft_cost
+            for child, quantity in edges:
+                craft_cost += unit_costs[child] * quantity
+                full_cost += crafted_costs[child] * quantity
+            craft_cost /= graph.yields[node]
+            full_cost /= graph.yields[node]
+
+            crafted_costs[node] = full_cost
+            if buy_cost is not None and buy_cost < craft_cost:
+                unit_costs[node] = buy_cost
+                self.decisions[item_name] = BUY
+            else:
+                unit_costs[node] = craft_cost
+                self.decisions[item_name] = CRAFT
+
+        for node, item_name in enumerate(graph.names):
+            self.unit_costs[item_name] = unit_costs[node]
+            self.crafted_costs[item_name] = crafted_costs[node]
+
+        logging.debug("Planned cheapest costs for %s items.", len(graph))
+
+    @property
+    def bought(self) -> Set[str]:
+        """Names of craftable items that are cheaper to buy than to craft."""
+        return {
+            item_name
+            for item_name, decision in self.decisions.items()
+            if decision == BUY and self.graph.is_craftable(item_name)
+        }
+
+
+def plan_costs(graph: RecipeGraph) -> CostPlan:
+    """Return the cost plan for a recipe graph, computing it on first use."""
+    plan = graph.cache.get("cost_plan")
+    if plan is None:
+        plan = CostPlan(graph)
+        graph.cache["cost_plan"] = plan
+    return plan
+
+
+def cost_columns(graph: RecipeGraph) -> Tuple[List[float], ...]:
+    """
+    Return the crafting_cost, buy_from_vendor and sell_to_vendor of every item.
+
+    Each column is indexed like graph.names and holds 0.0 for missing prices.
+    The columns are built on first use and cached until the graph is reloaded.
+    """
+    columns = graph.cache.get("cost_columns")
+    if columns is None:
+        recipes = [graph.recipe(item_name) for item_name in graph.names]
+        columns = tuple(
+            [recipe.get(key) or 0.0 for recipe in recipes] for key in COST_KEYS
+        )
+        graph.cache["cost_columns"] = columns
+    return columns
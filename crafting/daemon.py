@@ -0,0 +1,82 @@
+"""Keep the calculator warm in a background process answering on a Unix socket."""
+
+import contextlib
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+from typing import Callable, List, Optional
+
+# internal
+from crafting.forward import Result, socket_path
+
+# Longest accepted request line in bytes.
+MAX_REQUEST = 1024 * 1024
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answers one JSON line with a command line by running it."""
+
+    def handle(self):
+        line = self.rfile.readline(MAX_REQUEST)
+        if not line:
+            return
+        try:
+            argv = json.loads(line)["argv"]
+            if not all(isinstance(argument, str) for argument in argv):
+                raise TypeError("argv must be a list of strings")
+        except (ValueError, KeyError, TypeError) as error:
+            stdout, stderr, code = "", f"Invalid request: {error}\n", 2
+        else:
+            stdout, stderr, code = self.server.run(argv)
+        response = {"stdout": stdout, "stderr": stderr, "exit": code}
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class _DaemonServer(socketserver.UnixStreamServer):
+    """Runs forwarded command lines one at a time, they share stdout."""
+
+    def __init__(self, path: str, run: Callable[[List[str]], Result]):
+        self.run = run
+        super().__init__(path, _RequestHandler)
+
+
+def serve(run: Callable[[List[str]], Result], path: Optional[str] = None) -> None:
+    """
+    Answer forwarded command lines until interrupted or terminated.
+
+    Args:
+        run (callable): Runs a command line and returns its output, errors
+            and exit code.
+        path (str): Socket to listen on, defaults to socket_path().
+    """
+    path = path or socket_path()
+    if os.path.exists(path):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(path)
+            except OSError:
+                # Left behind by a daemon that was killed.
+                os.unlink(path)
+            else:
+                raise SystemExit(f"A daemon is already listening on {path}.")
+
+    # Only the user may connect, the socket runs commands as them.
+    umask = os.umask(0o177)
+    try:
+        server = _DaemonServer(path, run)
+    finally:
+        os.umask(umask)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    logging.info("Daemon listening on %s.", path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path)
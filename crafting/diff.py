@@ -0,0 +1,204 @@
+"""Compare two recipe snapshots and report how requirements and costs changed."""
+
+import logging
+from typing import Any, Dict, Iterable, Set, Tuple
+
+# internal
+from crafting.graph import RecipeGraph, child_quantities
+
+# Differences smaller than this are rounding noise of float sums.
+TOLERANCE = 1e-9
+
+ADDED = "added"
+REMOVED = "removed"
+CHANGED = "changed"
+
+
+def _signature(graph: RecipeGraph, item_name: str) -> Tuple:
+    """Return what a recipe contributes to the requirements and cost of items."""
+    recipe = graph.recipe(item_name)
+    node = graph.index[item_name]
+    return (
+        child_quantities(recipe) if graph.children[node] else {},
+        graph.yields[node],
+        recipe.get("crafting_cost") or 0.0,
+        recipe.get("buy_from_vendor") or 0.0,
+    )
+
+
+def changed_items(old: RecipeGraph, new: RecipeGraph) -> Dict[str, str]:
+    """Return the items added, removed or with a changed recipe or price."""
+    changes = {}
+    for item_name in old.names:
+        if item_name not in new:
+            changes[item_name] = REMOVED
+        elif _signature(old, item_name) != _signature(new, item_name):
+            changes[item_name] = CHANGED
+    for item_name in new.names:
+        if item_name not in old:
+            changes[item_name] = ADDED
+    return changes
+
+
+def _ancestors(graph: RecipeGraph, item_names: Iterable[str]) -> Set[str]:
+    """Return the given items of a graph and every item crafted from them."""
+    stack = [graph.index[name] for name in item_names if name in graph]
+    seen = set(stack)
+    while stack:
+        node = stack.pop()
+        for parent, _ in graph.parents[node]:
+            if parent not in seen:
+                seen.add(parent)
+                stack.append(parent)
+    return {graph.names[node] for node in seen}
+
+
+class _Totals:
+    """
+    Base materials and crafted cost per unit of items, computed on demand.
+
+    Items whose requirements are the same in both snapshots share one cache,
+    so their subgraphs are only expanded once for both sides of a diff.
+    """
+
+    def __init__(self, graph: RecipeGraph, affected: Set[str], shared: Dict):
+        self.graph = graph
+        self.affected = affected
+        self.shared = shared
+        self.own: Dict[str, Tuple[Dict[str, float], float]] = {}
+
+    def _cache(self, item_name: str) -> Dict[str, Tuple[Dict[str, float], float]]:
+        return self.own if item_name in self.affected else self.shared
+
+    def __call__(self, item_name: str) -> Tuple[Dict[str, float], float]:
+        # Children first, without recursion, so deep recipes cannot overflow.
+        names = self.graph.names
+        stack = [self.graph.index[item_name]]
+        while stack:
+            node = stack[-1]
+            cache = self._cache(names[node])
+            if names[node] in cache:
+                stack.pop()
+                continue
+            pending = [
+                child
+                for child, _ in self.graph.children[node]
+                if names[child] not in self._cache(names[child])
+            ]
+            if pending:
+                stack.extend(pending)
+                continue
+            cache[names[node]] = self._total(node)
+            stack.pop()
+        return self._cache(item_name)[item_name]
+
+    def _total(self, node: int) -> Tuple[Dict[str, float], float]:
+        """Sum the totals of the children of an item, which are all known."""
+        graph = self.graph
+        recipe = graph.recipe(graph.names[node])
+        edges = graph.children[node]
+        if not edges:
+            return {graph.names[node]: 1.0}, recipe.get("buy_from_vendor") or 0.0
+
+        materials: Dict[str, float] = {}
+        cost = recipe.get("crafting_cost") or 0.0
+        for child, quantity in edges:
+            child_materials, child_cost = self(graph.names[child])
+            for material, amount in child_materials.items():
+                materials[material] = materials.get(material, 0.0) + amount * quantity
+            cost += child_cost * quantity
+        recipe_yield = graph.yields[node]
+        if recipe_yield != 1:
+            materials = {
+                name: amount / recipe_yield for name, amount in materials.items()
+            }
+            cost /= recipe_yield
+        return materials, cost
+
+
+def _delta(old: float, new: float) -> Dict[str, float]:
+    return {"old": old, "new": new, "delta": new - old}
+
+
+def diff_snapshots(old: RecipeGraph, new: RecipeGraph) -> Dict[str, Any]:
+    """
+    Report which craftable items need other base materials or cost more or less.
+
+    Only the items with a changed recipe or price and the items crafted from
+    them, in either snapshot, are expanded again. Requirements and costs are
+    per crafted unit, costs are the crafting_cost of all crafts plus the
+    buy_from_vendor price of the base materials.
+
+    Args:
+        old (RecipeGraph): The recipes before the change.
+        new (RecipeGraph): The recipes after the change.
+
+    Returns:
+        dict: "changed" maps the items whose own recipe or price changed to
+            "added", "removed" or "changed". "items" maps every craftable item
+            with different totals to its status, its "materials" with an old,
+            new and delta quantity and its "cost" with an old, new and delta
+            value. Missing quantities are 0.
+    """
+    changes = changed_items(old, new)
+    affected = _ancestors(old, changes) | _ancestors(new, changes)
+    shared: Dict[str, Tuple[Dict[str, float], float]] = {}
+    old_totals = _Totals(old, affected, shared)
+    new_totals = _Totals(new, affected, shared)
+
+    items = {}
+    for item_name in sorted(affected):
+        in_old = item_name in old and old.is_craftable(item_name)
+        in_new = item_name in new and new.is_craftable(item_name)
+        if not (in_old or in_new):
+            continue
+        old_materials, old_cost = old_totals(item_name) if in_old else ({}, 0.0)
+        new_materials, new_cost = new_totals(item_name) if in_new else ({}, 0.0)
+
+        materials = {}
+        for material in sorted(old_materials.keys() | new_materials.keys()):
+            before = old_materials.get(material, 0.0)
+            after = new_materials.get(material, 0.0)
+            if abs(after - before) > TOLERANCE:
+                materials[material] = _delta(before, after)
+        if not materials and abs(new_cost - old_cost) <= TOLERANCE:
+            continue
+
+        status = CHANGED if in_old and in_new else (ADDED if in_new else REMOVED)
+        items[item_name] = {
+            "status": status,
+            "materials": materials,
+            "cost": _delta(old_cost, new_cost),
+        }
+
+    logging.debug(
+        "Diffed %s changed and %s affected items, %s expanded per snapshot.",
+        len(changes),
+        len(affected),
+        len(old_totals.own) + len(new_totals.own),
+    )
+    return {"changed": dict(sorted(changes.items())), "items": items}
+
+
+def format_snapshot_diff(report: Dict[str, Any]) -> str:
+    """Format a snapshot diff for printing to stdout."""
+    if not report["changed"]:
+        return "No recipes changed."
+
+    lines = ["Changed recipes:"]
+    lines.extend(f"{name}: {status}" for name, status in report["changed"].items())
+    lines.append("")
+    if not report["items"]:
+        lines.append("No craftable item needs other materials or costs more or less.")
+    for item_name, details in report["items"].items():
+        cost = details["cost"]
+        lines.append(
+            f"{item_name} ({details['status']}): cost {cost['old']:g} -> "
+            f"{cost['new']:g} ({cost['delta']:+g})"
+        )
+        for material, quantity in details["materials"].items():
+            lines.append(
+                f"  {material}: {quantity['old']:g} -> {quantity['new']:g} "
+                f"({quantity['delta']:+g})"
+            )
+    return "\n".join(lines)
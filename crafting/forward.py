@@ -0,0 +1,72 @@
+"""
+Forward a command line to a running calculator daemon.
+
+Imported before anything else by crafting_calculator.py, so it only uses
+modules that load quickly.
+"""
+
+import json
+import os
+import socket
+import sys
+import zlib
+from typing import List, Optional, Tuple
+
+# Output, errors and exit code of one forwarded command line.
+Result = Tuple[str, str, int]
+
+# Environment variable overriding the socket path.
+SOCKET_ENV = "CRAFTING_SOCKET"
+# Arguments that are always handled by the calling process.
+LOCAL_ARGUMENTS = ("--daemon", "--no-daemon", "--stdin")
+
+
+def socket_path(directory: Optional[str] = None) -> str:
+    """
+    Return the socket of the daemon serving a working directory.
+
+    Recipes and input files are found relative to the working directory, so
+    every directory gets its own daemon, in XDG_RUNTIME_DIR or TMPDIR.
+    """
+    if os.environ.get(SOCKET_ENV):
+        return os.environ[SOCKET_ENV]
+    directory = os.path.realpath(directory or os.getcwd())
+    digest = zlib.crc32(directory.encode())
+    user = getattr(os, "getuid", lambda: 0)()
+    base = os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("TMPDIR") or "/tmp"
+    return os.path.join(base, f"crafting-calculator-{user}-{digest:08x}.sock")
+
+
+def forward(argv: List[str], path: Optional[str] = None) -> Optional[Result]:
+    """Run a command line in the daemon, return None when none is listening."""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    if any(argument in LOCAL_ARGUMENTS for argument in argv):
+        return None
+    path = path or socket_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(path)
+            client.sendall(json.dumps({"argv": argv}).encode() + b"\n")
+            with client.makefile("rb") as reader:
+                line = reader.readline()
+    except OSError:
+        # Left behind by a daemon that was killed, work in process instead.
+        return None
+    if not line:
+        return None
+    response = json.loads(line)
+    return response["stdout"], response["stderr"], response["exit"]
+
+
+def forward_and_exit(argv: List[str]) -> None:
+    """Print the answer of a running daemon and exit, or return without one."""
+    result = forward(argv)
+    if result is None:
+        return
+    stdout, stderr, code = result
+    sys.stderr.write(stderr)
+    sys.stdout.write(stdout)
+    raise SystemExit(code)
@@ -0,0 +1,301 @@
+"""Recipe inventory compiled into an indexed graph for whole-game calculations."""
+
+import logging
+import math
+from typing import Any, Collection, Dict, List, Tuple
+
+# Cache keys holding a table of results per item instead of a single result.
+MEMO_TABLES = ("used_in_transitively",)
+
+
+def child_quantities(details: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Return the quantity of each child item consumed by one craft of a recipe.
+
+    Recipes list their child items either as a list of dicts with a 'name' key,
+    as a dict of name to quantity or as a dict of name to details.
+    """
+    child_items = details.get("items") or {}
+    quantities = {}
+    if isinstance(child_items, list):
+        for child_details in child_items:
+            child_name = child_details["name"]
+            quantities[child_name] = child_details.get("quantity", 1)
+    else:
+        for child_name, child_details in child_items.items():
+            if isinstance(child_details, dict):
+                quantities[child_name] = child_details.get("quantity", 1)
+            else:
+                quantities[child_name] = child_details
+    return quantities
+
+
+class RecipeGraph:
+    """
+    A recipe inventory compiled into a directed acyclic graph.
+
+    Every item is addressed by an integer index. `children` holds the
+    (child index, quantity per craft) edges of each item, `parents` the same
+    edges reversed as (parent index, quantity per craft), `yields` the amount
+    produced by one craft (the recipe's quantity) and `order` all indices with
+    children before parents.
+    """
+
+    def __init__(self, inventory: Dict[str, Dict[str, Any]]):
+        self.inventory = inventory
+        self.names: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.children: List[List[Tuple[int, float]]] = []
+        self.parents: List[List[Tuple[int, float]]] = []
+        self.yields: List[float] = []
+        self.order: List[int] = []
+        # Results derived from the graph, e.g. cost plans, keyed by their name.
+        self.cache: Dict[str, Any] = {}
+
+        for item_name in inventory:
+            self._add_node(item_name)
+
+        for item_name, details in inventory.items():
+            edges = self.children[self.index[item_name]]
+            for child_name, quantity in child_quantities(details).items():
+                edges.append((self._add_node(child_name), quantity))
+
+        for node, edges in enumerate(self.children):
+            for child, quantity in edges:
+                self.parents[child].append((node, quantity))
+
+        self.order = self._topological_order()
+        logging.debug("Compiled recipe graph with %s items.", len(self.names))
+
+    def _add_node(self, item_name: str) -> int:
+        """Return the index of an item, adding it to the graph if required."""
+        node = self.index.get(item_name)
+        if node is None:
+            node = len(self.names)
+            self.index[item_name] = node
+            self.names.append(item_name)
+            self.children.append([])
+            self.parents.append([])
+            recipe = self.inventory.get(item_name, {})
+            self.yields.append(recipe.get("quantity", 1) or 1)
+        return node
+
+    def _topological_order(self) -> List[int]:
+        """Order all items so that children always come before their parents."""
+        order = []
+        state = [0] * len(self.names)  # 0 = new, 1 = in progress, 2 = done
+        for root in range(len(self.names)):
+            if state[root]:
+                continue
+            state[root] = 1
+            stack = [(root, iter(self.children[root]))]
+            while stack:
+                node, edges = stack[-1]
+                for child, _ in edges:
+                    if state[child] == 1:
+                        raise ValueError(
+                            f"Recipe cycle detected at {self.names[child]}."
+                        )
+                    if not state[child]:
+                        state[child] = 1
+                        stack.append((child, iter(self.children[child])))
+                        break
+                else:
+                    stack.pop()
+                    state[node] = 2
+                    order.append(node)
+        return order
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, item_name: str) -> bool:
+        return item_name in self.index
+
+    def recipe(self, item_name: str) -> Dict[str, Any]:
+        """Return the recipe of an item, or an empty dict for unknown items."""
+        return self.inventory.get(item_name, {})
+
+    def is_craftable(self, item_name: str) -> bool:
+        """Return whether the item is crafted from other items."""
+        node = self.index.get(item_name)
+        return node is not None and bool(self.children[node])
+
+    def child_items(self, item_name: str) -> List[Tuple[str, float]]:
+        """Return the name and quantity per craft of each child item of an item."""
+        node = self.index.get(item_name)
+        if node is None:
+            return []
+        return [
+            (self.names[child], quantity) for child, quantity in self.children[node]
+        ]
+
+    def used_in(self, item_name: str) -> Dict[str, float]:
+        """Return the quantity of an item consumed per craft of each direct parent."""
+        node = self.index.get(item_name)
+        if node is None:
+            return {}
+        return {
+            self.names[parent]: quantity
+            for parent, quantity in sorted(
+                self.parents[node], key=lambda edge: self.names[edge[0]]
+            )
+        }
+
+    def used_in_transitively(self, item_name: str) -> Dict[str, float]:
+        """
+        Return the quantity of an item consumed per craft of every item using it.
+
+        Includes the parents of the item and all their ancestors. Quantities
+        add up every path to the item and count fractions of intermediate
+        crafts, so they are the average consumption of crafting an ancestor
+        many times. Results are cached per item until the graph is reloaded.
+
+        Args:
+            item_name (str): The ingredient to look up.
+
+        Returns:
+            dict: Quantity per craft of each item that uses it, sorted by name.
+        """
+        node = self.index.get(item_name)
+        if node is None:
+            return {}
+        closures = self.cache.setdefault("used_in_transitively", {})
+        closure = closures.get(node)
+        if closure is not None:
+            return closure
+
+        # Collect the ancestors first, then visit them children before parents.
+        ancestors = set()
+        stack = [node]
+        while stack:
+            for parent, _ in self.parents[stack.pop()]:
+                if parent not in ancestors:
+                    ancestors.add(parent)
+                    stack.append(parent)
+
+        per_unit = {node: 1}
+        per_craft = {}
+        for ancestor in self.order:
+            if ancestor not in ancestors:
+                continue
+            quantity = sum(
+                child_quantity * per_unit[child]
+                for child, child_quantity in self.children[ancestor]
+                if child in per_unit
+            )
+            per_craft[ancestor] = quantity
+            if self.yields[ancestor] != 1:
+                quantity = quantity / self.yields[ancestor]
+            per_unit[ancestor] = quantity
+
+        closure = {
+            self.names[ancestor]: per_craft[ancestor]
+            for ancestor in sorted(per_craft, key=self.names.__getitem__)
+        }
+        closures[node] = closure
+        return closure
+
+    def memo_entries(self) -> int:
+        """
+        Return the number of memoized results cached on the graph.
+
+        Results for the whole graph count once, tables of results per item
+        count every item they hold.
+        """
+        return sum(
+            len(value) if key in MEMO_TABLES else 1 for key, value in self.cache.items()
+        )
+
+    def craftable_names(self) -> List[str]:
+        """Return the names of all craftable items, sorted and cached."""
+        names = self.cache.get("craftable_names")
+        if names is None:
+            names = sorted(name for name in self.names if self.is_craftable(name))
+            self.cache["craftable_names"] = names
+        return names
+
+    def expand(
+        self, targets: Dict[str, float], buy: Collection[str] = ()
+    ) -> Dict[str, float]:
+        """
+        Calculate the total amount of every item needed to craft the targets.
+
+        Items are visited once, parents before children, so shared intermediates
+        are aggregated before being broken down. Items named in `buy` are not
+        broken down into their child items.
+
+        Args:
+            targets (dict): Amount of each item to craft.
+            buy (collection): Names of items to acquire instead of crafting.
+
+        Returns:
+            dict: Required amount of each item, parents before children.
+        """
+        required, _ = self.net_requirements(targets, {}, buy)
+        return required
+
+    def net_requirements(
+        self,
+        targets: Dict[str, float],
+        on_hand: Dict[str, float],
+        buy: Collection[str] = (),
+    ) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """
+        Calculate the shortfall of every item needed to craft the targets.
+
+        Works like `expand`, but owned items are used up before an item is
+        broken down, so only the missing amount is passed on to its children.
+        Items are crafted as a whole number of crafts of their yield.
+
+        Args:
+            targets (dict): Amount of each item to craft.
+            on_hand (dict): Amount of each item already owned.
+            buy (collection): Names of items to acquire instead of crafting.
+
+        Returns:
+            tuple: A tuple containing:
+                - required (dict): Missing amount of each item.
+                - used (dict): Amount of each owned item that is used up.
+        """
+        required = [0] * len(self.names)
+        unknown = {}
+        for item_name, quantity in targets.items():
+            node = self.index.get(item_name)
+            if node is None:
+                logging.debug("No recipe for %s.", item_name)
+                unknown[item_name] = unknown.get(item_name, 0) + quantity
+            else:
+                required[node] += quantity
+
+        bought = {self.index[name] for name in buy if name in self.index}
+        expanded = {}
+        used = {}
+        for node in reversed(self.order):
+            quantity = required[node]
+            if not quantity:
+                continue
+            item_name = self.names[node]
+            owned = on_hand.get(item_name, 0)
+            if owned > 0:
+                used[item_name] = min(owned, quantity)
+                quantity -= used[item_name]
+                if not quantity:
+                    continue
+            expanded[item_name] = quantity
+            if node in bought:
+                continue
+            crafts = quantity
+            if self.yields[node] != 1:
+                crafts = math.ceil(quantity / self.yields[node])
+            for child, child_quantity in self.children[node]:
+                required[child] += crafts * child_quantity
+
+        for item_name, quantity in unknown.items():
+            owned = on_hand.get(item_name, 0)
+            if owned > 0:
+                used[item_name] = min(owned, quantity)
+                quantity -= used[item_name]
+            if quantity:
+                expanded[item_name] = quantity
+        return expanded, used
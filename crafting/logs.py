@@ -0,0 +1,103 @@
+"""Queue based logging with request IDs, JSON lines and sampled debug records."""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+from datetime import datetime, timezone
+from typing import Dict, Tuple
+
+REQUEST_ID: contextvars.ContextVar = contextvars.ContextVar("request_id", default="-")
+
+# Attributes of every log record, anything else was passed as `extra`.
+STANDARD_ATTRIBUTES = set(logging.makeLogRecord({}).__dict__) | {
+    "message",
+    "asctime",
+    "request_id",
+}
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(request_id)s] %(message)s"
+
+
+class RequestIdFilter(logging.Filter):
+    """Add the ID of the request being handled to every record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = REQUEST_ID.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep every debug record of a call site the first time, then one in `every`."""
+
+    def __init__(self, every: int = 1):
+        super().__init__()
+        self.every = max(1, every)
+        self.seen: Dict[Tuple[str, int], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        site = (record.pathname, record.lineno)
+        seen = self.seen.get(site, 0)
+        self.seen[site] = seen + 1
+        return seen % self.every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        for key, value in record.__dict__.items():
+            if key not in STANDARD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def setup_queue_logging(
+    level: int = logging.INFO, json_lines: bool = False, sample_every: int = 1
+) -> logging.handlers.QueueListener:
+    """
+    Send all records through a queue to a stderr handler on a background thread.
+
+    Request handlers only pay for putting a record on the queue, writing to
+    the console happens on the listener thread.
+
+    Args:
+        level (int): Minimum level of records to keep.
+        json_lines (bool): Write JSON lines instead of text.
+        sample_every (int): Keep one in this many debug records per call site.
+
+    Returns:
+        QueueListener: The started listener, stopped again at exit.
+    """
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(SamplingFilter(sample_every))
+
+    stream_handler = logging.StreamHandler()
+    if json_lines:
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(records, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
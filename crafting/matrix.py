@@ -0,0 +1,214 @@
+"""Export the base materials required by every craftable item as columnar files."""
+
+import csv
+import logging
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+# internal
+from crafting.costs import COST_KEYS, cost_columns
+from crafting.graph import RecipeGraph
+
+# Dense matrices larger than this are only written as COO triples.
+MAX_DENSE_BYTES = 256 * 1024 * 1024
+# .npy headers are padded to a multiple of this many bytes, like NumPy does.
+NPY_ALIGNMENT = 64
+NPY_DESCR = {"d": "<f8", "q": "<i8"}
+
+
+def requirement_rows(graph: RecipeGraph) -> List[Dict[int, float]]:
+    """
+    Return the base materials required for one unit of every item.
+
+    One pass over the graph with children before parents, each row adds up
+    the rows of its children per craft and divides by the recipe's yield.
+    Rows map the index of a base material to its quantity, base materials
+    require only themselves.
+    """
+    rows: List[Dict[int, float]] = [{} for _ in range(len(graph))]
+    for node in graph.order:
+        edges = graph.children[node]
+        if not edges:
+            rows[node] = {node: 1.0}
+            continue
+        row = rows[node]
+        for child, quantity in edges:
+            for material, amount in rows[child].items():
+                row[material] = row.get(material, 0.0) + amount * quantity
+        if graph.yields[node] != 1:
+            for material in row:
+                row[material] /= graph.yields[node]
+    return rows
+
+
+def write_npy(
+    path: Path, typecode: str, shape: Tuple[int, ...], chunks: Iterable[array]
+) -> None:
+    """
+    Write an array in NumPy's .npy format version 1.0 without needing NumPy.
+
+    Args:
+        path (Path): The file to write.
+        typecode (str): "d" for float64 or "q" for int64 values.
+        shape (tuple): The shape of the array, filled in C order.
+        chunks (iterable): Arrays of the given typecode, written one at a
+            time so the whole matrix never has to be held in memory.
+    """
+    header = "{'descr': '%s', 'fortran_order': False, 'shape': %s, }" % (
+        NPY_DESCR[typecode],
+        repr(tuple(shape)),
+    )
+    padding = -(10 + len(header) + 1) % NPY_ALIGNMENT
+    header = (header + " " * padding + "\n").encode("latin1")
+    with open(path, "wb") as file:
+        file.write(b"\x93NUMPY\x01\x00")
+        file.write(len(header).to_bytes(2, "little"))
+        file.write(header)
+        for chunk in chunks:
+            if sys.byteorder == "big":
+                chunk = array(typecode, chunk)
+                chunk.byteswap()
+            chunk.tofile(file)
+
+
+def _number(value: float):
+    """Return whole numbers as int, so CSV files show 2 rather than 2.0."""
+    return int(value) if value.is_integer() else value
+
+
+def export_matrix(graph: RecipeGraph, directory: Path) -> List[Path]:
+    """
+    Write the item by base material requirement matrix of a game.
+
+    Rows are the craftable items and columns the base materials, both sorted
+    by name. Cells hold the quantity needed for one unit of the item.
+
+    Files written to the directory:
+
+    - items.csv and materials.csv: row and column index, name, yield and the
+      prices of COST_KEYS
+    - costs.npy: the prices of COST_KEYS per row, as float64
+    - requirements_row.npy, requirements_col.npy and requirements_data.npy:
+      the non-zero cells as COO triples, as int64 and float64
+    - requirements.npy: the dense float64 matrix, unless larger than
+      MAX_DENSE_BYTES
+    - requirements.csv: the non-zero cells as item, material and quantity
+
+    Args:
+        graph (RecipeGraph): The compiled recipes of a game.
+        directory (Path): Where to write the files, created if missing.
+
+    Returns:
+        list: The paths of the written files.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    rows = requirement_rows(graph)
+    items = sorted(
+        (node for node, edges in enumerate(graph.children) if edges),
+        key=graph.names.__getitem__,
+    )
+    materials = sorted(
+        (node for node, edges in enumerate(graph.children) if not edges),
+        key=graph.names.__getitem__,
+    )
+    column = {node: position for position, node in enumerate(materials)}
+    price_columns = cost_columns(graph)
+    written = []
+
+    for name, nodes in (("items", items), ("materials", materials)):
+        path = directory / f"{name}.csv"
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(("index", "name", "yield") + COST_KEYS)
+            for position, node in enumerate(nodes):
+                prices = [_number(float(values[node])) for values in price_columns]
+                writer.writerow(
+                    [position, graph.names[node], graph.yields[node]] + prices
+                )
+        written.append(path)
+
+    path = directory / "costs.npy"
+    write_npy(
+        path,
+        "d",
+        (len(items), len(COST_KEYS)),
+        (
+            array("d", [float(values[node]) for values in price_columns])
+            for node in items
+        ),
+    )
+    written.append(path)
+
+    # One pass over the rows collects the triples in sorted column order.
+    coo_rows, coo_cols, coo_data = array("q"), array("q"), array("d")
+    for position, node in enumerate(items):
+        cells = sorted(
+            (column[material], amount) for material, amount in rows[node].items()
+        )
+        for col, amount in cells:
+            coo_rows.append(position)
+            coo_cols.append(col)
+            coo_data.append(amount)
+    for suffix, typecode, values in (
+        ("row", "q", coo_rows),
+        ("col", "q", coo_cols),
+        ("data", "d", coo_data),
+    ):
+        path = directory / f"requirements_{suffix}.npy"
+        write_npy(path, typecode, (len(values),), (values,))
+        written.append(path)
+
+    path = directory / "requirements.csv"
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(("item", "material", "quantity"))
+        for position, col, amount in zip(coo_rows, coo_cols, coo_data):
+            writer.writerow(
+                (
+                    graph.names[items[position]],
+                    graph.names[materials[col]],
+                    _number(amount),
+                )
+            )
+    written.append(path)
+
+    if len(items) * len(materials) * 8 > MAX_DENSE_BYTES:
+        logging.warning(
+            "Skipped the dense %s x %s matrix, use the COO triples instead.",
+            len(items),
+            len(materials),
+        )
+    else:
+        path = directory / "requirements.npy"
+        write_npy(
+            path,
+            "d",
+            (len(items), len(materials)),
+            _dense_rows(rows, items, column, len(materials)),
+        )
+        written.append(path)
+
+    logging.info(
+        "Exported %s items by %s base materials to %s.",
+        len(items),
+        len(materials),
+        directory,
+    )
+    return written
+
+
+def _dense_rows(
+    rows: List[Dict[int, float]],
+    items: List[int],
+    column: Dict[int, int],
+    width: int,
+) -> Iterable[array]:
+    """Yield the rows of the dense matrix one at a time."""
+    zeros = array("d", bytes(8 * width))
+    for node in items:
+        row = array("d", zeros)
+        for material, amount in rows[node].items():
+            row[column[material]] = amount
+        yield row
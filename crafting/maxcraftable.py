@@ -0,0 +1,249 @@
+"""Calculate how many items can be crafted from the items already owned."""
+
+import logging
+import math
+from typing import Any, Dict, List, Tuple
+
+# internal
+from crafting.graph import RecipeGraph
+
+# scipy is optional, without it multi-target mixes are solved by a search.
+try:
+    from scipy.optimize import Bounds, LinearConstraint, milp
+except ImportError:
+    milp = None
+
+
+# Slack for float division, so 1 / (1 / 3) still counts as 3 whole units.
+TOLERANCE = 1e-9
+
+
+def base_requirements(graph: RecipeGraph, item_name: str) -> Dict[str, float]:
+    """
+    Return the amount of every base item consumed by one unit of an item.
+
+    Amounts are fractions of crafts, divided by the yield of every recipe and
+    not rounded up to whole crafts, so they never exceed the share of one unit
+    in any real plan. Like `crafting.matrix.requirement_rows`, for one item.
+    """
+    node = graph.index.get(item_name)
+    if node is None:
+        return {}
+    required = {node: 1.0}
+    materials: Dict[str, float] = {}
+    for node in reversed(graph.order):
+        quantity = required.pop(node, 0.0)
+        if not quantity:
+            continue
+        edges = graph.children[node]
+        if not edges:
+            name = graph.names[node]
+            materials[name] = materials.get(name, 0.0) + quantity
+            continue
+        crafts = quantity / graph.yields[node]
+        for child, child_quantity in edges:
+            required[child] = required.get(child, 0.0) + crafts * child_quantity
+    return materials
+
+
+def is_craftable_from(
+    graph: RecipeGraph, targets: Dict[str, float], on_hand: Dict[str, float]
+) -> bool:
+    """Return whether the targets can be crafted without any missing base items."""
+    required, _ = graph.net_requirements(targets, on_hand)
+    return all(graph.is_craftable(item_name) for item_name in required)
+
+
+def _upper_bound(graph: RecipeGraph, item_name: str, on_hand: Dict[str, float]) -> int:
+    """
+    Return an upper bound for the amount of an item that can be crafted.
+
+    Owned intermediates are counted as the base items they are made of, which
+    turns the problem into a bottleneck over the flattened requirements. The
+    fractional requirements can only undercount what crafting really uses, so
+    the bound is never below the largest craftable amount.
+    """
+    available: Dict[str, float] = {}
+    for owned_name, owned in on_hand.items():
+        if owned <= 0:
+            continue
+        if graph.is_craftable(owned_name):
+            for base_name, quantity in base_requirements(graph, owned_name).items():
+                available[base_name] = available.get(base_name, 0) + owned * quantity
+        else:
+            available[owned_name] = available.get(owned_name, 0) + owned
+
+    bound = None
+    for base_name, quantity in base_requirements(graph, item_name).items():
+        amount = math.floor(available.get(base_name, 0) / quantity + TOLERANCE)
+        bound = amount if bound is None else min(bound, amount)
+    return bound or 0
+
+
+def max_craftable(graph: RecipeGraph, item_name: str, on_hand: Dict[str, float]) -> int:
+    """
+    Return the largest amount of an item that can be crafted from owned items.
+
+    Owned units of the item itself are not counted. The bottleneck bound is
+    exact when only base items are owned and every recipe yields one unit,
+    otherwise the largest feasible amount below it is found with a binary
+    search over the netting pass.
+    """
+    if not graph.is_craftable(item_name):
+        return 0
+    on_hand = {name: owned for name, owned in on_hand.items() if name != item_name}
+
+    low, high = 0, _upper_bound(graph, item_name, on_hand)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if is_craftable_from(graph, {item_name: middle}, on_hand):
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _solve_milp(
+    graph: RecipeGraph, weights: Dict[str, float], on_hand: Dict[str, float]
+) -> Dict[str, int]:
+    """
+    Solve a target mix as a mixed integer program with scipy.
+
+    There is one integer variable per target, one integer crafts variable per
+    craftable item and one variable per owned item for the amount used. Every
+    item must be produced or taken from stock at least as often as it is
+    consumed. Crafts are whole, else a recipe yielding two units could be run
+    half a time for one unit.
+    """
+    targets = list(weights)
+    nodes = set()
+    for item_name in targets:
+        nodes.update(graph.expand({item_name: 1}))
+    nodes = sorted(graph.index[item_name] for item_name in nodes)
+    crafted = [node for node in nodes if graph.children[node]]
+    owned = [node for node in nodes if on_hand.get(graph.names[node], 0) > 0]
+
+    columns: List[Tuple[str, int]] = [("target", graph.index[t]) for t in targets]
+    columns += [("craft", node) for node in crafted]
+    columns += [("stock", node) for node in owned]
+    column_of = {column: position for position, column in enumerate(columns)}
+    row_of = {node: position for position, node in enumerate(nodes)}
+
+    matrix = [[0.0] * len(columns) for _ in nodes]
+    for node in crafted:
+        column = column_of[("craft", node)]
+        matrix[row_of[node]][column] += graph.yields[node]
+        for child, quantity in graph.children[node]:
+            matrix[row_of[child]][column] -= quantity
+    for node in owned:
+        matrix[row_of[node]][column_of[("stock", node)]] = 1.0
+    for item_name in targets:
+        node = graph.index[item_name]
+        matrix[row_of[node]][column_of[("target", node)]] -= 1.0
+
+    upper = [math.inf] * len(columns)
+    for node in owned:
+        upper[column_of[("stock", node)]] = on_hand[graph.names[node]]
+    objective = [-weights[item_name] for item_name in targets]
+    objective += [0.0] * (len(columns) - len(targets))
+    integrality = [1] * (len(targets) + len(crafted)) + [0] * len(owned)
+
+    result = milp(
+        objective,
+        constraints=LinearConstraint(matrix, lb=0.0, ub=math.inf),
+        integrality=integrality,
+        bounds=Bounds(0.0, upper),
+    )
+    if not result.success:
+        logging.warning("Could not solve target mix: %s", result.message)
+        return {item_name: 0 for item_name in targets}
+    return {
+        item_name: int(round(result.x[position]))
+        for position, item_name in enumerate(targets)
+    }
+
+
+def _search(
+    graph: RecipeGraph, weights: Dict[str, float], on_hand: Dict[str, float]
+) -> Dict[str, int]:
+    """
+    Solve a target mix with a depth first branch and bound search.
+
+    Amounts are tried from the largest down. The remaining targets are bounded
+    by what each could make on its own from the stock left over, which prunes
+    most branches, but the search is exponential in the number of targets.
+    """
+    targets = sorted(weights, key=lambda item_name: -weights[item_name])
+    best: Dict[str, Any] = {"value": -1.0, "amounts": {}}
+
+    def remaining_stock(amounts: Dict[str, int]) -> Dict[str, float]:
+        _, used = graph.net_requirements(amounts, on_hand)
+        return {
+            item_name: owned - used.get(item_name, 0)
+            for item_name, owned in on_hand.items()
+        }
+
+    def visit(position: int, amounts: Dict[str, int], value: float) -> None:
+        if position == len(targets):
+            if value > best["value"]:
+                best["value"] = value
+                best["amounts"] = dict(amounts)
+            return
+
+        stock = remaining_stock(amounts)
+        limits = {
+            item_name: max_craftable(graph, item_name, stock)
+            for item_name in targets[position:]
+        }
+        item_name = targets[position]
+        later = sum(
+            weights[later_name] * limits[later_name]
+            for later_name in targets[position + 1 :]
+        )
+        for amount in range(limits[item_name], -1, -1):
+            if value + weights[item_name] * amount + later <= best["value"]:
+                break
+            candidate = {**amounts, item_name: amount}
+            if amount and not is_craftable_from(graph, candidate, on_hand):
+                continue
+            visit(position + 1, candidate, value + weights[item_name] * amount)
+
+    visit(0, {}, 0.0)
+    return {item_name: best["amounts"].get(item_name, 0) for item_name in weights}
+
+
+def max_craftable_mix(
+    graph: RecipeGraph, weights: Dict[str, float], on_hand: Dict[str, float]
+) -> Tuple[Dict[str, int], str]:
+    """
+    Find the amounts of several targets that maximise their weighted total.
+
+    Args:
+        graph (RecipeGraph): The compiled recipes of a game.
+        weights (dict): Value of one crafted unit of each target.
+        on_hand (dict): Amount of each item already owned.
+
+    Returns:
+        tuple: A tuple containing:
+            - amounts (dict): Amount of each target to craft.
+            - method (str): "bottleneck", "milp" or "search".
+    """
+    amounts = {item_name: 0 for item_name in weights}
+    weights = {
+        item_name: weight
+        for item_name, weight in weights.items()
+        if weight > 0 and graph.is_craftable(item_name)
+    }
+    on_hand = {name: owned for name, owned in on_hand.items() if name not in weights}
+
+    if len(weights) <= 1:
+        method = "bottleneck"
+        for item_name in weights:
+            amounts[item_name] = max_craftable(graph, item_name, on_hand)
+    elif milp is not None:
+        method = "milp"
+        amounts.update(_solve_milp(graph, weights, on_hand))
+    else:
+        method = "search"
+        amounts.update(_search(graph, weights, on_hand))
+    return amounts, method
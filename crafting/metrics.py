@@ -0,0 +1,136 @@
+"""In-process counters, gauges and histograms rendered in Prometheus text format."""
+
+import threading
+from typing import Callable, Dict, Iterator, List, Tuple
+
+Sample = Tuple[str, Dict[str, str], float]
+
+# Latency buckets in seconds.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS: List["Counter"] = []
+COLLECTORS: List[Callable[[], None]] = []
+
+
+class Counter:
+    """A value per combination of label values that only goes up."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        METRICS.append(self)
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        """Increase the value for the given label values."""
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self) -> Iterator[Sample]:
+        """Yield the name, labels and value of every sample."""
+        with self._lock:
+            values = list(self.values.items())
+        for label_values, value in values:
+            yield self.name, dict(zip(self.labels, label_values)), value
+
+
+class Gauge(Counter):
+    """A value per combination of label values that can go up and down."""
+
+    kind = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1) -> None:
+        """Decrease the value for the given label values."""
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values: str, value: float) -> None:
+        """Replace the value for the given label values."""
+        with self._lock:
+            self.values[label_values] = value
+
+    def clear(self) -> None:
+        """Remove all values, for gauges that are rebuilt on every scrape."""
+        with self._lock:
+            self.values.clear()
+
+
+class Histogram(Counter):
+    """Counts of observed values per bucket, plus their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self.observations: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """Add an observed value for the given label values."""
+        with self._lock:
+            # Non-cumulative bucket counts, followed by +Inf, sum and count.
+            counts = self.observations.get(label_values)
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 3)
+                self.observations[label_values] = counts
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[position] += 1
+                    break
+            else:
+                counts[len(self.buckets)] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            observations = [
+                (key, list(counts)) for key, counts in self.observations.items()
+            ]
+        for label_values, counts in observations:
+            labels = dict(zip(self.labels, label_values))
+            cumulative = 0
+            bounds = [format_value(bound) for bound in self.buckets] + ["+Inf"]
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", {**labels, "le": bound}, cumulative
+            yield f"{self.name}_sum", labels, counts[-2]
+            yield f"{self.name}_count", labels, counts[-1]
+
+
+def format_value(value: float) -> str:
+    """Format a number the way Prometheus expects it."""
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape(value: str) -> str:
+    """Escape a label value."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render() -> str:
+    """Run the collectors and return all metrics in Prometheus text format."""
+    for collector in COLLECTORS:
+        collector()
+
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            if labels:
+                pairs = ",".join(f'{key}="{escape(labels[key])}"' for key in labels)
+                name = f"{name}{{{pairs}}}"
+            lines.append(f"{name} {format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,180 @@
+"""Serve requests from pre-forked worker processes sharing one listening socket."""
+
+import logging
+import logging.handlers
+import os
+import signal
+import socketserver
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Seconds between checks whether the workers have to be replaced.
+POLL_INTERVAL = 2.0
+
+
+class PreforkServer:
+    """
+    Runs a socket server in worker processes forked from a loaded parent.
+
+    The parent binds the socket and loads everything the workers need before
+    forking them, so the loaded data is shared copy-on-write. Each worker
+    accepts connections on the shared socket. A reload, on SIGHUP or when the
+    version changes, loads again in the parent and forks a new generation of
+    workers before the old workers are told to stop. Old workers finish the
+    request they are handling, so no request is dropped while a new version
+    replaces the old one. Workers that die are replaced.
+    """
+
+    def __init__(
+        self,
+        server: socketserver.BaseServer,
+        processes: int,
+        load: Callable[[], None],
+        version: Callable[[], Any] = lambda: None,
+        setup_logging: Optional[
+            Callable[[], Optional[logging.handlers.QueueListener]]
+        ] = None,
+        poll_interval: float = POLL_INTERVAL,
+    ):
+        """
+        Args:
+            server (BaseServer): The bound server, run by every worker.
+            processes (int): Number of workers per generation.
+            load (callable): Loads the data shared by the workers.
+            version (callable): Returns the version of the loaded data, a
+                new generation of workers is started when it changes.
+            setup_logging (callable): Configures logging in a new worker and
+                returns its queue listener, if any, to flush on exit.
+            poll_interval (float): Seconds between checks of the version.
+        """
+        self.server = server
+        self.processes = processes
+        self.load = load
+        self.version = version
+        self.setup_logging = setup_logging
+        self.poll_interval = poll_interval
+        self.generation = 0
+        self.workers: Dict[int, int] = {}  # pid to generation
+        self.reload_requested = False
+        self.stopping = False
+
+    def serve_forever(self) -> None:
+        """Fork the workers and supervise them until SIGTERM or SIGINT."""
+        signal.signal(signal.SIGHUP, self._request_reload)
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        # Workers that find no waiting connection go back to waiting instead
+        # of blocking in accept, where they could not be stopped.
+        self.server.socket.setblocking(False)
+
+        self.load()
+        loaded_version = self.version()
+        self._spawn()
+        try:
+            while not self.stopping:
+                time.sleep(self.poll_interval)
+                self._reap()
+                if self.stopping:
+                    break
+                current_version = self.version()
+                if self.reload_requested or current_version != loaded_version:
+                    self.reload_requested = False
+                    self.reload()
+                    loaded_version = current_version
+        finally:
+            self._stop(list(self.workers))
+            self.server.server_close()
+
+    def reload(self) -> None:
+        """Load again and replace all workers by a new generation."""
+        logging.info("Reloading generation %s.", self.generation + 1)
+        self.load()
+        old_workers = list(self.workers)
+        self.generation += 1
+        self._spawn()
+        for pid in old_workers:
+            self._signal(pid, signal.SIGTERM)
+
+    def _request_reload(self, *_) -> None:
+        self.reload_requested = True
+
+    def _request_stop(self, *_) -> None:
+        self.stopping = True
+
+    def _spawn(self) -> None:
+        """Fork workers until the current generation is complete."""
+        running = sum(1 for gen in self.workers.values() if gen == self.generation)
+        if running >= self.processes:
+            return
+        for _ in range(self.processes - running):
+            pid = os.fork()
+            if pid == 0:
+                code = 1
+                try:
+                    self._work()
+                    code = 0
+                except BaseException:
+                    logging.exception("Worker %s failed.", os.getpid())
+                finally:
+                    # Never return into the supervisor loop of the parent.
+                    os._exit(code)
+            self.workers[pid] = self.generation
+        logging.info(
+            "Generation %s serving from %s processes.", self.generation, self.processes
+        )
+
+    def _work(self) -> None:
+        """Serve in a forked worker until it is told to stop."""
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        # Ctrl+C reaches the whole process group, the parent stops workers.
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        # shutdown waits for serve_forever, so it must run on another thread.
+        signal.signal(
+            signal.SIGTERM,
+            lambda *_: threading.Thread(target=self.server.shutdown).start(),
+        )
+        listener = self.setup_logging() if self.setup_logging else None
+        try:
+            # Told to stop by the handler of the parent, before forking ended.
+            if not self.stopping:
+                self.server.serve_forever()
+        finally:
+            if listener is not None:
+                listener.stop()
+
+    def _reap(self) -> None:
+        """Forget exited workers and replace those of the current generation."""
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                break
+            if pid == 0:
+                break
+            generation = self.workers.pop(pid, None)
+            if generation == self.generation and not self.stopping:
+                logging.warning(
+                    "Worker %s exited with status %s, replacing it.", pid, status
+                )
+        if not self.stopping:
+            self._spawn()
+
+    def _stop(self, pids) -> None:
+        """Tell workers to stop and wait until they finished their requests."""
+        for pid in pids:
+            self._signal(pid, signal.SIGTERM)
+        for pid in pids:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+            self.workers.pop(pid, None)
+
+    @staticmethod
+    def _signal(pid: int, signalnum: int) -> None:
+        try:
+            os.kill(pid, signalnum)
+        except ProcessLookupError:
+            pass
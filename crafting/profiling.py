@@ -0,0 +1,140 @@
+"""Per-stage timings, counters and optional cProfile/tracemalloc captures."""
+
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+STAGES = "stages"
+CPROFILE = "cprofile"
+TRACEMALLOC = "tracemalloc"
+MODES = (STAGES, CPROFILE, TRACEMALLOC)
+
+_local = threading.local()
+
+
+class Recorder:
+    """
+    Collects timings and counters for the current thread while it is active.
+
+    Stages are only timed while a recorder is active, otherwise `span` and
+    `count` return immediately, so instrumented code pays close to nothing.
+    """
+
+    def __init__(self, modes: List[str] = (STAGES,)):
+        self.modes = [mode for mode in modes if mode in MODES]
+        self.spans: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.report = ""
+        self._profiler: Optional[cProfile.Profile] = None
+
+    def __enter__(self) -> "Recorder":
+        self._previous = getattr(_local, "recorder", None)
+        _local.recorder = self
+        if TRACEMALLOC in self.modes:
+            tracemalloc.start()
+        if CPROFILE in self.modes:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.add_span("total", time.perf_counter() - self._start)
+        reports = []
+        if self._profiler:
+            self._profiler.disable()
+            output = io.StringIO()
+            stats = pstats.Stats(self._profiler, stream=output)
+            stats.sort_stats("cumulative").print_stats(25)
+            reports.append(output.getvalue())
+        if TRACEMALLOC in self.modes:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            lines = [f"Peak memory: {peak / 1024:.0f} KiB"]
+            for statistic in snapshot.statistics("lineno")[:15]:
+                lines.append(str(statistic))
+            reports.append("\n".join(lines))
+        self.report = "\n\n".join(reports)
+        _local.recorder = self._previous
+
+    def add_span(self, name: str, seconds: float) -> None:
+        """Add the duration of one run of a stage."""
+        calls_and_seconds = self.spans.setdefault(name, [0, 0.0])
+        calls_and_seconds[0] += 1
+        calls_and_seconds[1] += seconds
+
+    def server_timing(self) -> str:
+        """Return the stages so far as the value of a Server-Timing header."""
+        return ", ".join(
+            f"{name};dur={seconds * 1000:.2f}"
+            for name, (_, seconds) in self.spans.items()
+        )
+
+    def format_for_text_display(self) -> str:
+        """Format the stage breakdown and counters for printing."""
+        lines = ["Stage breakdown:"]
+        for name, (calls, seconds) in self.spans.items():
+            lines.append(f"{name}: {seconds * 1000:.2f} ms, calls: {calls}")
+        if self.counters:
+            lines.append("Counters:")
+            for name, value in self.counters.items():
+                lines.append(f"{name}: {value}")
+        if self.report:
+            lines.extend(["", self.report])
+        return "\n".join(lines)
+
+
+class _Span:
+    """Times a stage into the recorder that was active when it was created."""
+
+    __slots__ = ("recorder", "name", "start")
+
+    def __init__(self, recorder: Recorder, name: str):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self.recorder.add_span(self.name, time.perf_counter() - self.start)
+
+
+class _NoSpan:
+    """Does nothing, used while no recorder is active."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def current() -> Optional[Recorder]:
+    """Return the active recorder of this thread, if any."""
+    return getattr(_local, "recorder", None)
+
+
+def span(name: str):
+    """Return a context manager timing a stage, if a recorder is active."""
+    recorder = getattr(_local, "recorder", None)
+    if recorder is None:
+        return _NO_SPAN
+    return _Span(recorder, name)
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Increase a counter, if a recorder is active."""
+    recorder = getattr(_local, "recorder", None)
+    if recorder is not None:
+        recorder.counters[name] = recorder.counters.get(name, 0) + amount
@@ -0,0 +1,109 @@
+"""Rank craftable items by the profit of selling them to vendors."""
+
+import logging
+from typing import Any, Collection, Dict, List, Union
+
+# internal
+from crafting.costs import plan_costs
+from crafting.graph import RecipeGraph
+
+
+def crafting_steps(graph: RecipeGraph) -> List[float]:
+    """
+    Return the number of crafts needed to make one unit of every item.
+
+    Computed in one pass over the topological order and cached on the graph.
+    """
+    steps = graph.cache.get("crafting_steps")
+    if steps is None:
+        steps = [0.0] * len(graph)
+        for node in graph.order:
+            edges = graph.children[node]
+            if edges:
+                total = 1.0
+                for child, quantity in edges:
+                    total += steps[child] * quantity
+                steps[node] = total / graph.yields[node]
+        graph.cache["crafting_steps"] = steps
+    return steps
+
+
+def profit_report(
+    graph: RecipeGraph,
+    sources: Collection[str] = (),
+    items: Collection[str] = (),
+    sort_by: str = "unit",
+) -> List[Dict[str, Any]]:
+    """
+    Calculate the margin of every craftable item, most profitable first.
+
+    The input cost is the cost of crafting everything down to the base items,
+    as used for the savings of the cost plan. Items without a sell_to_vendor
+    price have no margin and are listed last.
+
+    Args:
+        graph (RecipeGraph): The compiled recipes of a game.
+        sources (collection): Only report items from these sources.
+        items (collection): Only report these items, e.g. a specialisation.
+        sort_by (str): Rank by margin per "unit" or per crafting "step".
+
+    Returns:
+        list: One dict per craftable item with its costs and margins.
+    """
+    plan = plan_costs(graph)
+    steps = crafting_steps(graph)
+    sources = {source.lower() for source in sources}
+
+    rows = []
+    for node, item_name in enumerate(graph.names):
+        if not graph.children[node]:
+            continue
+        if items and item_name not in items:
+            continue
+        recipe = graph.recipe(item_name)
+        source = recipe.get("source")
+        if sources and (source is None or source.lower() not in sources):
+            continue
+
+        input_cost = plan.crafted_costs[item_name]
+        sell_price = recipe.get("sell_to_vendor")
+        margin = margin_per_step = None
+        if sell_price is not None:
+            margin = sell_price - input_cost
+            margin_per_step = margin / steps[node]
+        rows.append(
+            {
+                "name": item_name,
+                "source": source,
+                "sell_to_vendor": sell_price,
+                "input_cost": input_cost,
+                "crafting_steps": steps[node],
+                "margin": margin,
+                "margin_per_step": margin_per_step,
+            }
+        )
+
+    key = "margin_per_step" if sort_by == "step" else "margin"
+    rows.sort(key=lambda row: (row[key] is None, -(row[key] or 0), row["name"]))
+    logging.debug("Ranked %s craftable items by %s.", len(rows), key)
+    return rows
+
+
+def _format_number(value: Union[float, None]) -> str:
+    return "-" if value is None else f"{value:.2f}"
+
+
+def format_profit_report(rows: List[Dict[str, Any]]) -> str:
+    """Format a profit report for printing to stdout."""
+    lines = []
+    for rank, row in enumerate(rows, start=1):
+        lines.append(
+            f"{rank}. {row['name']}: "
+            f"margin: {_format_number(row['margin'])}, "
+            f"margin per step: {_format_number(row['margin_per_step'])}, "
+            f"sell_to_vendor: {_format_number(row['sell_to_vendor'])}, "
+            f"input cost: {_format_number(row['input_cost'])}, "
+            f"crafting steps: {row['crafting_steps']:g}"
+            + (f", source: {row['source']}" if row["source"] else "")
+        )
+    return "\n".join(lines)
@@ -0,0 +1,285 @@
+"""Render shopping lists as text, Markdown, CSV or HTML tables."""
+
+import csv
+import html
+from abc import ABC, abstractmethod
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Sequence, TextIO, Tuple
+
+# internal
+from crafting.serializer import dumps_str
+
+# Keys shown first and in this order, and keys that are never shown.
+KEY_ORDER = ("quantity", "rarity", "source", "wiki")
+IGNORE_KEYS = ("name", "items")
+
+# A titled table of item names and their details.
+Section = Tuple[str, Dict[str, Dict[str, Any]]]
+
+
+def sections(shopping_list) -> List[Section]:
+    """Return the tables of a shopping list in the order they are shown."""
+    result = [("You selected", shopping_list.target_items)]
+    if shopping_list.on_hand_used:
+        owned = {
+            item_name: {"quantity": quantity}
+            for item_name, quantity in shopping_list.on_hand_used.items()
+        }
+        result.append(("Use these items you already own", owned))
+    result.append(("Gather these items", shopping_list.items))
+    result.append(("Craft these intermediate items", shopping_list.intermediate_steps))
+    return result
+
+
+def totals(shopping_list) -> List[Tuple[str, float]]:
+    """Return the labelled cost totals of a minimum cost shopping list."""
+    if shopping_list.total_cost is None:
+        return []
+    return [
+        ("Total cost", shopping_list.total_cost),
+        ("Savings compared to crafting everything", shopping_list.savings),
+    ]
+
+
+class ColumnLayout:
+    """
+    Orders the keys shown for each row.
+
+    Rows of one game share a few sets of keys, so the order is computed once
+    per distinct set of keys instead of once per row.
+    """
+
+    def __init__(
+        self,
+        key_order: Sequence[str] = KEY_ORDER,
+        ignore_keys: Sequence[str] = IGNORE_KEYS,
+    ):
+        self.key_order = tuple(key_order)
+        self.ignore_keys = frozenset(ignore_keys)
+        self._layouts: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+    def keys(self, details: Dict[str, Any]) -> Tuple[str, ...]:
+        """Return the keys of a row to show, in display order."""
+        signature = tuple(details)
+        layout = self._layouts.get(signature)
+        if layout is None:
+            primary = [key for key in self.key_order if key in details]
+            secondary = [
+                key
+                for key in signature
+                if key not in self.key_order and key not in self.ignore_keys
+            ]
+            layout = tuple(primary + secondary)
+            self._layouts[signature] = layout
+        return layout
+
+    def columns(self, rows: Iterable[Dict[str, Any]]) -> Tuple[str, ...]:
+        """Return the union of the keys of all rows, in display order."""
+        seen = set()
+        union: Dict[str, None] = {}
+        for details in rows:
+            signature = tuple(details)
+            if signature not in seen:
+                seen.add(signature)
+                union.update(dict.fromkeys(self.keys(details)))
+        primary = [key for key in self.key_order if key in union]
+        return tuple(primary + [key for key in union if key not in self.key_order])
+
+
+class Renderer(ABC):
+    """
+    Writes the tables of a shopping list to a text stream row by row.
+
+    Subclasses implement the format in section and may override begin,
+    summary and end. Rows are written as they are formatted, so memory use
+    does not grow with the size of the list.
+    """
+
+    def __init__(
+        self,
+        stream: TextIO,
+        key_order: Sequence[str] = KEY_ORDER,
+        ignore_keys: Sequence[str] = IGNORE_KEYS,
+    ):
+        self.stream = stream
+        self.layout = ColumnLayout(key_order, ignore_keys)
+
+    def render(self, shopping_list) -> None:
+        """Write all tables and cost totals of a shopping list."""
+        self.render_tables(sections(shopping_list), totals(shopping_list))
+
+    def render_tables(
+        self,
+        tables: Sequence[Section],
+        labelled_totals: Sequence[Tuple[str, float]] = (),
+    ) -> None:
+        """Write titled tables followed by labelled totals."""
+        self.begin()
+        for number, (title, rows) in enumerate(tables):
+            self.section(number, title, rows)
+        self.summary(labelled_totals)
+        self.end()
+
+    def begin(self) -> None:
+        pass
+
+    @abstractmethod
+    def section(self, number: int, title: str, rows: Dict[str, Any]) -> None:
+        """Write one titled table, number counts the tables written before."""
+
+    def summary(self, labelled_totals: Sequence[Tuple[str, float]]) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    @staticmethod
+    def cell(value: Any) -> str:
+        """Format a value for a table cell."""
+        if value is None:
+            return ""
+        if isinstance(value, (dict, list)):
+            return dumps_str(value)
+        return str(value)
+
+
+class TextRenderer(Renderer):
+    """Lines of "name: key: value, ..." below each title, as printed to stdout."""
+
+    def section(self, number: int, title: str, rows: Dict[str, Any]) -> None:
+        write = self.stream.write
+        if number:
+            write("\n\n")
+        write(f"{title}:")
+        if not rows:
+            write("\n")
+        for item_name in sorted(rows):
+            write("\n")
+            write(self.line(item_name, rows[item_name]))
+
+    def line(self, item_name: str, details: Dict[str, Any]) -> str:
+        """Format one item as a line of text."""
+        pairs = ", ".join(f"{key}: {details[key]}" for key in self.layout.keys(details))
+        return f"{item_name}: {pairs}"
+
+    def rows(self, rows: Dict[str, Any]) -> None:
+        """Write only the lines of some items, without title."""
+        for item_name in sorted(rows):
+            self.stream.write(self.line(item_name, rows[item_name]))
+            self.stream.write("\n")
+
+    def summary(self, labelled_totals: Sequence[Tuple[str, float]]) -> None:
+        for number, (label, value) in enumerate(labelled_totals):
+            self.stream.write("\n" if number else "\n\n")
+            self.stream.write(f"{label}: {value:.2f}")
+
+    def end(self) -> None:
+        self.stream.write("\n")
+
+
+class MarkdownRenderer(Renderer):
+    """A heading and a pipe table per non-empty table."""
+
+    def section(self, number: int, title: str, rows: Dict[str, Any]) -> None:
+        if not rows:
+            return
+        write = self.stream.write
+        columns = self.layout.columns(rows.values())
+        write(f"## {title}\n\n")
+        write("| " + " | ".join(("name",) + columns) + " |\n")
+        write("|" + " --- |" * (len(columns) + 1) + "\n")
+        for item_name in sorted(rows):
+            details = rows[item_name]
+            cells = [item_name] + [details.get(key) for key in columns]
+            write("| " + " | ".join(self.escape(cell) for cell in cells) + " |\n")
+        write("\n")
+
+    def escape(self, value: Any) -> str:
+        return self.cell(value).replace("|", "\\|").replace("\n", " ")
+
+    def summary(self, labelled_totals: Sequence[Tuple[str, float]]) -> None:
+        for label, value in labelled_totals:
+            self.stream.write(f"**{label}:** {value:.2f}  \n")
+
+
+class CsvRenderer(Renderer):
+    """
+    One table of all rows, the first column names the table of each row.
+
+    The columns are the union of the keys of all rows, found in a first pass
+    over the keys only. Totals are not part of the CSV output.
+    """
+
+    def render_tables(
+        self,
+        tables: Sequence[Section],
+        labelled_totals: Sequence[Tuple[str, float]] = (),
+    ) -> None:
+        self.columns = self.layout.columns(
+            chain.from_iterable(rows.values() for _, rows in tables)
+        )
+        self.writer = csv.writer(self.stream, lineterminator="\n")
+        self.writer.writerow(("section", "name") + self.columns)
+        super().render_tables(tables, labelled_totals)
+
+    def section(self, number: int, title: str, rows: Dict[str, Any]) -> None:
+        for item_name in sorted(rows):
+            details = rows[item_name]
+            self.writer.writerow(
+                [title, item_name]
+                + [self.cell(details.get(key)) for key in self.columns]
+            )
+
+
+class HtmlRenderer(Renderer):
+    """A standalone HTML document with a heading and a table per non-empty table."""
+
+    def begin(self) -> None:
+        self.stream.write(
+            '<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="UTF-8">\n'
+            "<title>Shopping list</title>\n</head>\n<body>\n"
+        )
+
+    def section(self, number: int, title: str, rows: Dict[str, Any]) -> None:
+        if not rows:
+            return
+        write = self.stream.write
+        columns = self.layout.columns(rows.values())
+        write(f"<h2>{html.escape(title)}</h2>\n<table>\n<thead>\n<tr>")
+        for column in ("name",) + columns:
+            write(f"<th>{html.escape(column)}</th>")
+        write("</tr>\n</thead>\n<tbody>\n")
+        for item_name in sorted(rows):
+            details = rows[item_name]
+            write("<tr>")
+            for cell in [item_name] + [details.get(key) for key in columns]:
+                write(f"<td>{html.escape(self.cell(cell))}</td>")
+            write("</tr>\n")
+        write("</tbody>\n</table>\n")
+
+    def summary(self, labelled_totals: Sequence[Tuple[str, float]]) -> None:
+        for label, value in labelled_totals:
+            self.stream.write(f"<p>{html.escape(label)}: {value:.2f}</p>\n")
+
+    def end(self) -> None:
+        self.stream.write("</body>\n</html>\n")
+
+
+RENDERERS = {
+    "text": TextRenderer,
+    "markdown": MarkdownRenderer,
+    "csv": CsvRenderer,
+    "html": HtmlRenderer,
+}
+
+
+def render(shopping_list, output_format: str, stream: TextIO) -> None:
+    """
+    Write a shopping list to a stream in one of the formats of RENDERERS.
+
+    Args:
+        shopping_list (ShoppingList): The list to render.
+        output_format (str): "text", "markdown", "csv" or "html".
+        stream (TextIO): Where the output is written as it is formatted.
+    """
+    RENDERERS[output_format](stream).render(shopping_list)
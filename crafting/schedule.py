@@ -0,0 +1,111 @@
+"""Turn the intermediate steps of a shopping list into an ordered build schedule."""
+
+import logging
+import math
+from typing import Any, Dict, List
+
+# internal
+from crafting.graph import RecipeGraph
+from crafting.serializer import dumps_str
+
+UNKNOWN_STATION = "unknown"
+
+
+class CraftingSchedule:
+    """
+    Crafts ordered into steps, each grouped by the station they are made at.
+
+    An item is scheduled one step after the latest of its crafted child items,
+    so all crafts within a step are independent and can run in parallel. The
+    station of a craft is the source of its recipe.
+    """
+
+    def __init__(self, graph: RecipeGraph, intermediate_steps: Dict[str, Any]):
+        self.steps: List[Dict[str, List[Dict[str, Any]]]] = []
+        self.leftovers: Dict[str, float] = {}
+
+        crafted = {
+            graph.index[item_name]: details.get("quantity", 1)
+            for item_name, details in intermediate_steps.items()
+            if graph.is_craftable(item_name)
+        }
+
+        # Depth first over the crafted items only, children before parents.
+        levels: Dict[int, int] = {}
+        for root in crafted:
+            stack = [root]
+            while stack:
+                node = stack[-1]
+                if node in levels:
+                    stack.pop()
+                    continue
+                pending = [
+                    child
+                    for child, _ in graph.children[node]
+                    if child in crafted and child not in levels
+                ]
+                if pending:
+                    stack.extend(pending)
+                    continue
+                levels[node] = 1 + max(
+                    (levels[c] for c, _ in graph.children[node] if c in crafted),
+                    default=-1,
+                )
+                stack.pop()
+
+        self.steps = [{} for _ in range(max(levels.values(), default=-1) + 1)]
+        for node, quantity in crafted.items():
+            item_name = graph.names[node]
+            recipe_yield = graph.yields[node]
+            crafts = math.ceil(quantity / recipe_yield)
+            leftover = crafts * recipe_yield - quantity
+            if leftover:
+                self.leftovers[item_name] = leftover
+
+            station = graph.recipe(item_name).get("source") or UNKNOWN_STATION
+            self.steps[levels[node]].setdefault(station, []).append(
+                {
+                    "name": item_name,
+                    "crafts": crafts,
+                    "quantity": quantity,
+                    "yield": recipe_yield,
+                }
+            )
+
+        for step in self.steps:
+            for crafts in step.values():
+                crafts.sort(key=lambda craft: craft["name"])
+        logging.debug("Scheduled %s crafts in %s steps.", len(crafted), len(self.steps))
+
+    def to_json(self) -> Dict[str, Any]:
+        """Return the schedule as JSON."""
+        return {
+            "steps": [
+                {station: step[station] for station in sorted(step)}
+                for step in self.steps
+            ],
+            "leftovers": self.leftovers,
+        }
+
+    def to_json_string(self) -> str:
+        """Return the schedule as a JSON formatted string."""
+        return dumps_str(self.to_json(), pretty=True, sort_keys=True)
+
+    def format_for_text_display(self) -> str:
+        """Format the schedule for printing to stdout."""
+        lines = []
+        for number, step in enumerate(self.steps, start=1):
+            lines.append(f"Step {number}:")
+            for station in sorted(step):
+                for craft in step[station]:
+                    lines.append(
+                        f"[{station}] {craft['name']}: crafts: {craft['crafts']}, "
+                        f"quantity: {craft['quantity']}"
+                    )
+            lines.append("")
+
+        if self.leftovers:
+            lines.append("Leftovers:")
+            for item_name, leftover in sorted(self.leftovers.items()):
+                lines.append(f"{item_name}: quantity: {leftover}")
+        return "\n".join(lines).rstrip("\n")
@@ -0,0 +1,163 @@
+"""JSON serialization with the fastest installed backend."""
+
+import json
+from typing import Any, BinaryIO, Iterator, Optional
+
+# internal
+from crafting.graph import RecipeGraph
+
+# orjson and ujson are optional, without them the standard library is used.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+if orjson is not None:
+    BACKEND = "orjson"
+elif ujson is not None:
+    BACKEND = "ujson"
+else:
+    BACKEND = "json"
+
+# Spaces per level of pretty output, the only indentation orjson supports.
+INDENT = 2
+COMPACT_SEPARATORS = (",", ":")
+# Size in bytes of the chunks yielded by iter_dumps.
+CHUNK_SIZE = 64 * 1024
+
+
+def dumps(
+    data: Any,
+    pretty: bool = False,
+    sort_keys: bool = False,
+    backend: Optional[str] = None,
+) -> bytes:
+    """
+    Serialize data to UTF-8 encoded JSON.
+
+    Compact output has no whitespace and is meant for API responses, pretty
+    output is indented for humans. Every backend produces the same text.
+
+    Args:
+        data: Dicts, lists, strings and numbers to serialize.
+        pretty (bool): Indent the output by INDENT spaces per level.
+        sort_keys (bool): Sort the keys of dicts.
+        backend (str): "orjson", "ujson" or "json", defaults to BACKEND.
+
+    Returns:
+        bytes: The JSON document.
+    """
+    backend = backend or BACKEND
+    if backend == "orjson":
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(data, option=option)
+    if backend == "ujson":
+        return ujson.dumps(
+            data,
+            indent=INDENT if pretty else 0,
+            sort_keys=sort_keys,
+            ensure_ascii=False,
+            escape_forward_slashes=False,
+        ).encode()
+    if pretty:
+        text = json.dumps(data, indent=INDENT, sort_keys=sort_keys, ensure_ascii=False)
+    else:
+        text = json.dumps(
+            data,
+            separators=COMPACT_SEPARATORS,
+            sort_keys=sort_keys,
+            ensure_ascii=False,
+        )
+    return text.encode()
+
+
+def dumps_str(data: Any, pretty: bool = False, sort_keys: bool = False) -> str:
+    """Serialize data to a JSON string, see dumps."""
+    return dumps(data, pretty, sort_keys).decode()
+
+
+def dump(data: Any, file: BinaryIO, pretty: bool = False) -> int:
+    """Write data as JSON to a file opened in binary mode, return the size."""
+    document = dumps(data, pretty)
+    file.write(document)
+    return len(document)
+
+
+def loads(document: Any) -> Any:
+    """Deserialize a JSON document given as bytes or str."""
+    if orjson is not None:
+        return orjson.loads(document)
+    if ujson is not None:
+        return ujson.loads(document)
+    return json.loads(document)
+
+
+def iter_dumps(data: Any, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Serialize data to compact JSON in chunks of about chunk_size bytes.
+
+    The members of a top level dict or list are encoded one at a time, so only
+    the largest member and the current chunk are held in memory at once.
+    """
+    if BACKEND == "json":
+        fragments = json.JSONEncoder(
+            separators=COMPACT_SEPARATORS, ensure_ascii=False
+        ).iterencode(data)
+        fragments = (fragment.encode() for fragment in fragments)
+    elif isinstance(data, dict):
+        fragments = _iter_members(
+            b"{",
+            (
+                dumps(key if isinstance(key, str) else str(key)) + b":" + dumps(value)
+                for key, value in data.items()
+            ),
+            b"}",
+        )
+    elif isinstance(data, (list, tuple)):
+        fragments = _iter_members(b"[", (dumps(value) for value in data), b"]")
+    else:
+        fragments = iter((dumps(data),))
+
+    chunk = bytearray()
+    for fragment in fragments:
+        chunk += fragment
+        if len(chunk) >= chunk_size:
+            yield bytes(chunk)
+            chunk.clear()
+    if chunk:
+        yield bytes(chunk)
+
+
+def _iter_members(
+    start: bytes, members: Iterator[bytes], end: bytes
+) -> Iterator[bytes]:
+    """Yield the encoded members of a container separated by commas."""
+    yield start
+    separator = b""
+    for member in members:
+        yield separator
+        yield member
+        separator = b","
+    yield end
+
+
+def dumps_graph(graph: RecipeGraph, backend: Optional[str] = None) -> bytes:
+    """
+    Serialize a compiled recipe graph without building a dict per item.
+
+    Items are addressed by their index in "names". "children" holds the
+    [child index, quantity per craft] edges and "yields" the amount one craft
+    produces of every item.
+    """
+    return dumps(
+        {"names": graph.names, "yields": graph.yields, "children": graph.children},
+        backend=backend,
+    )
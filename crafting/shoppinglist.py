@@ -1,8 +1,10 @@
 """Shopping List class to hold all required items."""
 
+import io
 import logging
-from json import dumps
-from typing import List, Dict, Any
+import math
+from itertools import chain
+from typing import List, Dict, Any, TextIO, Tuple, Union
 
 # 3rd party
 from yaml import safe_dump
@@ -10,6 +12,11 @@ from yaml import safe_dump
 # internal
 import crafting.common
 from crafting.common import *
+from crafting.costs import COST_KEYS, GATHER, cost_columns, plan_costs
+from crafting.graph import RecipeGraph
+from crafting.profiling import count, span
+from crafting.render import TextRenderer, render
+from crafting.serializer import dumps_str
 
 
 # Singleton class
@@ -17,14 +24,25 @@ class ShoppingList:
     """A shopping list holds all items required to craft the given item."""
 
     def __init__(
-        self, inventory: Dict[str, Dict[str, Any]], items: Dict[str, Any], amount: int
+        self,
+        inventory: Dict[str, Dict[str, Any]],
+        items: Dict[str, Any],
+        amount: int,
+        on_hand: Dict[str, float] = None,
     ):
+        self._costs: Union[Dict[str, Any], None] = None
+        self.graph: Union[RecipeGraph, None] = None
         self.items: Dict[str, Any] = {}
-        self.crafting_cost: float = 0.0
         self.target_items: Dict[str, Any] = {}
+        # Sum of the amounts of all target items.
         self.target_amount: int = amount
         self.intermediate_steps: Dict[str, Any] = {}
         self.inventory = inventory
+        self.decisions: Dict[str, str] = {}
+        self.total_cost: Union[float, None] = None
+        self.savings: Union[float, None] = None
+        self.on_hand: Dict[str, float] = on_hand or {}
+        self.on_hand_used: Dict[str, float] = {}
 
     @classmethod
     def create_empty(cls):
@@ -33,58 +51,142 @@ class ShoppingList:
         amount = 0  # Default amount
         return cls(inventory, items, amount)
 
-    def calculate_crafting_costs(self) -> None:
-        """Calculate all costs."""
-        for item_name, details in self.items.items():
-            recipe_cost = get_crafting_cost(item_name, self.inventory)
-            if recipe_cost is not None:
-                self.crafting_cost = self.crafting_cost + (
-                    recipe_cost * details.get("quantity")
-                )
-
-        for item_name, details in self.intermediate_steps.items():
-            recipe_cost = get_crafting_cost(item_name, self.inventory)
-            if recipe_cost is not None:
-                self.crafting_cost = self.crafting_cost + (
-                    recipe_cost * details.get("quantity")
-                )
-            logging.debug(
-                "Summing item crafting_cost for %s item/s in shopping list.", item_name
-            )
-
-    def calculate_buy_from_vendor(self) -> Dict[str, float]:
-        """Calculate the cost to buy each item from vendors and return a dictionary."""
-        buy_from_vendor = 0.0
-
-        # Process items
-        for item, details in self.items.items():
-            buy_cost = get_buy_from_vendor(item, self.inventory)
-            if buy_cost is not None:
-                buy_from_vendor += buy_cost * details.get("quantity")
-
-        # Process intermediate steps
-        for item, details in self.intermediate_steps.items():
-            buy_cost = get_buy_from_vendor(item, self.inventory)
-            if buy_cost is not None:
-                amount = details.get("quantity", 1)
-                buy_from_vendor += buy_cost * details.get("quantity")
-
-        logging.debug("Buy from vendor costs: %s", buy_from_vendor)
-
-        self.buy_from_vendor = buy_from_vendor
-        return buy_from_vendor
-
-    def calculate_sell_to_vendor(self) -> None:
-        """Calculate the total revenue from selling items to vendors."""
-        self.sell_to_vendor = 0.0  # Initialize as a float
-
-        # Process target items
-        for item in self.target_items:
-            sell_cost = get_sell_to_vendor(item, self.inventory)
-            if sell_cost is not None:
-                self.sell_to_vendor += sell_cost * self.target_amount
-
-        logging.debug("Total sell_to_vendor revenue: %s", self.sell_to_vendor)
+    # Assigning any of these lists drops the cached costs. Code changing them
+    # in place has to call invalidate_costs itself.
+    @property
+    def items(self) -> Dict[str, Any]:
+        return self._items
+
+    @items.setter
+    def items(self, items: Dict[str, Any]) -> None:
+        self._items = items
+        self.invalidate_costs()
+
+    @property
+    def intermediate_steps(self) -> Dict[str, Any]:
+        return self._intermediate_steps
+
+    @intermediate_steps.setter
+    def intermediate_steps(self, intermediate_steps: Dict[str, Any]) -> None:
+        self._intermediate_steps = intermediate_steps
+        self.invalidate_costs()
+
+    @property
+    def target_items(self) -> Dict[str, Any]:
+        return self._target_items
+
+    @target_items.setter
+    def target_items(self, target_items: Dict[str, Any]) -> None:
+        self._target_items = target_items
+        self.invalidate_costs()
+
+    def invalidate_costs(self) -> None:
+        """Drop the cached costs, they are aggregated again on next use."""
+        self._costs = None
+
+    @property
+    def costs(self) -> Dict[str, Any]:
+        """
+        Cost totals of the shopping list with breakdowns per item and source.
+
+        Aggregated on first use in one pass over the list and cached until the
+        list changes. Crafted items cost their crafting_cost per whole craft,
+        all other items their buy_from_vendor price, which is 0.0 for gathered
+        items. Target items earn their sell_to_vendor price.
+        """
+        if self._costs is None:
+            with span("aggregate_costs"):
+                self._costs = self._aggregate_costs()
+        return self._costs
+
+    @property
+    def crafting_cost(self) -> float:
+        """Crafting fees of all crafted items."""
+        return self.costs["crafting_cost"]
+
+    @property
+    def buy_from_vendor(self) -> float:
+        """Price of buying all items that are not crafted."""
+        return self.costs["buy_from_vendor"]
+
+    @property
+    def sell_to_vendor(self) -> float:
+        """Revenue of selling the target items to vendors."""
+        return self.costs["sell_to_vendor"]
+
+    def calculate_crafting_costs(self) -> float:
+        """Return the crafting fees of all crafted items."""
+        return self.crafting_cost
+
+    def calculate_buy_from_vendor(self) -> float:
+        """Return the price of buying all items that are not crafted."""
+        return self.buy_from_vendor
+
+    def calculate_sell_to_vendor(self) -> float:
+        """Return the revenue of selling the target items to vendors."""
+        return self.sell_to_vendor
+
+    def _aggregate_costs(self) -> Dict[str, Any]:
+        """Sum the costs of all items, per item and per source, in one pass."""
+        lookup = self._unit_prices
+        if self.graph is not None:
+            index = self.graph.index
+            yields = self.graph.yields
+            columns = list(zip(*cost_columns(self.graph)))
+
+            def lookup(item_name):
+                node = index.get(item_name)
+                if node is None:
+                    return self._unit_prices(item_name)
+                return (*columns[node], yields[node])
+
+        totals = dict.fromkeys(COST_KEYS, 0.0)
+        per_item: Dict[str, Dict[str, Any]] = {}
+        per_source: Dict[str, Dict[str, float]] = {}
+        steps = chain(
+            ((item_name, details, False) for item_name, details in self.items.items()),
+            (
+                (item_name, details, True)
+                for item_name, details in self.intermediate_steps.items()
+            ),
+        )
+        for item_name, details, crafted in steps:
+            crafting_cost, buy_cost, _, crafts_yield = lookup(item_name)
+            quantity = details.get("quantity", 1)
+            if crafted:
+                key = "crafting_cost"
+                cost = crafting_cost * math.ceil(quantity / crafts_yield)
+            else:
+                key = "buy_from_vendor"
+                cost = buy_cost * quantity
+            totals[key] += cost
+
+            source = details.get("source") or "unknown"
+            per_item[item_name] = {"quantity": quantity, "source": source, key: cost}
+            source_costs = per_source.setdefault(source, dict.fromkeys(COST_KEYS, 0.0))
+            source_costs[key] += cost
+
+        # Fully owned targets are in neither list, so they are summed apart.
+        for item_name, details in self.target_items.items():
+            sell_price = lookup(item_name)[2]
+            revenue = sell_price * details.get("quantity", self.target_amount)
+            totals["sell_to_vendor"] += revenue
+            item_costs = per_item.setdefault(item_name, {})
+            item_costs["sell_to_vendor"] = revenue
+            source = details.get("source") or "unknown"
+            source_costs = per_source.setdefault(source, dict.fromkeys(COST_KEYS, 0.0))
+            source_costs["sell_to_vendor"] += revenue
+
+        logging.debug("Aggregated costs of %s items: %s", len(per_item), totals)
+        return {**totals, "items": per_item, "sources": per_source}
+
+    def _unit_prices(self, item_name: str) -> Tuple[float, float, float, float]:
+        """Return the prices and yield of an item missing from the graph."""
+        recipe = self.inventory.get(item_name) or {}
+        crafting_cost = get_crafting_cost(item_name, self.inventory) or 0.0
+        buy_cost = get_buy_from_vendor(item_name, self.inventory) or 0.0
+        sell_price = get_sell_to_vendor(item_name, self.inventory) or 0.0
+        return crafting_cost, buy_cost, sell_price, recipe.get("quantity", 1) or 1
 
     def simplify(self) -> None:
         """Recursively replace intermediate crafted items with their components."""
@@ -127,6 +229,7 @@ class ShoppingList:
             del self.items[item_name]
 
         self.items.update(items_to_add)
+        self.invalidate_costs()
 
         # Recursively simplify if there were changes
         if items_to_add or items_to_remove:
@@ -157,6 +260,7 @@ class ShoppingList:
             del self.items[item_name]
 
         self.items.update(items_to_add)
+        self.invalidate_costs()
 
         # Recursively simplify if there were changes
         if items_to_add or items_to_remove:
@@ -164,6 +268,71 @@ class ShoppingList:
         else:
             logging.info("Nothing to simplify.")
 
+    def expand(self, graph: RecipeGraph, min_cost: bool = False) -> None:
+        """
+        Replace the target items with their components in a single pass.
+
+        Items in `on_hand` are used up before anything is crafted, so owned
+        intermediates also remove the need for their child items.
+
+        With `min_cost` every item that is cheaper to buy from a vendor than to
+        craft is bought instead, and the craft or buy decision, the total cost
+        and the savings compared to crafting everything are recorded.
+        """
+        logging.info("Expanding shopping list.")
+        self.graph = graph
+
+        targets = {
+            item_name: details.get("quantity", 1)
+            for item_name, details in self.target_items.items()
+        }
+        plan = None
+        if min_cost:
+            with span("cost_plan"):
+                plan = plan_costs(graph)
+        bought = plan.bought if plan else set()
+        with span("expand"):
+            required, self.on_hand_used = graph.net_requirements(
+                targets, self.on_hand, bought
+            )
+        count("nodes_expanded", len(required))
+
+        self.items = {}
+        self.intermediate_steps = {}
+        for item_name, quantity in required.items():
+            recipe = graph.recipe(item_name)
+            details = {"name": item_name, **recipe, "quantity": quantity}
+            if plan:
+                details["decision"] = plan.decisions.get(item_name, GATHER)
+            if graph.is_craftable(item_name) and item_name not in bought:
+                self.intermediate_steps[item_name] = details
+            else:
+                details.pop("items", None)
+                self.items[item_name] = details
+
+        if plan:
+            self.decisions = {
+                item_name: plan.decisions[item_name]
+                for item_name in required
+                if graph.is_craftable(item_name)
+            }
+            crafted, _ = graph.net_requirements(targets, self.on_hand)
+            self.total_cost = self._cost_of(graph, plan, required, bought)
+            self.savings = self._cost_of(graph, plan, crafted, ()) - self.total_cost
+
+    @staticmethod
+    def _cost_of(graph, plan, required, bought) -> float:
+        """Sum crafting fees of crafted items and prices of all other items."""
+        total = 0.0
+        for item_name, quantity in required.items():
+            if graph.is_craftable(item_name) and item_name not in bought:
+                crafting_cost = graph.recipe(item_name).get("crafting_cost") or 0.0
+                crafts = math.ceil(quantity / graph.yields[graph.index[item_name]])
+                total += crafting_cost * crafts
+            else:
+                total += plan.unit_costs.get(item_name, 0.0) * quantity
+        return total
+
     def get_recipe_recursive(self, item_name: str, details: dict = {}) -> None:
         recipe = self.inventory.get(item_name, {})
         recipe = process_child_items(recipe)
@@ -193,6 +362,17 @@ class ShoppingList:
             "target_items": self.target_items,
             "target_amount": self.target_amount,
         }
+        output["costs"] = self.costs
+        if self.on_hand:
+            output["on_hand_used"] = self.on_hand_used
+        if self.total_cost is not None:
+            output.update(
+                {
+                    "decisions": self.decisions,
+                    "total_cost": self.total_cost,
+                    "savings": self.savings,
+                }
+            )
         return output
 
     def to_json_string(self) -> str:
@@ -204,15 +384,29 @@ class ShoppingList:
             "target_items": self.target_items,
             "target_amount": self.target_amount,
         }
+        output["costs"] = self.costs
+        if self.on_hand:
+            output["on_hand_used"] = self.on_hand_used
+        if self.total_cost is not None:
+            output.update(
+                {
+                    "decisions": self.decisions,
+                    "total_cost": self.total_cost,
+                    "savings": self.savings,
+                }
+            )
 
         # Serialize to a JSON formatted string with sorting of keys and indentation
-        json_str = dumps(output, sort_keys=True, indent=4)
+        with span("serialize"):
+            json_str = dumps_str(output, pretty=True, sort_keys=True)
+        count("bytes_serialized", len(json_str))
         return json_str
 
     def inventory_to_json(self) -> str:
         """Return ShoppingList inventory as JSON."""
         return self.inventory
 
+    @staticmethod
     def get_ordered_keys(details, key_order, ignore_keys):
         # Keys in key_order that exist in details
         primary_keys = [k for k in key_order if k in details]
@@ -224,79 +418,29 @@ class ShoppingList:
 
     def format_for_text_display(self) -> str:
         """Format the ShoppingList for printing to stdout."""
-
-        # Define the desired order of keys
-        key_order = ["quantity", "rarity", "source", "wiki"]
-        ignore_keys = ["name", "items"]
-
-        # Format target items
-        target_items_lines = []
-        for item, details in sorted(self.target_items.items()):
-            ordered_keys = self.get_ordered_keys(details, key_order, ignore_keys)
-            kv_pairs = [f"{k}: {details[k]}" for k in ordered_keys]
-            target_items_lines.append(f"{item}: " + ", ".join(kv_pairs))
-        target_items_formatted = "\n".join(target_items_lines)
-
-        # Format main items
-        lines = []
-        for item, details in sorted(self.items.items()):
-            ordered_keys = self.get_ordered_keys(details, key_order, ignore_keys)
-            kv_pairs = [f"{k}: {details[k]}" for k in ordered_keys]
-            lines.append(f"{item}: " + ", ".join(kv_pairs))
-        items_formatted = "\n".join(lines)
-
-        # Format intermediate items
-        lines = []
-        for item, details in sorted(self.intermediate_steps.items()):
-            ordered_keys = self.get_ordered_keys(details, key_order, ignore_keys)
-            kv_pairs = [f"{k}: {details[k]}" for k in ordered_keys]
-            lines.append(f"{item}: " + ", ".join(kv_pairs))
-        intermediate_items_formatted = "\n".join(lines)
-
-        message_parts = [
-            f"You selected:",
-            target_items_formatted,
-            "",
-            f"Gather these items:",
-            items_formatted,
-            "",
-            "Craft these intermediate items:",
-            intermediate_items_formatted,
-        ]
-
-        # Join all parts into the final message.
-        message = "\n".join(message_parts)
-
-        return message
+        stream = io.StringIO()
+        self.render(stream)
+        return stream.getvalue()[:-1]
+
+    def render(self, stream: TextIO, output_format: str = "text") -> None:
+        """
+        Write the ShoppingList to a stream while formatting it.
+
+        Args:
+            stream (TextIO): Where the output is written.
+            output_format (str): One of RENDERERS, "text", "markdown", "csv"
+                or "html".
+        """
+        with span("render"):
+            render(self, output_format, stream)
 
     def format_recipes_for_text_display(self) -> str:
-        """Format the ShoppingList for printing to stdout."""
-
-        # Define the desired order of keys
-        key_order = ["rarity", "source", "wiki"]
-
-        # Construct the output with each item on a new line
-        items_dump = "\n".join(
-            f"{item}: "
-            + ", ".join(f"{k}: {details[k]}" for k in key_order if k in details)
-            + ", "
-            + ", ".join(
-                f"{k}: {details[k]}"
-                for k in details
-                if k not in key_order and k != "name" and k != "quantity"
-            )
-            for item, details in sorted(self.items.items())
-        ).rstrip(", ")
-
-        # Construct the message
-        items_message = "" if items_dump == "{}" or not items_dump else items_dump
-
-        # Base message parts.
-        message_parts = [
-            items_message,
-        ]
-
-        # Join all parts into the final message.
-        message = "\n".join(message_parts)
-
-        return message
+        """Format the recipes of the ShoppingList items for printing to stdout."""
+        stream = io.StringIO()
+        renderer = TextRenderer(
+            stream,
+            key_order=("rarity", "source", "wiki"),
+            ignore_keys=("name", "quantity"),
+        )
+        renderer.rows(self.items)
+        return stream.getvalue().rstrip("\n")
@@ -0,0 +1,65 @@
+"""Run concurrent identical calls once and hand every caller the same result."""
+
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+# internal
+from crafting.metrics import Counter
+
+SHARED = Counter(
+    "crafting_singleflight_shared_total",
+    "Calls that waited for an identical call in flight instead of computing.",
+    ("operation",),
+)
+
+
+class _Call:
+    """A call in flight, with its result or error once it is done."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """
+    Deduplicates calls by key while they are in flight.
+
+    The first caller of a key computes the result, callers arriving before it
+    is done wait and get the same result or exception. Nothing is kept after
+    the call finishes, so the key has to change whenever the inputs do, e.g.
+    by including the version of the recipe files. Shared results must be
+    treated as read-only.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, function: Callable[..., Any], *args, **kwargs) -> Any:
+        """Return the result of `function`, computed once per key in flight."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            SHARED.inc(str(key[0]) if isinstance(key, tuple) else str(key))
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function(*args, **kwargs)
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
@@ -0,0 +1,393 @@
+"""Recipes of a game imported into an indexed SQLite file for on-disk queries."""
+
+import logging
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 3rd party
+from yaml import safe_load
+
+# internal
+from crafting.graph import child_quantities
+from crafting.serializer import dumps, loads
+
+# Name of the store inside the recipe folder of a game.
+STORE_FILE = "recipes.sqlite"
+SCHEMA_VERSION = 1
+# Bytes of a store read through a memory map instead of read calls.
+MMAP_SIZE = 256 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE file (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    specialisation TEXT NOT NULL
+);
+CREATE TABLE item (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    file_id INTEGER REFERENCES file (id),
+    quantity REAL NOT NULL DEFAULT 1,
+    source TEXT,
+    craftable INTEGER NOT NULL DEFAULT 0,
+    position INTEGER,
+    recipe TEXT
+);
+CREATE TABLE file_item (
+    file_id INTEGER NOT NULL REFERENCES file (id),
+    position INTEGER NOT NULL,
+    item_id INTEGER NOT NULL REFERENCES item (id),
+    PRIMARY KEY (file_id, position)
+) WITHOUT ROWID;
+CREATE TABLE edge (
+    parent_id INTEGER NOT NULL REFERENCES item (id),
+    child_id INTEGER NOT NULL REFERENCES item (id),
+    quantity REAL NOT NULL,
+    PRIMARY KEY (parent_id, child_id)
+) WITHOUT ROWID;
+CREATE TABLE attribute (
+    item_id INTEGER NOT NULL REFERENCES item (id),
+    key TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (item_id, key)
+) WITHOUT ROWID;
+CREATE INDEX file_specialisation ON file (specialisation);
+CREATE INDEX file_item_item ON file_item (item_id);
+CREATE INDEX item_source ON item (source);
+CREATE INDEX item_file ON item (file_id);
+CREATE INDEX item_position ON item (position);
+CREATE INDEX edge_child ON edge (child_id);
+"""
+
+# Recipe files are found by name anywhere below the game, the first one wins.
+FIRST_FILE = "(SELECT MIN(id) FROM file WHERE specialisation = ?)"
+
+
+def recipe_version(game: str) -> Tuple[int, int]:
+    """Return the number and latest change of the recipe files of a game."""
+    path = Path(f"recipes/{game}")
+    changes = [entry.stat().st_mtime_ns for entry in path.rglob("*.yml")]
+    return (len(changes), max(changes, default=0))
+
+
+def store_path(game: str) -> Path:
+    """Return the path of the SQLite store of a game."""
+    return Path(f"recipes/{game}") / STORE_FILE
+
+
+def compile_store(game: str, path: Optional[Path] = None) -> Path:
+    """
+    Import all recipe files of a game into a SQLite store.
+
+    The store is written to a temporary file first and then moved into
+    place, so readers never see a half written store.
+
+    Args:
+        game (str): Folder of the game in recipes/.
+        path (Path): Where to write the store, defaults to store_path(game).
+
+    Returns:
+        Path: The written store.
+    """
+    path = path or store_path(game)
+    version = recipe_version(game)
+    temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    temporary.unlink(missing_ok=True)
+    connection = sqlite3.connect(temporary)
+    try:
+        connection.executescript(SCHEMA)
+        with connection:
+            _import_recipes(connection, game)
+            connection.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("schema_version", str(SCHEMA_VERSION)),
+                    ("recipe_version", dumps(version).decode()),
+                ],
+            )
+        connection.execute("ANALYZE")
+    finally:
+        connection.close()
+    os.replace(temporary, path)
+    logging.info("Compiled recipe store %s.", path)
+    return path
+
+
+def _import_recipes(connection: sqlite3.Connection, game: str) -> None:
+    """
+    Insert the files, items, edges and attributes of a game.
+
+    Files are read in the same order as load_recipes reads them, so a recipe
+    defined twice keeps its first position and its last definition.
+    """
+    item_ids: Dict[str, int] = {}
+
+    def item_id(item_name: str) -> int:
+        if item_name not in item_ids:
+            cursor = connection.execute(
+                "INSERT INTO item (name) VALUES (?)", (item_name,)
+            )
+            item_ids[item_name] = cursor.lastrowid
+        return item_ids[item_name]
+
+    positions = 0
+    for entry in Path(f"recipes/{game}").rglob("*.yml"):
+        content = safe_load(entry.read_text(encoding="utf-8"))
+        if not isinstance(content, list):
+            continue
+        file_id = connection.execute(
+            "INSERT INTO file (path, specialisation) VALUES (?, ?)",
+            (entry.as_posix(), entry.stem),
+        ).lastrowid
+        for details in content:
+            if not isinstance(details, dict) or "name" not in details:
+                continue
+            node = item_id(details["name"])
+            children = child_quantities(details)
+            positions += 1
+            connection.execute(
+                "INSERT INTO file_item (file_id, position, item_id) VALUES (?, ?, ?)",
+                (file_id, positions, node),
+            )
+            connection.execute(
+                "UPDATE item SET file_id = ?, quantity = ?, source = ?,"
+                " craftable = ?, position = COALESCE(position, ?), recipe = ?"
+                " WHERE id = ?",
+                (
+                    file_id,
+                    details.get("quantity", 1) or 1,
+                    details.get("source"),
+                    int(bool(children)),
+                    positions,
+                    dumps(details).decode(),
+                    node,
+                ),
+            )
+            connection.execute("DELETE FROM edge WHERE parent_id = ?", (node,))
+            connection.execute("DELETE FROM attribute WHERE item_id = ?", (node,))
+            connection.executemany(
+                "INSERT INTO edge (parent_id, child_id, quantity) VALUES (?, ?, ?)",
+                [
+                    (node, item_id(child_name), quantity)
+                    for child_name, quantity in children.items()
+                ],
+            )
+            connection.executemany(
+                "INSERT INTO attribute (item_id, key, value) VALUES (?, ?, ?)",
+                [
+                    (node, key, dumps(value).decode())
+                    for key, value in details.items()
+                    if key not in ("name", "items")
+                ],
+            )
+
+
+class RecipeStore:
+    """
+    Read-only queries against the SQLite store of a game.
+
+    Every query only reads the rows it needs, so nothing is loaded into
+    memory up front. Stores are opened per use and closed with `close` or
+    by using them as a context manager.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.connection = sqlite3.connect(
+            f"{path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False
+        )
+        # Read the store through a memory map, shared by all processes using it.
+        self.connection.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+
+    @classmethod
+    def open(cls, game: str) -> Optional["RecipeStore"]:
+        """Return the store of a game if it exists and matches the recipe files."""
+        path = store_path(game)
+        if not path.exists():
+            return None
+        store = cls(path)
+        if store.version() != recipe_version(game):
+            logging.warning(
+                "Recipe store %s is out of date, run --compile-store again.", path
+            )
+            store.close()
+            return None
+        return store
+
+    def __enter__(self) -> "RecipeStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def version(self) -> Tuple[int, int]:
+        """Return the recipe_version of the files the store was compiled from."""
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = 'recipe_version'"
+        ).fetchone()
+        return tuple(loads(row[0])) if row else (0, 0)
+
+    def recipes(self) -> Iterator[Dict[str, Any]]:
+        """Yield every recipe as written in the recipe files, in their order."""
+        cursor = self.connection.execute(
+            "SELECT recipe FROM item WHERE recipe IS NOT NULL ORDER BY position"
+        )
+        for (recipe,) in cursor:
+            yield loads(recipe)
+
+    def recipe(self, item_name: str) -> Dict[str, Any]:
+        """Return the recipe of an item as written, or an empty dict if unknown."""
+        row = self.connection.execute(
+            "SELECT recipe FROM item WHERE name = ?", (item_name,)
+        ).fetchone()
+        return loads(row[0]) if row and row[0] else {}
+
+    def __contains__(self, item_name: str) -> bool:
+        row = self.connection.execute(
+            "SELECT 1 FROM item WHERE name = ?", (item_name,)
+        ).fetchone()
+        return row is not None
+
+    def attributes(self, item_name: str, keys: Tuple[str, ...]) -> Dict[str, Any]:
+        """Return the given attributes of an item that it has."""
+        placeholders = ",".join("?" * len(keys))
+        cursor = self.connection.execute(
+            "SELECT attribute.key, attribute.value FROM attribute"
+            " JOIN item ON item.id = attribute.item_id"
+            f" WHERE item.name = ? AND attribute.key IN ({placeholders})",
+            (item_name, *keys),
+        )
+        return {key: loads(value) for key, value in cursor}
+
+    def specialisation_items(self, specialisation: str) -> List[str]:
+        """Return the names of all recipes in the first recipe file of that name."""
+        cursor = self.connection.execute(
+            "SELECT item.name FROM file_item"
+            " JOIN item ON item.id = file_item.item_id"
+            f" WHERE file_item.file_id = {FIRST_FILE} ORDER BY file_item.position",
+            (specialisation,),
+        )
+        return [name for (name,) in cursor]
+
+    def source_items(self, source: str) -> List[str]:
+        """Return the names of all items from a source, e.g. a crafting station."""
+        cursor = self.connection.execute(
+            "SELECT name FROM item WHERE source = ? ORDER BY name", (source,)
+        )
+        return [name for (name,) in cursor]
+
+    def craftable_names(
+        self, specialisation: Optional[str] = None, offset: int = 0, limit: int = -1
+    ) -> Tuple[int, List[str]]:
+        """Return the total and one page of sorted craftable item names."""
+        query = "FROM item WHERE item.craftable"
+        parameters: Tuple[Any, ...] = ()
+        if specialisation:
+            query += (
+                " AND item.id IN (SELECT item_id FROM file_item"
+                f" WHERE file_item.file_id = {FIRST_FILE})"
+            )
+            parameters = (specialisation,)
+        (total,) = self.connection.execute(
+            f"SELECT COUNT(*) {query}", parameters
+        ).fetchone()
+        cursor = self.connection.execute(
+            f"SELECT item.name {query} ORDER BY item.name LIMIT ? OFFSET ?",
+            (*parameters, limit, offset),
+        )
+        return total, [name for (name,) in cursor]
+
+    def child_items(self, item_name: str) -> List[Tuple[str, float]]:
+        """Return the name and quantity per craft of each child item of an item."""
+        cursor = self.connection.execute(
+            "SELECT child.name, edge.quantity FROM item AS parent"
+            " JOIN edge ON edge.parent_id = parent.id"
+            " JOIN item AS child ON child.id = edge.child_id"
+            " WHERE parent.name = ?",
+            (item_name,),
+        )
+        return [(name, _number(quantity)) for name, quantity in cursor]
+
+    def is_craftable(self, item_name: str) -> bool:
+        """Return whether the item is crafted from other items."""
+        row = self.connection.execute(
+            "SELECT craftable FROM item WHERE name = ?", (item_name,)
+        ).fetchone()
+        return bool(row and row[0])
+
+    def used_in(self, item_name: str) -> Dict[str, float]:
+        """Return the quantity of an item consumed per craft of each direct parent."""
+        cursor = self.connection.execute(
+            "SELECT parent.name, edge.quantity FROM item AS child"
+            " JOIN edge ON edge.child_id = child.id"
+            " JOIN item AS parent ON parent.id = edge.parent_id"
+            " WHERE child.name = ? ORDER BY parent.name",
+            (item_name,),
+        )
+        return {name: _number(quantity) for name, quantity in cursor}
+
+    def expand(self, item_name: str, amount: float = 1) -> Dict[str, float]:
+        """
+        Return the amount of every item needed to craft an item, with a recursive CTE.
+
+        Meant for one-off queries. Unlike RecipeGraph.expand, crafts are not
+        rounded up to whole crafts of recipes yielding more than one item.
+        """
+        cursor = self.connection.execute(
+            """
+            WITH RECURSIVE need (id, amount, depth) AS (
+                SELECT id, ?, 0 FROM item WHERE name = ?
+                UNION ALL
+                SELECT
+                    edge.child_id,
+                    need.amount * edge.quantity / parent.quantity,
+                    need.depth + 1
+                FROM need
+                JOIN item AS parent ON parent.id = need.id
+                JOIN edge ON edge.parent_id = need.id
+            )
+            SELECT item.name, SUM(need.amount) FROM need
+            JOIN item ON item.id = need.id
+            GROUP BY need.id ORDER BY MIN(need.depth), item.name
+            """,
+            (amount, item_name),
+        )
+        return {name: _number(quantity) for name, quantity in cursor}
+
+    def used_in_transitively(self, item_name: str) -> Dict[str, float]:
+        """
+        Return the quantity of an item consumed per craft of every item using it.
+
+        Same results as RecipeGraph.used_in_transitively, from a recursive CTE
+        that follows every path up from the item and adds up the quantities.
+        """
+        cursor = self.connection.execute(
+            """
+            WITH RECURSIVE user (id, per_craft) AS (
+                SELECT edge.parent_id, edge.quantity FROM item
+                JOIN edge ON edge.child_id = item.id
+                WHERE item.name = ?
+                UNION ALL
+                SELECT edge.parent_id, user.per_craft / item.quantity * edge.quantity
+                FROM user
+                JOIN item ON item.id = user.id
+                JOIN edge ON edge.child_id = user.id
+            )
+            SELECT item.name, SUM(user.per_craft) FROM user
+            JOIN item ON item.id = user.id
+            GROUP BY user.id ORDER BY item.name
+            """,
+            (item_name,),
+        )
+        return {name: _number(quantity) for name, quantity in cursor}
+
+
+def _number(value: float) -> float:
+    """Return whole numbers stored as REAL as int, like they are in the recipes."""
+    return int(value) if float(value).is_integer() else value
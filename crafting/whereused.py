@@ -0,0 +1,45 @@
+"""Report which recipes consume an item, directly and through intermediates."""
+
+from typing import Any, Dict, Union
+
+# internal
+from crafting.graph import RecipeGraph
+from crafting.store import RecipeStore
+
+
+def where_used(
+    graph: Union[RecipeGraph, RecipeStore], item_name: str
+) -> Dict[str, Any]:
+    """
+    Return the items crafted from an item and how much of it they consume.
+
+    Args:
+        graph (RecipeGraph or RecipeStore): The compiled recipes of a game,
+            both give the same report.
+        item_name (str): The ingredient to look up.
+
+    Returns:
+        dict: The item's name, the quantity per craft of each direct parent
+            ("used_in") and of each direct or indirect parent
+            ("used_in_transitively").
+    """
+    return {
+        "name": item_name,
+        "used_in": graph.used_in(item_name),
+        "used_in_transitively": graph.used_in_transitively(item_name),
+    }
+
+
+def format_where_used(report: Dict[str, Any]) -> str:
+    """Format a where used report for printing to stdout."""
+    if not report["used_in_transitively"]:
+        return f"{report['name']} is not used by any recipe."
+
+    lines = [f"{report['name']} is used directly in:"]
+    for parent, quantity in report["used_in"].items():
+        lines.append(f"{parent}: {quantity:g} per craft")
+    lines.append("")
+    lines.append("Including intermediates:")
+    for ancestor, quantity in report["used_in_transitively"].items():
+        lines.append(f"{ancestor}: {quantity:g} per craft")
+    return "\n".join(lines)
@@ -1,25 +1,86 @@
 #!/usr/bin/env python3
 """Calculate required base resources for crafting in games."""
 
+import sys
+
+if __name__ == "__main__":
+    # Let a running daemon answer before the slow imports below.
+    from crafting.forward import forward_and_exit
+
+    forward_and_exit(sys.argv[1:])
+
+import contextlib
+import io
 import logging
 import argparse
+import math
+from collections import OrderedDict
 
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterable, List, Optional, TextIO, Tuple
 
 # 3rd party
-from yaml import safe_load
+from yaml import YAMLError, safe_load
 
 # internal
 from crafting.shoppinglist import ShoppingList
 from crafting.common import find_recipe
 from crafting.common import get_crafting_cost
+from crafting.daemon import serve
+from crafting.diff import diff_snapshots, format_snapshot_diff
+from crafting.forward import Result
+from crafting.graph import RecipeGraph
+from crafting.matrix import export_matrix
+from crafting.maxcraftable import max_craftable_mix
+from crafting.metrics import COLLECTORS, Counter, Gauge
+from crafting.profiling import MODES, STAGES, Recorder, count, span
+from crafting.profit import format_profit_report, profit_report
+from crafting.render import RENDERERS
+from crafting.schedule import CraftingSchedule
+from crafting.serializer import dumps_str, loads
+from crafting.singleflight import SingleFlight
+from crafting.store import RecipeStore, compile_store, recipe_version
+from crafting.whereused import format_where_used, where_used
 
 EXITCODE_NO_RECIPES = 1
 
-
-def parse_arguments() -> argparse.Namespace:
-    """Parse given command line arguments."""
+# Compiled recipe graphs, keyed by game.
+RECIPE_GRAPHS: Dict[str, RecipeGraph] = {}
+# Recipe version of each game when its graph was compiled.
+RECIPE_VERSIONS: Dict[str, Tuple[int, int]] = {}
+
+# Shares loading and calculations between threads asking for the same at once.
+SINGLE_FLIGHT = SingleFlight()
+
+# Output formats of --stdin queries.
+QUERY_FORMATS = ("json",) + tuple(RENDERERS)
+
+# Output of command lines forwarded to the daemon, keyed by the command line
+# and recipe version, least recently used first.
+FORWARDED_RESULTS: "OrderedDict[Tuple, Result]" = OrderedDict()
+FORWARDED_RESULTS_SIZE = 1024
+# Recipe version of each game when the daemon last loaded it.
+FORWARDED_VERSIONS: Dict[str, Tuple[int, int]] = {}
+
+RECIPE_CACHE = Counter(
+    "crafting_recipe_cache_total",
+    "Lookups of compiled recipe graphs by game and result (hit, miss or reload).",
+    ("game", "result"),
+)
+MEMO_EVICTIONS = Counter(
+    "crafting_memo_evictions_total",
+    "Memoized results dropped together with a reloaded recipe graph.",
+    ("game",),
+)
+MEMO_ENTRIES = Gauge(
+    "crafting_memo_entries",
+    "Memoized results cached on the recipe graph of a game.",
+    ("game",),
+)
+
+
+def parse_arguments(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse given command line arguments, or sys.argv if none are given."""
     parser = argparse.ArgumentParser(
         allow_abbrev=False, formatter_class=argparse.ArgumentDefaultsHelpFormatter
     )
@@ -27,6 +88,7 @@ def parse_arguments() -> argparse.Namespace:
     calculation = parser.add_argument_group("crafting options")
     verbosity = parser.add_argument_group("verbosity options")
     export = parser.add_argument_group("export options")
+    report = parser.add_argument_group("report options")
 
     verbosity.add_argument(
         "--debug",
@@ -42,6 +104,27 @@ def parse_arguments() -> argparse.Namespace:
         action="store_true",
         help="enable verbose output",
     )
+    verbosity.add_argument(
+        "--daemon",
+        action="store_true",
+        default=False,
+        help="keep recipes loaded and answer calls of this script from the same "
+        "directory on a Unix socket until interrupted",
+    )
+    verbosity.add_argument(
+        "--no-daemon",
+        action="store_true",
+        default=False,
+        help="do not forward the call to a running daemon",
+    )
+    verbosity.add_argument(
+        "--profile",
+        nargs="?",
+        const=STAGES,
+        choices=MODES,
+        help="print a breakdown of the time spent per stage to stderr, "
+        "optionally with a cProfile or tracemalloc report",
+    )
 
     export.add_argument(
         "--as-json",
@@ -49,14 +132,55 @@ def parse_arguments() -> argparse.Namespace:
         default=False,
         help="return a JSON string instead of a user-friendly message",
     )
+    export.add_argument(
+        "--format",
+        choices=("json",) + tuple(RENDERERS),
+        help="write the shopping list as JSON, text, a Markdown, CSV or HTML "
+        "table (default: text)",
+    )
+    export.add_argument(
+        "--stdin",
+        action="store_true",
+        default=False,
+        help="read one query per line from stdin, as ITEM[<tab>AMOUNT[<tab>FORMAT]] "
+        'or {"item": ..., "amount": ..., "format": ...} with a FORMAT of '
+        "--format, and write one JSON result per line",
+    )
+    export.add_argument(
+        "--compile-store",
+        action="store_true",
+        default=False,
+        help="import the recipes of the game into an indexed SQLite store in "
+        "its recipe folder, which is then used instead of the YAML files",
+    )
+    export.add_argument(
+        "--export-matrix",
+        type=Path,
+        metavar="DIRECTORY",
+        help="write the base materials per unit of every craftable item as "
+        "NumPy .npy matrices, COO triples and CSV files to this directory",
+    )
+    export.add_argument(
+        "--schedule",
+        action="store_true",
+        default=False,
+        help="add an ordered build schedule, grouped by crafting station",
+    )
 
-    calculation.add_argument("item", type=str, help="the item you want to craft")
+    calculation.add_argument(
+        "items",
+        type=str,
+        nargs="*",
+        metavar="item",
+        help="the items you want to craft, optionally as ITEM=AMOUNT, shared "
+        "intermediates are crafted once for all of them",
+    )
 
     calculation.add_argument(
         "--amount",
         type=int,
         default=1,
-        help="craft this amount of the item",
+        help="craft this amount of each item without an amount",
         required=False,
     )
     calculation.add_argument(
@@ -64,8 +188,98 @@ def parse_arguments() -> argparse.Namespace:
         help="load recipes for this game from the recipes folder (e.g. yonder)",
         required=True,
     )
+    calculation.add_argument(
+        "--on-hand",
+        type=Path,
+        help="YAML or JSON file mapping items you already own to their amount",
+    )
+    calculation.add_argument(
+        "--max-craftable",
+        action="append",
+        default=[],
+        metavar="ITEM[=WEIGHT]",
+        help="report how many of this item can be crafted from the --on-hand "
+        "items, repeat to find the best weighted mix of several items",
+    )
+    calculation.add_argument(
+        "--min-cost",
+        action="store_true",
+        default=False,
+        help="buy items from vendors whenever that is cheaper than crafting them",
+    )
+
+    report.add_argument(
+        "--profit-report",
+        action="store_true",
+        default=False,
+        help="rank all craftable items by the margin of selling them to vendors",
+    )
+    report.add_argument(
+        "--where-used",
+        action="store_true",
+        default=False,
+        help="list the recipes that consume the item, directly and through "
+        "intermediate items, with the quantity used per craft",
+    )
+    report.add_argument(
+        "--diff",
+        type=Path,
+        nargs="+",
+        metavar="SNAPSHOT",
+        help="compare the recipes of an OLD snapshot to a NEW one or to the "
+        "game, and report the changed materials and costs of craftable items; "
+        "snapshots are recipe folders or stores compiled by --compile-store",
+    )
+    report.add_argument(
+        "--source",
+        action="append",
+        default=[],
+        help="only report items from this source, can be repeated",
+    )
+    report.add_argument(
+        "--specialisation",
+        help="only report items from this recipe file (e.g. alchemy)",
+    )
+    report.add_argument(
+        "--sort-by",
+        choices=["unit", "step"],
+        default="unit",
+        help="rank by margin per crafted unit or per crafting step",
+    )
 
-    options = parser.parse_args()
+    options = parser.parse_args(argv)
+    if options.daemon:
+        return options
+    if not options.items and not (
+        options.profit_report
+        or options.max_craftable
+        or options.compile_store
+        or options.export_matrix
+        or options.diff
+        or options.stdin
+    ):
+        parser.error("the following arguments are required: item")
+    if options.diff and len(options.diff) > 2:
+        parser.error("--diff takes an OLD and an optional NEW snapshot")
+    if options.where_used and len(options.items) > 1:
+        parser.error("--where-used takes a single item")
+    if options.as_json and options.format not in (None, "json"):
+        parser.error("--as-json cannot be combined with --format")
+    options.as_json = options.as_json or options.format == "json"
+    options.format = options.format or "text"
+    if options.schedule and options.format not in ("json", "text"):
+        parser.error("--schedule is only written as JSON or text")
+    options.targets = parse_targets(options.items, options.amount)
+    try:
+        options.weights = parse_weights(options.max_craftable)
+    except ValueError as error:
+        parser.error(f"argument --max-craftable: {error}")
+    options.on_hand_items = None
+    if options.on_hand:
+        try:
+            options.on_hand_items = load_on_hand(options.on_hand)
+        except (OSError, ValueError, YAMLError) as error:
+            parser.error(f"argument --on-hand: {error}")
     return options
 
 
@@ -82,18 +296,200 @@ def setup_logging(debug: bool, verbose: bool) -> None:
         logging.basicConfig(format="%(levelname)s: %(message)s")
 
 
+@contextlib.contextmanager
+def forwarded_logging(debug: bool, verbose: bool, stream: io.StringIO):
+    """Log to the stream like setup_logging would, while a forwarded call runs."""
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    handler = logging.StreamHandler(stream)
+    if debug:
+        handler.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s: %(message)s")
+        )
+        root.setLevel(logging.DEBUG)
+    else:
+        handler.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
+        root.setLevel(logging.INFO if verbose else logging.WARNING)
+    root.handlers = [handler]
+    try:
+        yield
+    finally:
+        root.handlers, root.level = handlers, level
+
+
 def load_recipes(game: str) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]:
     """Helper to load content from files for a specific game."""
     path = Path(f"recipes/{game}")
     content_list = []
+    store = RecipeStore.open(game)
+    if store:
+        # The compiled recipe store holds the same recipes, without YAML parsing.
+        with store, span("read_store"):
+            content_list.extend(store.recipes())
+    else:
+        with span("parse_yaml"):
+            content_list.extend(read_recipe_files(path))
+
+    with span("load_recipes_from_content"):
+        inventory, meta = load_recipes_from_content(content_list)
+    count("recipes_loaded", len(inventory))
+    return (inventory, meta)
+
+
+def read_recipe_files(path: Path) -> List[Dict[str, Any]]:
+    """Return the recipes of all recipe files in a folder and its subfolders."""
+    content_list = []
     for entry in path.rglob("*.yml"):
         raw_content = entry.read_text()
         content = safe_load(raw_content)
         if content:
             content_list.extend(content)
+        count("recipe_files")
+    return content_list
+
+
+def load_recipe_snapshot(path: Path) -> RecipeGraph:
+    """
+    Compile the recipes of a snapshot, e.g. of an earlier version of a game.
+
+    Args:
+        path (Path): A folder of recipe files, like recipes/corepunk, or a
+            store compiled by --compile-store.
 
+    Returns:
+        RecipeGraph: The compiled recipes of the snapshot.
+    """
+    if path.is_dir():
+        content_list = read_recipe_files(path)
+    elif path.is_file():
+        with RecipeStore(path) as store:
+            content_list = list(store.recipes())
+    else:
+        raise SystemExit(f"Recipe snapshot {path} not found.")
     inventory, meta = load_recipes_from_content(content_list)
-    return (inventory, meta)
+    return RecipeGraph(inventory)
+
+
+def validate_on_hand(content: Any) -> Dict[str, float]:
+    """
+    Check that owned items map names to amounts that are numbers of at least 0.
+
+    Raises:
+        ValueError: If the content is not a mapping or an amount is invalid.
+    """
+    if not isinstance(content, dict):
+        raise ValueError("on_hand must map item names to amounts")
+    for item_name, quantity in content.items():
+        if (
+            isinstance(quantity, bool)
+            or not isinstance(quantity, (int, float))
+            or not math.isfinite(quantity)
+            or quantity < 0
+        ):
+            raise ValueError(
+                f"the amount of {item_name} must be a number of at least 0, "
+                f"not {quantity!r}"
+            )
+    return {item_name: quantity for item_name, quantity in content.items()}
+
+
+def load_on_hand(path: Path) -> Dict[str, float]:
+    """Load a mapping of owned items to their amount from a YAML or JSON file."""
+    content = safe_load(path.read_text(encoding="utf-8")) or {}
+    try:
+        return validate_on_hand(content)
+    except ValueError as error:
+        raise ValueError(f"{path}: {error}") from None
+
+
+def parse_weights(targets: List[str]) -> Dict[str, float]:
+    """
+    Parse ITEM[=WEIGHT] arguments into a mapping of item to weight.
+
+    Raises:
+        ValueError: If a weight is not a finite number above zero.
+    """
+    weights = {}
+    for target in targets:
+        item_name, separator, weight = target.rpartition("=")
+        if not separator:
+            item_name, weight = target, "1"
+        try:
+            value = float(weight)
+        except ValueError:
+            raise ValueError(
+                f"weight of {item_name} is not a number: {weight}"
+            ) from None
+        if not 0 < value < math.inf:
+            raise ValueError(f"weight of {item_name} must be above zero: {weight}")
+        weights[item_name] = value
+    return weights
+
+
+def load_specialisation_items(game: str, specialisation: str) -> List[str]:
+    """Return the names of all recipes in a recipe file of a game."""
+    store = RecipeStore.open(game)
+    if store:
+        with store:
+            items = store.specialisation_items(specialisation)
+        if items:
+            return items
+        logging.warning("Specialisation file %s.yml not found.", specialisation)
+        return []
+
+    path = Path(f"recipes/{game}")
+    for entry in path.rglob(f"{specialisation}.yml"):
+        content = safe_load(entry.read_text(encoding="utf-8"))
+        if content:
+            return [item["name"] for item in content if "name" in item]
+    logging.warning("Specialisation file %s.yml not found.", specialisation)
+    return []
+
+
+def load_recipe_graph(game: str) -> RecipeGraph:
+    """Return the compiled recipe graph for a game, loading it on first use."""
+    graph = RECIPE_GRAPHS.get(game)
+    if graph is None:
+        RECIPE_CACHE.inc(game, "miss")
+        graph = SINGLE_FLIGHT.do(("compile_graph", game), compile_recipe_graph, game)
+    else:
+        RECIPE_CACHE.inc(game, "hit")
+    return graph
+
+
+def compile_recipe_graph(game: str) -> RecipeGraph:
+    """Load and compile the recipe graph of a game, then cache it."""
+    version = recipe_version(game)
+    inventory, meta = load_recipes(game)
+    with span("compile_graph"):
+        graph = RecipeGraph(inventory)
+    RECIPE_GRAPHS[game] = graph
+    RECIPE_VERSIONS[game] = version
+    return graph
+
+
+def forget_recipe_graph(game: str) -> None:
+    """Drop the compiled recipe graph of a game, so it is loaded again on next use."""
+    graph = RECIPE_GRAPHS.pop(game, None)
+    if graph is not None:
+        RECIPE_CACHE.inc(game, "reload")
+        MEMO_EVICTIONS.inc(game, amount=graph.memo_entries())
+
+
+def refresh_recipe_graph(game: str) -> None:
+    """Drop the compiled recipe graph of a game if its recipe files changed."""
+    if game in RECIPE_GRAPHS and RECIPE_VERSIONS.get(game) != recipe_version(game):
+        forget_recipe_graph(game)
+
+
+def collect_memo_entries() -> None:
+    """Update the memoized result counts of all loaded recipe graphs."""
+    MEMO_ENTRIES.clear()
+    for game, graph in list(RECIPE_GRAPHS.items()):
+        MEMO_ENTRIES.set(game, value=graph.memo_entries())
+
+
+COLLECTORS.append(collect_memo_entries)
 
 
 def load_recipes_from_content(
@@ -112,7 +508,7 @@ def load_recipes_from_content(
             inventory[recipe_name] = dict(item)
         else:
             # Optionally handle cases where item is not a dictionary or doesn't have a "name" key
-            print(f"Skipping item: {item}, missing 'name' key")
+            logging.debug("Skipping item: %s, missing 'name' key", item)
 
     # Loop through inventory and fix child items that are using list type
     for item_name, details in inventory.items():
@@ -132,7 +528,7 @@ def load_recipes_from_content(
                     # child_items[child_item_name] = {'name': child_item_name, 'quantity': child_details}
                     dict_child_details = {
                         "name": child_item_name,
-                        "quantity": child_details * details["quantity"],
+                        "quantity": child_details,
                     }
                     child_items[child_item_name] = dict_child_details
                 if isinstance(child_items, dict):
@@ -265,46 +661,322 @@ def add_recipe_details_recursive(
     return final_inventory
 
 
-def craft_item(item: str, inventory: List[Dict[str, Any]], amount: int) -> ShoppingList:
+def craft_item(
+    item: str,
+    inventory: Dict[str, Dict[str, Any]],
+    amount: int,
+    min_cost: bool = False,
+    graph: RecipeGraph = None,
+    on_hand: Dict[str, float] = None,
+) -> ShoppingList:
     """Calculate the items required to craft a recipe."""
-    shopping_list = ShoppingList(inventory, item, amount)
-    required_items = find_recipe(item, inventory)
-    shopping_list.add_items(required_items, amount)
-    shopping_list.simplify()
-
-    # shopping_list.add_item_costs(shopping_list.intermediate_steps)
-    shopping_list.crafting_cost.update(
-        {item: get_crafting_cost(item, inventory) * amount}
-    )
+    return craft_items({item: amount}, inventory, min_cost, graph, on_hand)
 
-    for recipe in inventory:
-        if recipe.get("name") == item:
-            if "sell_to_vendor" in recipe.keys():
-                shopping_list.sell_to_vendor = recipe.get("sell_to_vendor")
 
-            else:
-                logging.warning("No sell_to_vendor property for %s.", item)
+def craft_items(
+    targets: Dict[str, int],
+    inventory: Dict[str, Dict[str, Any]],
+    min_cost: bool = False,
+    graph: RecipeGraph = None,
+    on_hand: Dict[str, float] = None,
+) -> ShoppingList:
+    """
+    Calculate the items required to craft several recipes at once.
+
+    All targets are expanded together, so an intermediate shared by several
+    of them is listed once and crafted for their combined amount.
+
+    Args:
+        targets (dict): The amount to craft of each item.
+        inventory (dict): All recipes of the game.
+        min_cost (bool): Buy items from vendors when that is cheaper.
+        graph (RecipeGraph): The compiled recipes, built from the inventory
+            if not given.
+        on_hand (dict): Amounts of items already owned.
+
+    Returns:
+        ShoppingList: The items to gather and to craft for all targets.
+    """
+    if graph is None:
+        graph = RecipeGraph(inventory)
+
+    shopping_list = ShoppingList(inventory, targets, sum(targets.values()), on_hand)
+    for item, amount in targets.items():
+        recipe = find_recipe(item, inventory)
+        shopping_list.target_items[item] = {"name": item, **recipe, "quantity": amount}
+        if "sell_to_vendor" not in recipe:
+            logging.warning("No sell_to_vendor property for %s.", item)
+    shopping_list.expand(graph, min_cost)
 
     return shopping_list
 
 
+def parse_targets(targets: Iterable[str], amount: int) -> Dict[str, int]:
+    """
+    Parse items given as ITEM or ITEM=AMOUNT into the amount of each item.
+
+    Items without an amount get the default amount, and the amounts of items
+    given more than once are added up. Only a whole number after the last "="
+    is taken as the amount, so item names may contain "=".
+    """
+    totals: Dict[str, int] = {}
+    for target in targets:
+        item, separator, quantity = target.rpartition("=")
+        if separator and quantity.strip().isdigit():
+            item, quantity = item.strip(), int(quantity)
+        else:
+            item, quantity = target, amount
+        totals[item] = totals.get(item, 0) + quantity
+    return totals
+
+
+def parse_query(line: str, amount: int) -> Tuple[str, int, str]:
+    """
+    Parse one line of --stdin into the item, amount and output format.
+
+    Lines are either a JSON object with "item" and optional "amount" and
+    "format" keys, or the item optionally followed by the amount and format,
+    separated by tabs, as item names may contain spaces and commas.
+    """
+    if line.startswith("{"):
+        query = loads(line)
+        if not isinstance(query, dict) or not query.get("item"):
+            raise ValueError("a query needs an item")
+        fields = [query["item"], query.get("amount", amount), query.get("format")]
+    else:
+        fields = line.split("\t")
+        fields += [amount, None][len(fields) - 1 :]
+    item, quantity, output_format = fields[:3]
+    if isinstance(quantity, str) and quantity.strip().isdigit():
+        quantity = int(quantity)
+    if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity < 1:
+        raise ValueError("amount must be a whole number of at least 1")
+    output_format = output_format or "json"
+    if output_format not in QUERY_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(QUERY_FORMATS)}")
+    return str(item), quantity, output_format
+
+
+def answer_queries(
+    graph: RecipeGraph,
+    options: argparse.Namespace,
+    on_hand: Optional[Dict[str, float]],
+    lines: Iterable[str],
+    output: TextIO,
+) -> None:
+    """
+    Write one JSON line per query line, as soon as each one is calculated.
+
+    Every answer repeats the item and amount. It holds the shopping list as
+    "result", its text display as "text", or an "error" message.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item, amount, output_format = parse_query(line, options.amount)
+        except ValueError as error:
+            answer = {"query": line, "error": str(error)}
+        else:
+            answer = {"item": item, "amount": amount}
+            if item not in graph:
+                answer["error"] = "unknown item"
+            else:
+                shopping_list = craft_item(
+                    item, graph.inventory, amount, options.min_cost, graph, on_hand
+                )
+                if output_format != "json":
+                    text = io.StringIO()
+                    shopping_list.render(text, output_format)
+                    answer["text"] = text.getvalue()
+                else:
+                    answer["result"] = shopping_list.to_json()
+                    if options.schedule:
+                        schedule = CraftingSchedule(
+                            graph, shopping_list.intermediate_steps
+                        )
+                        answer["result"]["schedule"] = schedule.to_json()
+        output.write(dumps_str(answer) + "\n")
+        output.flush()
+        count("queries_answered")
+
+
 def main() -> None:
     """Break a recipe down into its base components and create a shopping list."""
     options = parse_arguments()
     setup_logging(options.debug, options.verbose)
 
+    if options.daemon:
+        serve(run_forwarded)
+        return
+
+    run(options)
+
+
+def run(options: argparse.Namespace) -> None:
+    """Calculate what the options ask for, with a profile if requested."""
+    if not options.profile:
+        calculate(options)
+        return
+
+    with Recorder([options.profile]) as recorder:
+        calculate(options)
+    print(recorder.format_for_text_display(), file=sys.stderr)
+
+
+def run_forwarded(argv: List[str]) -> Result:
+    """
+    Run a command line forwarded to the daemon and return what it printed.
+
+    Recipes stay loaded between calls and are reloaded once their files
+    change. Outputs are memoized per command line and recipe version, unless
+    they depend on an --on-hand file, a profile or write files.
+
+    Args:
+        argv (list): The arguments of the calling process.
+
+    Returns:
+        tuple: Its output, errors and exit code.
+    """
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            options = parse_arguments(argv)
+        except SystemExit as error:
+            return stdout.getvalue(), stderr.getvalue(), exit_code(error)
+
+    version = recipe_version(options.game)
+    if FORWARDED_VERSIONS.get(options.game) != version:
+        forget_recipe_graph(options.game)
+        FORWARDED_VERSIONS[options.game] = version
+
+    key = (tuple(argv), version)
+    memoize = not (
+        options.on_hand
+        or options.profile
+        or options.compile_store
+        or options.export_matrix
+        or options.diff
+    )
+    if memoize and key in FORWARDED_RESULTS:
+        FORWARDED_RESULTS.move_to_end(key)
+        return FORWARDED_RESULTS[key]
+
+    code = 0
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        with forwarded_logging(options.debug, options.verbose, stderr):
+            try:
+                run(options)
+            except SystemExit as error:
+                code = exit_code(error)
+            except Exception:
+                logging.exception("Forwarded call failed.")
+                code = 1
+
+    result = (stdout.getvalue(), stderr.getvalue(), code)
+    if memoize:
+        FORWARDED_RESULTS[key] = result
+        if len(FORWARDED_RESULTS) > FORWARDED_RESULTS_SIZE:
+            FORWARDED_RESULTS.popitem(last=False)
+    return result
+
+
+def exit_code(error: SystemExit) -> int:
+    """Return the exit code of a SystemExit, printing its message like Python does."""
+    if error.code is None or isinstance(error.code, int):
+        return error.code or 0
+    print(error.code, file=sys.stderr)
+    return 1
+
+
+def calculate(options: argparse.Namespace) -> None:
+    """Print the report, solution or shopping list requested by the options."""
+    if options.compile_store:
+        print(compile_store(options.game))
+        return
+
+    if options.diff:
+        with span("load_snapshots"):
+            old = load_recipe_snapshot(options.diff[0])
+            if len(options.diff) > 1:
+                new = load_recipe_snapshot(options.diff[1])
+            else:
+                new = load_recipe_graph(options.game)
+        with span("diff"):
+            report = diff_snapshots(old, new)
+        if options.as_json:
+            print(dumps_str(report, pretty=True))
+        else:
+            print(format_snapshot_diff(report))
+        return
+
     try:
-        inventory, meta = load_recipes(options.game)
+        graph = load_recipe_graph(options.game)
     except RuntimeWarning as error:
         if str(error.args) == "No recipes detected.":
             raise SystemExit(EXITCODE_NO_RECIPES)
 
-    shopping_list = craft_item(options.item, inventory, options.amount)
+    if options.export_matrix:
+        with span("export_matrix"):
+            for path in export_matrix(graph, options.export_matrix):
+                print(path)
+        return
+
+    if options.where_used:
+        report = where_used(graph, options.items[0])
+        if options.as_json:
+            print(dumps_str(report, pretty=True))
+        else:
+            print(format_where_used(report))
+        return
+
+    if options.profit_report:
+        items = ()
+        if options.specialisation:
+            items = set(load_specialisation_items(options.game, options.specialisation))
+        rows = profit_report(graph, options.source, items, options.sort_by)
+        if options.as_json:
+            print(dumps_str(rows, pretty=True))
+        else:
+            print(format_profit_report(rows))
+        return
+
+    on_hand = options.on_hand_items
+
+    if options.stdin:
+        answer_queries(graph, options, on_hand, sys.stdin, sys.stdout)
+        return
+
+    if options.max_craftable:
+        amounts, method = max_craftable_mix(graph, options.weights, on_hand or {})
+        if options.as_json:
+            print(dumps_str({"amounts": amounts, "method": method}, pretty=True))
+        else:
+            print("\n".join(f"{item}: {amount}" for item, amount in amounts.items()))
+        return
+
+    shopping_list = craft_items(
+        options.targets, graph.inventory, options.min_cost, graph, on_hand
+    )
+
+    schedule = None
+    if options.schedule:
+        schedule = CraftingSchedule(graph, shopping_list.intermediate_steps)
 
     if options.as_json:
-        print(shopping_list.to_json())
+        output = shopping_list.to_json()
+        if schedule:
+            output["schedule"] = schedule.to_json()
+        with span("serialize"):
+            output = dumps_str(output, pretty=True, sort_keys=True)
+        count("bytes_serialized", len(output))
+        print(output)
     else:
-        print(shopping_list.format_for_text_display())
+        shopping_list.render(sys.stdout, options.format)
+        if schedule:
+            print()
+            print(schedule.format_for_text_display())
 
 
 if __name__ == "__main__":
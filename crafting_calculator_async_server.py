@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""Serve the recipe API on asyncio streams, so idle keep-alive connections are cheap."""
+
+import argparse
+import asyncio
+import contextlib
+import email.utils
+import http.client
+import io
+import logging
+import mimetypes
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+# internal
+from crafting.metrics import Counter
+from crafting_calculator_gui_html_server import (
+    ACCESS_LOG,
+    HTTP_LATENCY,
+    HTTP_REQUESTS,
+    PROFILE_HEADER,
+    MyRequestHandler,
+    route_of,
+    setup_server_logging,
+)
+
+KEEP_ALIVE_SECONDS = 75
+MAX_HEADER_BYTES = 64 * 1024
+# Static files in these folders are sent with sendfile instead of the handler.
+SENDFILE_DIRECTORIES = ("web", "js")
+# Routes that always run on their own, even when an identical request is in flight.
+UNCOALESCED_ROUTES = ("/metrics", "static")
+
+# Status, reason, headers, body and whether to close the connection.
+Response = Tuple[int, str, List[Tuple[str, str]], bytes, bool]
+
+COALESCED = Counter(
+    "crafting_coalesced_requests_total",
+    "Requests answered with the result of an identical request in flight.",
+    ("route",),
+)
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse given command line arguments."""
+    parser = argparse.ArgumentParser(
+        allow_abbrev=False, formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--host", default="localhost", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="port to listen on")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=min(32, (os.cpu_count() or 1) + 4),
+        help="threads loading recipes and calculating",
+    )
+    return parser.parse_args()
+
+
+class BufferedRequestHandler(MyRequestHandler):
+    """
+    Runs the routes of MyRequestHandler on an already parsed request.
+
+    The status, headers and body are collected instead of written to a
+    socket, so the event loop can frame and send the response itself.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def __init__(
+        self,
+        method: str,
+        path: str,
+        version: str,
+        headers: http.client.HTTPMessage,
+        body: bytes,
+        client_address: Tuple[str, int],
+    ):
+        # The base class would read the request from a socket, so skip it.
+        self.command = method
+        self.path = path
+        self.request_version = version
+        self.requestline = f"{method} {path} {version}"
+        self.headers = headers
+        self.rfile = io.BytesIO(body)
+        self.wfile = io.BytesIO()
+        self.client_address = client_address
+        self.directory = os.getcwd()
+        self.close_connection = False
+        self.reason = ""
+        self.response_headers: List[Tuple[str, str]] = []
+        self._headers_buffer: List[bytes] = []
+
+    def send_response_only(self, code, message=None):
+        if message is None:
+            message = self.responses.get(code, ("",))[0]
+        self.status = code
+        self.reason = message
+
+    def send_header(self, keyword, value):
+        if keyword.lower() == "connection":
+            self.close_connection = value.lower() == "close"
+        self.response_headers.append((keyword, str(value)))
+
+    def flush_headers(self):
+        # Headers are written together with the body by the event loop.
+        self._headers_buffer = []
+
+    def send_json_stream(self, data):
+        # The body is buffered anyway and framed with a length by the event loop.
+        self.send_json(data)
+
+    def handle_buffered(self) -> Response:
+        """Run the route of the request and return the buffered response."""
+        method = getattr(self, f"do_{self.command}", None)
+        if method is None:
+            self.send_error(501, f"Unsupported method ({self.command!r})")
+        else:
+            method()
+        return (
+            self.status,
+            self.reason,
+            self.response_headers,
+            self.wfile.getvalue(),
+            self.close_connection,
+        )
+
+
+def encode_head(
+    status: int, reason: str, headers: List[Tuple[str, str]], keep_alive: bool
+) -> bytes:
+    """Return the status line and headers of a response."""
+    lines = [f"HTTP/1.1 {status} {reason}"]
+    lines.extend(f"{keyword}: {value}" for keyword, value in headers)
+    lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def log_access(
+    method: str, path: str, status: int, route: str, start: float, **extra
+) -> None:
+    """Count and log a request that did not run through the request handler."""
+    duration = time.perf_counter() - start
+    HTTP_LATENCY.observe(duration, route, method)
+    HTTP_REQUESTS.inc(route, method, str(status))
+    ACCESS_LOG.info(
+        "%s %s %s %.2f ms",
+        method,
+        path,
+        status,
+        duration * 1000,
+        extra={
+            "route": route,
+            "status": status,
+            "duration_ms": round(duration * 1000, 3),
+            **extra,
+        },
+    )
+
+
+class AsyncRecipeServer:
+    """
+    Accepts connections on the event loop and runs routes in a thread pool.
+
+    Identical API requests that arrive while one of them is being computed
+    share its response instead of computing it again.
+    """
+
+    def __init__(self, host: str, port: int, workers: int):
+        self.host = host
+        self.port = port
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="recipes")
+        self.in_flight: Dict[Tuple, asyncio.Future] = {}
+
+    async def serve(self) -> None:
+        """Serve until cancelled."""
+        server = await asyncio.start_server(
+            self.handle_connection, self.host, self.port, limit=MAX_HEADER_BYTES
+        )
+        logging.info("Serving on http://%s:%s", self.host, self.port)
+        async with server:
+            await server.serve_forever()
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Answer requests on a connection until it is closed or idle too long."""
+        client_address = writer.get_extra_info("peername") or ("-", 0)
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    head = await asyncio.wait_for(
+                        reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_SECONDS
+                    )
+                except asyncio.LimitOverrunError:
+                    writer.write(encode_head(431, "Headers Too Large", [], False))
+                    break
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+                    break
+
+                request_line, _, header_bytes = head.partition(b"\r\n")
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    headers = http.client.parse_headers(io.BytesIO(header_bytes))
+                    length = int(headers.get("Content-Length") or 0)
+                except (ValueError, http.client.HTTPException):
+                    writer.write(encode_head(400, "Bad Request", [], False))
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                connection = (headers.get("Connection") or "").lower()
+                if version == "HTTP/1.1":
+                    keep_alive = connection != "close"
+                else:
+                    keep_alive = connection == "keep-alive"
+
+                keep_alive = await self.respond(
+                    writer,
+                    BufferedRequestHandler(
+                        method, target, version, headers, body, client_address
+                    ),
+                    body,
+                    keep_alive,
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def respond(
+        self,
+        writer: asyncio.StreamWriter,
+        request: BufferedRequestHandler,
+        body: bytes,
+        keep_alive: bool,
+    ) -> bool:
+        """Write the response to a request, return whether to keep the connection."""
+        file = self.static_file(request.command, request.path)
+        if file:
+            await self.send_file(
+                writer, request.command, request.path, file, keep_alive
+            )
+            return keep_alive
+
+        route = route_of(request.path)
+        start = time.perf_counter()
+        if request.command in ("GET", "POST") and route not in UNCOALESCED_ROUTES:
+            key = (
+                request.command,
+                request.path,
+                body,
+                request.headers.get(PROFILE_HEADER),
+            )
+            leader = key not in self.in_flight
+            response = await self.coalesce(key, request)
+            if not leader:
+                COALESCED.inc(route)
+                log_access(
+                    request.command,
+                    request.path,
+                    response[0],
+                    route,
+                    start,
+                    coalesced=True,
+                )
+        else:
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(
+                self.executor, request.handle_buffered
+            )
+
+        status, reason, headers, content, close = response
+        if not status:
+            # The route did not answer, close the connection like the threaded server.
+            return False
+        keep_alive = keep_alive and not close
+        # Framing headers are set here, HEAD keeps the length of the GET response.
+        replaced = ("connection",)
+        if request.command != "HEAD":
+            replaced = ("connection", "content-length")
+        headers = [(k, v) for k, v in headers if k.lower() not in replaced]
+        if request.command != "HEAD":
+            headers.append(("Content-Length", str(len(content))))
+        writer.write(encode_head(status, reason, headers, keep_alive))
+        if request.command != "HEAD":
+            writer.write(content)
+        return keep_alive
+
+    async def coalesce(self, key: Tuple, request: BufferedRequestHandler) -> Response:
+        """Return the response of an identical request in flight, or compute it."""
+        future = self.in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, request.handle_buffered)
+            self.in_flight[key] = future
+            future.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        return await asyncio.shield(future)
+
+    @staticmethod
+    def static_file(method: str, target: str) -> Optional[Path]:
+        """Return the file a GET or HEAD request for web/ or js/ refers to, if any."""
+        if method not in ("GET", "HEAD"):
+            return None
+        path = unquote(urlparse(target).path)
+        if path == "/":
+            path = "/web/index.html"
+        relative = path.lstrip("/")
+        folder = relative.split("/", 1)[0]
+        if folder not in SENDFILE_DIRECTORIES:
+            return None
+        root = Path(folder).resolve()
+        file = Path(relative).resolve()
+        if root not in file.parents or not file.is_file():
+            return None
+        return file
+
+    async def send_file(
+        self,
+        writer: asyncio.StreamWriter,
+        method: str,
+        target: str,
+        file: Path,
+        keep_alive: bool,
+    ) -> None:
+        """Send a static file, using sendfile where the platform supports it."""
+        start = time.perf_counter()
+        stat = file.stat()
+        headers = [
+            ("Content-Type", mimetypes.guess_type(file.name)[0] or "text/plain"),
+            ("Content-Length", str(stat.st_size)),
+            ("Last-Modified", email.utils.formatdate(stat.st_mtime, usegmt=True)),
+            ("Access-Control-Allow-Origin", "http://localhost"),
+        ]
+        writer.write(encode_head(200, "OK", headers, keep_alive))
+        if method == "GET":
+            await writer.drain()
+            with file.open("rb") as handle:
+                await asyncio.get_running_loop().sendfile(writer.transport, handle)
+        log_access(method, target, 200, "static", start, sendfile=True)
+
+
+def main() -> None:
+    """Start the asyncio server."""
+    options = parse_arguments()
+    setup_server_logging()
+    server = AsyncRecipeServer(options.host, options.port, options.workers)
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(server.serve())
+
+
+if __name__ == "__main__":
+    main()
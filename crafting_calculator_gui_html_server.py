@@ -1,40 +1,297 @@
-import socketserver
+import contextlib
+import itertools
+import logging
+import os
+import sys
+import time
 import webbrowser
 import threading
-from http.server import SimpleHTTPRequestHandler, HTTPServer
+from http.server import SimpleHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
 from urllib.parse import urlparse, parse_qs, unquote
 from pathlib import Path
-from typing import Dict, Any, Tuple
-import json
+from typing import Dict, Any, List, Tuple, Union
 from yaml import safe_load
 
 # internal
 from crafting_calculator import *
 from crafting.common import *
+from crafting.graph import RecipeGraph
+from crafting.logs import REQUEST_ID, setup_queue_logging
+from crafting.maxcraftable import max_craftable_mix
+from crafting.metrics import COLLECTORS, Counter, Gauge, Histogram, render
+from crafting.profiling import Recorder, count, span
+from crafting.serializer import dump, dumps, dumps_graph, iter_dumps, loads
+from crafting.store import RecipeStore
+from crafting.whereused import where_used
+from crafting_calculator import SINGLE_FLIGHT, recipe_version, validate_on_hand
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Default and largest page size of /api/craftables.
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Recipe details shown for every row of the recipe table.
+SUMMARY_KEYS = ("source", "wiki", "rarity")
+
+# Request header selecting profiling modes, e.g. "stages" or "cprofile,tracemalloc".
+PROFILE_HEADER = "X-Profile"
+# The header is ignored unless CRAFTING_PROFILE is set, as anyone could slow
+# the server down with it.
+PROFILING_ENABLED = os.environ.get("CRAFTING_PROFILE", "") not in ("", "0")
+# cProfile and tracemalloc are process-wide, so profiled requests run one at a time.
+PROFILE_LOCK = threading.Lock()
+# Request and response header carrying the ID that log records of a request share.
+REQUEST_ID_HEADER = "X-Request-ID"
+
+ACCESS_LOG = logging.getLogger("crafting.access")
+# Serializes writes of data.json by requests for different games or files.
+DATA_JSON_LOCK = threading.Lock()
+REQUEST_NUMBERS = itertools.count(1)
+
+# Routes reported as metric labels, any other path is a static file.
+ROUTES = (
+    "/",
+    "/api/children",
+    "/api/craftables",
+    "/api/graph",
+    "/api/where_used",
+    "/calculate",
+    "/discover_games",
+    "/discover_specialisations",
+    "/filter_recipes",
+    "/max_craftable",
+    "/metrics",
+    "/select_game",
+)
+
+HTTP_REQUESTS = Counter(
+    "crafting_http_requests_total",
+    "Handled HTTP requests by route, method and status.",
+    ("route", "method", "status"),
+)
+HTTP_LATENCY = Histogram(
+    "crafting_http_request_duration_seconds",
+    "Time spent handling HTTP requests by route and method.",
+    ("route", "method"),
+)
+IN_FLIGHT = Gauge("crafting_http_requests_in_flight", "HTTP requests being handled.")
+RSS = Gauge("crafting_process_resident_memory_bytes", "Resident memory of the server.")
+
+
+def discover_games() -> List[str]:
+    """Return the names of the recipe folders with a titled meta.yml."""
+    games = []
+    path = Path("recipes")
+    for entry in path.rglob("**/meta.yml"):
+        raw_content = entry.read_text()
+        content = safe_load(raw_content)
+        if content and content.get("title"):
+            games.append(entry.parent.name)
+    return games
+
+
+def summarise_item(
+    graph: Union[RecipeGraph, RecipeStore], item_name: str, quantity: float
+) -> dict:
+    """Return the details of an item shown in a row of the recipe table."""
+    recipe = graph.recipe(item_name)
+    summary = {
+        "name": item_name,
+        "quantity": quantity,
+        "craftable": graph.is_craftable(item_name),
+    }
+    summary.update({key: recipe[key] for key in SUMMARY_KEYS if key in recipe})
+    return summary
+
+
+def route_of(path: str) -> str:
+    """Return the route of a request path as reported in metrics and logs."""
+    parts = urlparse(path).path.split("/")
+    route = "/".join(parts[:3] if parts[1:2] == ["api"] else parts[:2]) or "/"
+    return route if route in ROUTES else "static"
+
+
+def parse_amount(value: Any) -> int:
+    """
+    Return an amount of a request as a whole number of at least 1.
+
+    Raises:
+        ValueError: If the amount is not a whole number or below 1.
+    """
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ValueError("amounts must be whole numbers of at least 1")
+    return value
+
+
+def collect_rss() -> None:
+    """Update the resident memory, or the peak where the current one is unknown."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            RSS.set(value=int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE"))
+    except (OSError, ValueError, AttributeError):
+        if resource:
+            # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            RSS.set(value=peak if sys.platform == "darwin" else peak * 1024)
+
+
+COLLECTORS.append(collect_rss)
 
 
 class MyRequestHandler(SimpleHTTPRequestHandler):
+    recorder = None
+    request_id = "-"
+    status = 0
+
     def do_GET(self):
+        with self.observed(), self.profiled():
+            self.route_get()
+
+    def do_POST(self):
+        with self.observed(), self.profiled():
+            self.route_post()
+
+    def send_response(self, code, message=None):
+        self.status = code
+        super().send_response(code, message)
+
+    @contextlib.contextmanager
+    def observed(self):
+        """Count this request and its duration per route for /metrics."""
+        route = route_of(self.path)
+        self.request_id = self.headers.get(REQUEST_ID_HEADER) or (
+            f"{os.getpid():x}-{next(REQUEST_NUMBERS):x}"
+        )
+        token = REQUEST_ID.set(self.request_id)
+        # Kept alive connections reuse the handler for their next request.
+        self.status = 0
+        self.recorder = None
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            yield
+            if not self.status:
+                # Without a response the client only notices the closed connection.
+                self.close_connection = True
+        finally:
+            duration = time.perf_counter() - start
+            IN_FLIGHT.dec()
+            HTTP_LATENCY.observe(duration, route, self.command)
+            HTTP_REQUESTS.inc(route, self.command, str(self.status))
+            self.log_access(route, duration)
+            REQUEST_ID.reset(token)
+
+    def log_access(self, route, duration):
+        ACCESS_LOG.info(
+            "%s %s %s %.2f ms",
+            self.command,
+            self.path,
+            self.status,
+            duration * 1000,
+            extra={
+                "client": self.client_address[0],
+                "route": route,
+                "status": self.status,
+                "duration_ms": round(duration * 1000, 3),
+            },
+        )
+
+    def log_request(self, code="-", size="-"):
+        # Requests are logged with their duration once they are done.
+        pass
+
+    def log_message(self, format, *args):
+        logging.warning("%s %s", self.address_string(), format % args)
+
+    @contextlib.contextmanager
+    def profiled(self):
+        """Record the stages of this request if profiling is enabled and asked for."""
+        modes = self.headers.get(PROFILE_HEADER)
+        if not modes or not PROFILING_ENABLED:
+            yield
+            return
+
+        self.recorder = Recorder(modes.replace(" ", "").lower().split(","))
+        with PROFILE_LOCK, self.recorder:
+            yield
+        sys.stderr.write(
+            f"Profile of {self.requestline}\n"
+            f"{self.recorder.format_for_text_display()}\n"
+        )
+
+    def send_json(self, data):
+        with span("json_encode"):
+            body = dumps(data)
+        self.send_encoded_json(body)
+
+    def send_encoded_json(self, body: bytes):
+        count("bytes_serialized", len(body))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json_stream(self, data):
+        """
+        Send a large JSON document while it is being encoded.
+
+        The document is encoded incrementally and written in chunks of about
+        64 KiB, so the whole document is never held in memory. HTTP/1.1
+        responses use chunked transfer encoding, HTTP/1.0 responses end when
+        the connection is closed.
+        """
+        chunked = self.use_chunked_encoding()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.close_connection = True
+        self.end_headers()
+
+        total = 0
+        with span("json_encode"):
+            for chunk in iter_dumps(data):
+                total += self.write_chunk(chunk, chunked)
+            if chunked:
+                self.wfile.write(b"0\r\n\r\n")
+        count("bytes_serialized", total)
+
+    def use_chunked_encoding(self) -> bool:
+        """Return whether the response can use chunked transfer encoding."""
+        return (
+            self.protocol_version == "HTTP/1.1" and self.request_version == "HTTP/1.1"
+        )
+
+    def write_chunk(self, chunk: bytes, chunked: bool) -> int:
+        """Write part of a streamed body and return its size."""
+        if chunked:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        else:
+            self.wfile.write(chunk)
+        return len(chunk)
+
+    def route_get(self):
         path = self.path
         parsed_url = urlparse(path)
 
         # Handle the game discovery
         if self.path.startswith("/discover_games"):
             games = self.discover_games()
-            self.send_response(200)
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-            self.wfile.write(json.dumps(games).encode())
+            self.send_json(games)
 
         elif self.path.startswith("/discover_specialisations"):
             query_components = parse_qs(urlparse(self.path).query)
             selected_game = query_components.get("game", [None])[0]
             if selected_game:
                 specialisations = self.discover_specialisations(selected_game)
-                self.send_response(200)
-                self.send_header("Content-Type", "application/json")
-                self.end_headers()
-                self.wfile.write(json.dumps(specialisations).encode())
+                self.send_json(specialisations)
 
         elif self.path.startswith("/filter_recipes"):
             # Extract the parts after "/filter_recipes"
@@ -49,45 +306,277 @@ class MyRequestHandler(SimpleHTTPRequestHandler):
                 ):
                     specialisation = False
                 if game and specialisation:
-                    [recipes, meta] = self.filter_recipes(game, specialisation)
-                    self.update_data_json_with_recipes(recipes)
-                    self.send_response(200)
-                    self.send_header("Content-Type", "application/json")
-                    self.end_headers()
-                    self.wfile.write(json.dumps(recipes).encode())
+                    key = (
+                        "filter_recipes",
+                        game,
+                        decoded_specialisation,
+                        recipe_version(game),
+                    )
+                    recipes = SINGLE_FLIGHT.do(
+                        key,
+                        self.filter_recipes_and_update_data_json,
+                        game,
+                        specialisation,
+                    )
+                    self.send_json_stream(recipes)
                 elif game:
-                    data = self.update_data_json_for_game(game)
-                    self.send_response(200)
-                    self.send_header("Content-Type", "application/json")
-                    self.end_headers()
-                    self.wfile.write(json.dumps(data).encode())
+                    data = self.update_data_json_for_game_once(game)
+                    self.send_json_stream(data)
 
         # Handle game selection
         elif self.path.startswith("/select_game"):
             query_components = parse_qs(urlparse(self.path).query)
             selected_game = query_components.get("game", [None])[0]
+            lazy = query_components.get("lazy", [""])[0] in ("1", "true")
             if selected_game:
-                self.update_data_json_for_game(selected_game)
+                refresh_recipe_graph(selected_game)
+                if not lazy:
+                    self.update_data_json_for_game_once(selected_game)
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        # Handle shopping list calculations
+        elif parsed_url.path == "/calculate":
+            query_components = parse_qs(parsed_url.query)
+            params = {key: values[0] for key, values in query_components.items()}
+            # Repeat item, optionally as ITEM=AMOUNT, to craft several items.
+            params["item"] = query_components.get("item")
+            self.send_calculation(params)
+
+        # Handle how many items can be crafted from owned items
+        elif parsed_url.path == "/max_craftable":
+            query_components = parse_qs(parsed_url.query)
+            params = {key: values[0] for key, values in query_components.items()}
+            self.send_max_craftable(params)
+
+        # Handle one page of the craftable items of a game
+        elif parsed_url.path == "/api/craftables":
+            query_components = parse_qs(parsed_url.query)
+            params = {key: values[0] for key, values in query_components.items()}
+            self.send_craftables(params)
+
+        # Handle the child items of one item, loaded when a row is expanded
+        elif parsed_url.path == "/api/children":
+            query_components = parse_qs(parsed_url.query)
+            params = {key: values[0] for key, values in query_components.items()}
+            self.send_children(params)
+
+        # Handle the compiled recipe graph of a game
+        elif parsed_url.path == "/api/graph":
+            query_components = parse_qs(parsed_url.query)
+            params = {key: values[0] for key, values in query_components.items()}
+            self.send_graph(params)
+
+        # Handle which recipes consume an item
+        elif parsed_url.path == "/api/where_used":
+            query_components = parse_qs(parsed_url.query)
+            params = {key: values[0] for key, values in query_components.items()}
+            self.send_where_used(params)
+
+        # Handle metrics for monitoring
+        elif parsed_url.path == "/metrics":
+            body = render().encode()
             self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
             self.end_headers()
+            self.wfile.write(body)
 
         # Handle the root path
         elif parsed_url.path == "/":
             self.path = "/web/index.html"
-            return super().do_GET()
+            super().do_GET()
 
         else:
-            return super().do_GET()
+            super().do_GET()
+
+    def route_post(self):
+        parsed_url = urlparse(self.path)
+
+        if parsed_url.path not in ("/calculate", "/max_craftable"):
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            params = loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self.send_error(400, "Request body must be JSON")
+            return
+        if not isinstance(params, dict):
+            self.send_error(400, "Request body must be a JSON object")
+            return
+
+        # Handle calculations, the body may include on_hand items
+        if parsed_url.path == "/calculate":
+            self.send_calculation(params)
+        elif parsed_url.path == "/max_craftable":
+            self.send_max_craftable(params)
+
+    def send_calculation(self, params):
+        game = params.get("game")
+        items = params.get("items") or params.get("item")
+        if game not in self.discover_games() or not items:
+            self.send_error(400, "A known game and an item are required")
+            return
+        try:
+            amount = parse_amount(params.get("amount", 1))
+            if isinstance(items, dict):
+                targets = {item: parse_amount(value) for item, value in items.items()}
+            elif isinstance(items, list):
+                targets = parse_targets(items, amount)
+            else:
+                targets = parse_targets([items], amount)
+            for quantity in targets.values():
+                parse_amount(quantity)
+        except (AttributeError, TypeError, ValueError):
+            self.send_error(400, "amounts must be whole numbers of at least 1")
+            return
+        min_cost = str(params.get("min_cost", "")).lower() in ("1", "true")
+        try:
+            on_hand = validate_on_hand(params.get("on_hand") or {})
+        except ValueError as error:
+            self.send_error(400, "on_hand must map item names to amounts", str(error))
+            return
+
+        graph = load_recipe_graph(game)
+        # The graph is part of the key, so a reloaded game is calculated again.
+        on_hand_key = dumps(on_hand, sort_keys=True)
+        targets_key = dumps(targets, sort_keys=True)
+        key = ("calculate", graph, targets_key, min_cost, on_hand_key)
+        result = SINGLE_FLIGHT.do(
+            key,
+            lambda: craft_items(
+                targets, graph.inventory, min_cost, graph, on_hand
+            ).to_json(),
+        )
+        self.send_json(result)
+
+    def send_max_craftable(self, params):
+        game = params.get("game")
+        weights = params.get("targets") or {}
+        if params.get("item"):
+            weights = {params["item"]: 1}
+        if game not in self.discover_games() or not isinstance(weights, dict):
+            self.send_error(400, "A known game and an item or targets are required")
+            return
+        try:
+            weights = {item: float(weight) for item, weight in weights.items()}
+        except (TypeError, ValueError):
+            self.send_error(400, "targets must map item names to weights")
+            return
+        try:
+            on_hand = validate_on_hand(params.get("on_hand") or {})
+        except ValueError as error:
+            self.send_error(400, "on_hand must map item names to amounts", str(error))
+            return
+
+        graph = load_recipe_graph(game)
+        key = ("max_craftable", graph, dumps([weights, on_hand], sort_keys=True))
+        amounts, method = SINGLE_FLIGHT.do(
+            key, max_craftable_mix, graph, weights, on_hand
+        )
+        self.send_json({"amounts": amounts, "method": method})
+
+    def send_craftables(self, params):
+        game = params.get("game")
+        if game not in self.discover_games():
+            self.send_error(400, "A known game is required")
+            return
+        try:
+            offset = max(0, int(params.get("offset", 0)))
+            limit = min(MAX_PAGE_SIZE, max(1, int(params.get("limit", PAGE_SIZE))))
+        except ValueError:
+            self.send_error(400, "offset and limit must be numbers")
+            return
+
+        specialisation = params.get("specialisation")
+        if specialisation in ("null", "- None -"):
+            specialisation = None
+
+        # A compiled recipe store answers with one query, without loading the game.
+        store = RecipeStore.open(game)
+        if store:
+            with store:
+                total, page = store.craftable_names(specialisation, offset, limit)
+                items = [
+                    summarise_item(
+                        store, item_name, store.recipe(item_name).get("quantity", 1)
+                    )
+                    for item_name in page
+                ]
+            self.send_json(
+                {"total": total, "offset": offset, "limit": limit, "items": items}
+            )
+            return
+
+        graph = load_recipe_graph(game)
+        names = graph.craftable_names()
+        if specialisation:
+            included = set(load_specialisation_items(game, specialisation))
+            names = [item_name for item_name in names if item_name in included]
+
+        items = [
+            summarise_item(graph, item_name, graph.recipe(item_name).get("quantity", 1))
+            for item_name in names[offset : offset + limit]
+        ]
+        self.send_json(
+            {"total": len(names), "offset": offset, "limit": limit, "items": items}
+        )
+
+    def send_children(self, params):
+        game = params.get("game")
+        item = params.get("item")
+        if game not in self.discover_games() or not item:
+            self.send_error(400, "A known game and an item are required")
+            return
+
+        store = RecipeStore.open(game)
+        with store or contextlib.nullcontext():
+            recipes = store or load_recipe_graph(game)
+            if item not in recipes:
+                self.send_error(404, "Unknown item")
+                return
+            children = [
+                summarise_item(recipes, child_name, quantity)
+                for child_name, quantity in recipes.child_items(item)
+            ]
+        self.send_json({"name": item, "items": children})
+
+    def send_where_used(self, params):
+        game = params.get("game")
+        item = params.get("item")
+        if game not in self.discover_games() or not item:
+            self.send_error(400, "A known game and an item are required")
+            return
+
+        store = RecipeStore.open(game)
+        with store or contextlib.nullcontext():
+            recipes = store or load_recipe_graph(game)
+            if item not in recipes:
+                self.send_error(404, "Unknown item")
+                return
+            report = where_used(recipes, item)
+        self.send_json(report)
+
+    def send_graph(self, params):
+        game = params.get("game")
+        if game not in self.discover_games():
+            self.send_error(400, "A known game is required")
+            return
+
+        # The graph does not change until it is reloaded, so encode it once.
+        graph = load_recipe_graph(game)
+        body = graph.cache.get("graph_json")
+        if body is None:
+            with span("json_encode"):
+                body = dumps_graph(graph)
+            graph.cache["graph_json"] = body
+        self.send_encoded_json(body)
 
     def discover_games(self) -> Tuple[Dict[str, Any]]:
-        games = []
-        path = Path("recipes")
-        for entry in path.rglob("**/meta.yml"):
-            raw_content = entry.read_text()
-            content = safe_load(raw_content)
-            if content and content.get("title"):
-                games.append(entry.parent.name)
-        return games
+        return discover_games()
 
     def discover_specialisations(self, game):
         path = Path(f"recipes/{game}")
@@ -95,23 +584,23 @@ class MyRequestHandler(SimpleHTTPRequestHandler):
 
         # Debugging: Check if the directory exists
         if not fullPath.exists():
-            print(f"Error: The path {fullPath} does not exist.")
+            logging.error("The path %s does not exist.", fullPath)
             return []
 
-        print(f"Resolved full path: {fullPath}")  # Debug log
+        logging.debug("Resolved full path: %s", fullPath)
 
         # Debugging: List the files and directories inside fullPath
         try:
             contents = list(fullPath.rglob("*.yml"))  # Find all .yml files recursively
-            print(f"Contents of {fullPath}: {contents}")  # Debug log
+            logging.debug("Found %s recipe files in %s.", len(contents), fullPath)
         except Exception as e:
-            print(f"Error reading directory: {e}")
+            logging.error("Error reading directory: %s", e)
             return []
 
         # Get specialisations (file names without extension)
         specialisations = ["- None -"]
         for entry in contents:
-            print(f"Checking entry: {entry} (Type: {type(entry)})")  # Debug log
+            logging.debug("Checking entry: %s", entry)
             if entry.is_file() and entry.suffix == '.yml' and entry.stem != 'meta':
                 specialisations.append(entry.stem)  # Add file name without extension to specialisations
 
@@ -125,92 +614,73 @@ class MyRequestHandler(SimpleHTTPRequestHandler):
 
         inventory = {}
         inventory, meta = self._load_recipes(game)
-        listCraftable, listGatherable = process_inventory(inventory)
+        with span("process_inventory"):
+            listCraftable, listGatherable = process_inventory(inventory)
 
         # Ensure the path exists
         if not path.exists() or not path.is_dir():
             return content_list
 
-        # Look for the specific specialization file
-        # recipe_file = path / f"{specialization}.yml"
-        recipe_file = self.find_specialization_file(game, specialization)
-        if recipe_file:
-            raw_content = recipe_file.read_text(encoding="utf-8")
-            content = safe_load(raw_content)
-
-            # Validate content and collect recipes
-            if content:
-                content_list = content
-                filtered_inventory, filtered_meta = load_recipes_from_content(content_list)
-                filtered_dict = {key: inventory[key] for key in filtered_inventory if key in inventory}
-                inventory = filtered_dict
+        # Keep the recipes of the specialization file, read from the recipe store if compiled
+        included = load_specialisation_items(game, unquote(specialization))
+        if included:
+            inventory = {key: inventory[key] for key in included if key in inventory}
         return (inventory, meta)
 
-    def find_specialization_file(self, game, specialization):
-        specialization = unquote(specialization)
-        path = Path(f"recipes/{game}")
-        fullPath = path.resolve()  # Get the absolute path
+    def filter_recipes_and_update_data_json(self, game, specialisation):
+        [recipes, meta] = self.filter_recipes(game, specialisation)
+        self.update_data_json_with_recipes(recipes)
+        return recipes
 
-        # Debugging: Check if the directory exists
-        if not fullPath.exists():
-            print(f"Error: The path {fullPath} does not exist.")
-            return None
-
-        print(f"Resolved full path: {fullPath}")  # Debug log
-
-        # Recursively search for the specialization file
-        specialization_file = None
-        for entry in fullPath.rglob(f"**/{specialization}.yml"):
-            if entry.is_file():
-                specialization_file = entry
-                break  # Stop at the first match
-
-        if specialization_file:
-            print(f"Found specialization file: {specialization_file}")
-        else:
-            print(f"Specialization file {specialization}.yml not found.")
-
-        return specialization_file
+    def update_data_json_for_game_once(self, game):
+        # Requests selecting the same game at once share the work.
+        key = ("filter_recipes", game, None, recipe_version(game))
+        return SINGLE_FLIGHT.do(key, self.update_data_json_for_game, game)
 
     def update_data_json_for_game(self, game):
         # Load the game's recipes
         inventory, meta = self._load_recipes(game)
         self.update_data_json_with_recipes
-        listCraftable, listGatherable = process_inventory(inventory)
+        with span("process_inventory"):
+            listCraftable, listGatherable = process_inventory(inventory)
         listCraftableItems = sorted(list(listCraftable.keys()))
 
         # Update the data.json file
         data = listCraftable
         file_path = "data.json"
         try:
-            with open(file_path, "w", encoding="utf-8") as file:
-                json.dump(data, file, indent=4)  # Indent for readability
-                print(data)
-            print(f"Data successfully written to {file_path}")
+            with span("write_data_json"), DATA_JSON_LOCK:
+                with open(file_path, "wb") as file:
+                    dump(data, file, pretty=True)  # Indent for readability
+            logging.debug("Wrote %s recipes to %s.", len(data), file_path)
         except (IOError, TypeError) as e:
-            print(f"Error writing file: {e}")
+            logging.error("Error writing file: %s", e)
 
         return data
 
     def update_data_json_with_recipes(self, recipes):
         # Process the inventory for craftable and gatherable items
-        listCraftable, listGatherable = process_inventory(recipes)
+        with span("process_inventory"):
+            listCraftable, listGatherable = process_inventory(recipes)
         listCraftableItems = sorted(list(listCraftable.keys()))
 
         # Update the data.json file with filtered data
         data = listCraftable
         file_path = "data.json"
         try:
-            with open(file_path, "w", encoding="utf-8") as file:
-                json.dump(data, file, indent=4)  # Indent for readability
-                print(data)
-            print(f"Data successfully written to {file_path}")
+            with span("write_data_json"), DATA_JSON_LOCK:
+                with open(file_path, "wb") as file:
+                    dump(data, file, pretty=True)  # Indent for readability
+            logging.debug("Wrote %s recipes to %s.", len(data), file_path)
         except (IOError, TypeError) as e:
-            print(f"Error writing file: {e}")
+            logging.error("Error writing file: %s", e)
 
     def end_headers(self):
         # Add CORS headers, we only allow localhost.
         self.send_header("Access-Control-Allow-Origin", "http://localhost")
+        self.send_header(REQUEST_ID_HEADER, self.request_id)
+        if self.recorder:
+            self.send_header("Server-Timing", self.recorder.server_timing())
         super().end_headers()
 
     # Placeholder methods for loading recipes and processing inventory
@@ -219,14 +689,25 @@ class MyRequestHandler(SimpleHTTPRequestHandler):
         return (inventory, meta)
 
 
+class ThreadedRequestHandler(MyRequestHandler):
+    """
+    Keeps connections open between requests, as each one has its own thread.
+
+    Large JSON documents are streamed with chunked transfer encoding.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+
 # Define the server address and port
 PORT = 8000
 server_address = ("localhost", PORT)
 
 
 def start_server():
-    httpd = socketserver.TCPServer(server_address, MyRequestHandler)
-    print(f"Serving on http://{server_address[0]}:{PORT}")
+    # One thread per request, so identical requests in flight share their work.
+    httpd = ThreadingHTTPServer(server_address, ThreadedRequestHandler)
+    logging.info("Serving on http://%s:%s", server_address[0], PORT)
     httpd.serve_forever()
 
 
@@ -235,7 +716,18 @@ def open_browser():
     webbrowser.open(f"http://{server_address[0]}:{PORT}")
 
 
+def setup_server_logging():
+    """Configure logging from the CRAFTING_LOG_LEVEL, _JSON and _SAMPLE variables."""
+    return setup_queue_logging(
+        level=getattr(logging, os.environ.get("CRAFTING_LOG_LEVEL", "INFO").upper()),
+        json_lines=os.environ.get("CRAFTING_LOG_JSON", "") not in ("", "0"),
+        sample_every=int(os.environ.get("CRAFTING_LOG_SAMPLE", 1)),
+    )
+
+
 if __name__ == "__main__":
+    setup_server_logging()
+
     # Start the server in a new thread
     server_thread = threading.Thread(target=start_server)
     server_thread.start()
@@ -9,9 +9,6 @@ import os
 import subprocess
 import PySimpleGUI as sg
 
-# DEBUG ONLY.
-import json
-
 # 3rd party
 from yaml import safe_load
 
@@ -19,6 +16,7 @@ from yaml import safe_load
 from crafting_calculator import *
 from crafting.shoppinglist import *
 from crafting.common import *
+from crafting import serializer
 
 def discover_games() -> Tuple[Dict[str, Any]]:
     games = []
@@ -191,33 +189,16 @@ def main():
             else:
                 game = window_values["game"]
                 amount = int(window_values["amount"] or 1)
-                shopping_list = ShoppingList.create_empty()
                 inventory, meta = _load_recipes(window_values["game"])
                 listCraftable, listGatherable = process_inventory(inventory)
 
-                target_items = {}
-                for item_name in items:
-                    target_items[item_name] = inventory.get(item_name)
-                    target_items[item_name]["quantity"] = (
-                        target_items[item_name].get("quantity", 1) * amount
-                    )
+                # All selected items are crafted together, sharing intermediates.
+                # The graph is compiled from the recipes loaded above, so it is
+                # never older than the recipe files.
+                targets = {item_name: amount for item_name in items}
                 del items
-                del item_name
-
-                # Sort inventory dictionary alphabetically
-                shopping_list.inventory = {
-                    key: inventory[key] for key in sorted(inventory)
-                }
-                del inventory
-
-                shopping_list.target_amount = amount
-                del amount
-
-                shopping_list.target_items.update(target_items)
-                shopping_list.items.update(target_items)
-                del target_items
-                # shopping_list.simplify()
-                shopping_list.simplifyV2()
+                shopping_list = craft_items(targets, inventory)
+                del targets
 
                 output(craftable_output, shopping_list.format_for_text_display())
                 
@@ -230,8 +211,8 @@ def main():
                 file_path = 'data.json'
                 try:
                     # Writing JSON data to the file with proper formatting
-                    with open(file_path, 'w', encoding='utf-8') as file:
-                        json.dump(data, file, indent=4)  # Indent for readability
+                    with open(file_path, "wb") as file:
+                        serializer.dump(data, file, pretty=True)
                         print(data)
                     print(f"Data successfully written to {file_path}")
                 except IOError as e:
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Serve the recipe API from pre-forked processes sharing one recipe snapshot."""
+
+import argparse
+import gc
+import logging
+import os
+import socketserver
+
+# internal
+from crafting.prefork import POLL_INTERVAL, PreforkServer
+from crafting.store import RecipeStore, compile_store, store_path
+from crafting_calculator import (
+    forget_recipe_graph,
+    load_recipe_graph,
+    recipe_version,
+)
+from crafting_calculator_gui_html_server import (
+    MyRequestHandler,
+    discover_games,
+    setup_server_logging,
+)
+
+
+class ReusableTCPServer(socketserver.TCPServer):
+    """A TCP server that can bind again right after a restart."""
+
+    allow_reuse_address = True
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse given command line arguments."""
+    parser = argparse.ArgumentParser(
+        allow_abbrev=False, formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--host", default="localhost", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="port to listen on")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="worker processes accepting requests",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=POLL_INTERVAL,
+        help="seconds between checks for changed recipe files",
+    )
+    return parser.parse_args()
+
+
+def load_snapshots() -> None:
+    """
+    Compile a fresh recipe store of every game and load its recipe graph.
+
+    Runs in the parent before workers are forked, so all workers share the
+    loaded graphs and read the same store files through memory maps.
+    """
+    gc.unfreeze()
+    for game in discover_games():
+        path = store_path(game)
+        fresh = False
+        if path.exists():
+            with RecipeStore(path) as store:
+                fresh = store.version() == recipe_version(game)
+        if not fresh:
+            compile_store(game)
+        forget_recipe_graph(game)
+        load_recipe_graph(game)
+    gc.collect()
+    # Keep the collector from touching, and so copying, the shared objects.
+    gc.freeze()
+
+
+def snapshot_version() -> tuple:
+    """Return the versions of the recipe files of all games."""
+    return tuple((game, recipe_version(game)) for game in discover_games())
+
+
+def main() -> None:
+    """Start the pre-forked server, send SIGHUP to reload all workers."""
+    options = parse_arguments()
+    setup_server_logging()
+    server = ReusableTCPServer((options.host, options.port), MyRequestHandler)
+    if not hasattr(os, "fork"):
+        logging.warning("Processes cannot be forked here, serving from one process.")
+        load_snapshots()
+        server.serve_forever()
+        return
+
+    logging.info("Serving on http://%s:%s", options.host, options.port)
+    PreforkServer(
+        server,
+        options.processes,
+        load_snapshots,
+        snapshot_version,
+        setup_server_logging,
+        options.poll_interval,
+    ).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
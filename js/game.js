@@ -40,12 +40,13 @@ async function selectGame() {
     const selectedGame = document.getElementById('game-select').value;
 
     try {
-        const response = await fetch(`/select_game?game=${encodeURIComponent(selectedGame)}`);
+        // Reload the recipes, the table then fetches one page at a time.
+        const response = await fetch(`/select_game?game=${encodeURIComponent(selectedGame)}&lazy=1`);
         if (!response.ok) {
             throw new Error('Network response was not ok');
         }
 
-        console.log('Game selected and data.json updated');
+        console.log('Game selected');
 
         // Fetch and populate specializations
         await fetchSpecialisations(selectedGame);
@@ -82,25 +83,8 @@ async function fetchSpecialisations(game) {
 }
 
 function filterRecipesBySpecialization(specialisation = '') {
-    const game = new URLSearchParams(window.location.search).get('game');
-    const urlSpecialisation = new URLSearchParams(window.location.search).get('specialisation');
-
-    // Use the specialisation from the URL if not passed in as an argument
-    const effectiveSpecialisation = specialisation || urlSpecialisation;
-    const url = `/filter_recipes/${game}/${effectiveSpecialisation}`;
-
-    fetch(url)
-        .then(response => response.json())
-        .then(data => {
-            // Handle the filtered recipe data (display, etc.)
-            console.log('Filtered recipes:', data);
-            // Assuming you have a function to display or process the data
-            calculateTableList();
-            attachEventListeners();
-        })
-        .catch(error => {
-            console.error('Error fetching filtered recipes:', error);
-        });
+    // The table only lists the items of the selected recipe file.
+    calculateTableList();
 }
 
 function getQueryParams() {
@@ -1,88 +1,58 @@
 // main.js
 
+// Number of craftable items loaded per page.
+const PAGE_SIZE = 50;
+let nextOffset = 0;
+// The page request in flight, if any.
+let pageRequest = null;
+
 async function calculateTableList() {
+    // Let a page that is still loading finish before the table is cleared.
+    if (pageRequest) {
+        await pageRequest;
+    }
+    const tableBody = document.getElementById('js-data-table-list');
+    tableBody.innerHTML = '';
+    nextOffset = 0;
+    await loadCraftablePage();
+}
+
+function loadCraftablePage() {
+    // Repeated clicks on "Load more" share one request, so no page is appended twice.
+    if (!pageRequest) {
+        const loadMoreButton = document.getElementById('js-load-more');
+        loadMoreButton.disabled = true;
+        pageRequest = fetchCraftablePage().finally(() => {
+            pageRequest = null;
+            loadMoreButton.disabled = false;
+        });
+    }
+    return pageRequest;
+}
+
+async function fetchCraftablePage() {
     try {
-        const response = await fetch('data.json');
+        const query = new URLSearchParams({
+            game: document.getElementById('game-select').value,
+            offset: nextOffset,
+            limit: PAGE_SIZE,
+        });
+        const specialisation = document.getElementById('specialisation-select').value;
+        if (specialisation) {
+            query.set('specialisation', specialisation);
+        }
+
+        const response = await fetch(`/api/craftables?${query}`);
         if (!response.ok) {
             throw new Error('Network response was not ok');
         }
-        const data = await response.json();
+        const page = await response.json();
         const tableBody = document.getElementById('js-data-table-list');
-        tableBody.innerHTML = '';
-
-        function createTableRow(item, depth = 0, parentQuantity = 1) {
-            let style = [];
-            if (depth > 0) {
-                const indent = ' '.repeat((depth) * 4); // Indentation for nested rows
-                style.push(`margin-left: ${indent}`)
-            }
-
-            if (style.length > 0) {
-                // Implode style array to a string.
-                style = style.join(';');
-            } else {
-                style = ''
-            }
-
-            const rarityClass = item.rarity ? `rarity-${item.rarity.toLowerCase()}` : '';  // Class for rarity
-            const depthClass = `depth-${depth}`;
-            const subTableDepthClass = `depth-${depth + 1}`;
-            const source = item.source || '';
-            const wiki = item.wiki || '';
-
-            const itemQuantity = item.quantity || 1;
-            const calculatedQuantity = itemQuantity * parentQuantity;
-
-            let rowHtml = `<tr class="${item.items ? 'expandable-row' : 'no-expand'} ${rarityClass} ${depthClass}" ${style}>`;
-            rowHtml += item.items
-                ? `<td class="item-name parent width30" onclick="toggleSubTable(this)" data-source="${source}" data-wiki="${wiki}">
-                        <span class="expand-icon">+</span>${item.name}
-                    </td>`
-                : `<td class="item-name ${rarityClass} width30" data-source="${source}" data-wiki="${wiki}">${item.name}</td>`;
-
-            const disabledAttr = depth > 0 ? 'disabled="disabled"' : '';
-
-            // td quantity start.
-            rowHtml += `<td class="quantity">`;
-
-            if (depth === 0) {
-                rowHtml += `<button class="minus-btn">-</button>`
-            }
-            rowHtml += `<input class="quantity-input" type="text" size="4" ${disabledAttr} data-quantity-original="${itemQuantity}" value="${calculatedQuantity}"/>`
-
-            if (depth === 0) {
-                rowHtml += `<button class="plus-btn">+</button>`
-            }
-
-            rowHtml += `</td>`;
-            // td quantity end.
-
-            if (depth === 0) {
-                rowHtml += `<td class="output-wrapper">`;
-                rowHtml += `<button class="copy-btn">Copy</button>`;
-                rowHtml += `<textarea class="output" rows="1" cols="50"></textarea>`;
-                rowHtml += `</td>`;
-            }
-
-            rowHtml += `</tr>`;
-
-            if (item.items) {
-                rowHtml += `<tr class="sub-table-row collapse ${depthClass}" style="display: none;">
-                            <td colspan="3">
-                                <table class="sub-table ${subTableDepthClass}">
-                                    <tr class="table-header-row"><th class="sub-item">Sub-Item</th><th class="quantity-required">Quantity Required</th></tr>`;
-                for (const subItem in item.items) {
-                    rowHtml += createTableRow(item.items[subItem], depth + 1, calculatedQuantity);
-                }
-                rowHtml += `</table></td></tr>`;
-            }
-
-            return rowHtml;
-        }
+        tableBody.insertAdjacentHTML('beforeend', page.items.map(item => createTableRow(item)).join(''));
 
-        for (const key in data) {
-            tableBody.innerHTML += createTableRow(data[key]);
-        }
+        nextOffset = page.offset + page.items.length;
+        const loadMoreButton = document.getElementById('js-load-more');
+        loadMoreButton.style.display = nextOffset < page.total ? '' : 'none';
 
         attachEventListeners();
     } catch (error) {
@@ -90,13 +60,111 @@ async function calculateTableList() {
     }
 }
 
-function toggleSubTable(element) {
+function createTableRow(item, depth = 0, parentQuantity = 1) {
+    let style = [];
+    if (depth > 0) {
+        const indent = ' '.repeat((depth) * 4); // Indentation for nested rows
+        style.push(`margin-left: ${indent}`)
+    }
+
+    if (style.length > 0) {
+        // Implode style array to a string.
+        style = style.join(';');
+    } else {
+        style = ''
+    }
+
+    const rarityClass = item.rarity ? `rarity-${item.rarity.toLowerCase()}` : '';  // Class for rarity
+    const depthClass = `depth-${depth}`;
+    const subTableDepthClass = `depth-${depth + 1}`;
+    const source = item.source || '';
+    const wiki = item.wiki || '';
+    const encodedName = encodeURIComponent(item.name);
+
+    const itemQuantity = item.quantity || 1;
+    const calculatedQuantity = itemQuantity * parentQuantity;
+
+    let rowHtml = `<tr class="${item.craftable ? 'expandable-row' : 'no-expand'} ${rarityClass} ${depthClass}" ${style}>`;
+    rowHtml += item.craftable
+        ? `<td class="item-name parent width30" onclick="toggleSubTable(this)" data-item="${encodedName}" data-source="${source}" data-wiki="${wiki}">
+                <span class="expand-icon">+</span>${item.name}
+            </td>`
+        : `<td class="item-name ${rarityClass} width30" data-item="${encodedName}" data-source="${source}" data-wiki="${wiki}">${item.name}</td>`;
+
+    const disabledAttr = depth > 0 ? 'disabled="disabled"' : '';
+
+    // td quantity start.
+    rowHtml += `<td class="quantity">`;
+
+    if (depth === 0) {
+        rowHtml += `<button class="minus-btn">-</button>`
+    }
+    rowHtml += `<input class="quantity-input" type="text" size="4" ${disabledAttr} data-quantity-original="${itemQuantity}" value="${calculatedQuantity}"/>`
+
+    if (depth === 0) {
+        rowHtml += `<button class="plus-btn">+</button>`
+    }
+
+    rowHtml += `</td>`;
+    // td quantity end.
+
+    if (depth === 0) {
+        rowHtml += `<td class="output-wrapper">`;
+        rowHtml += `<button class="copy-btn">Copy</button>`;
+        rowHtml += `<textarea class="output" rows="1" cols="50"></textarea>`;
+        rowHtml += `</td>`;
+    }
+
+    rowHtml += `</tr>`;
+
+    // Child items are loaded when the row is expanded for the first time.
+    if (item.craftable) {
+        rowHtml += `<tr class="sub-table-row collapse ${depthClass}" style="display: none;" data-item="${encodedName}" data-depth="${depth + 1}" data-loaded="false">
+                    <td colspan="3">
+                        <table class="sub-table ${subTableDepthClass}">
+                            <tr class="table-header-row"><th class="sub-item">Sub-Item</th><th class="quantity-required">Quantity Required</th></tr>
+                        </table>
+                    </td>
+                </tr>`;
+    }
+
+    return rowHtml;
+}
+
+async function loadSubTable(subTableRow) {
+    const row = subTableRow.previousElementSibling;
+    const parentQuantity = parseFloat(row.querySelector('.quantity-input').value) || 1;
+    const query = new URLSearchParams({
+        game: document.getElementById('game-select').value,
+        item: decodeURIComponent(subTableRow.dataset.item),
+    });
+
+    try {
+        const response = await fetch(`/api/children?${query}`);
+        if (!response.ok) {
+            throw new Error('Network response was not ok');
+        }
+        const data = await response.json();
+        const depth = parseInt(subTableRow.dataset.depth);
+        const subTable = subTableRow.querySelector('.sub-table');
+        subTable.insertAdjacentHTML('beforeend', data.items.map(child => createTableRow(child, depth, parentQuantity)).join(''));
+        subTableRow.dataset.loaded = 'true';
+        attachEventListeners();
+    } catch (error) {
+        console.error('Error fetching child items:', error);
+    }
+}
+
+async function toggleSubTable(element) {
     const icon = element.querySelector('.expand-icon');
     const row = element.closest('tr');
     const subTableRow = row.nextElementSibling;
     const outputWrapperTextarea = row.querySelector('.output-wrapper textarea');
 
     if (subTableRow.style.display === 'none') {
+        if (subTableRow.dataset.loaded === 'false') {
+            await loadSubTable(subTableRow);
+        }
         // Expand
         subTableRow.style.display = '';
         icon.textContent = '-';
@@ -119,7 +187,6 @@ function loadAndAttachListeners() {
     selectGame().then(() => {
         const selectedGame = document.getElementById('game-select').value;
         setQueryStringParameter('game', selectedGame);
-        calculateTableList();
 
         // Show specialisation filter wrapper.
         const elements = document.getElementsByClassName('specialisation-wrapper');
@@ -172,98 +239,79 @@ function attachEventListeners() {
         input.addEventListener('click', processQuantityButtonClick);
     });
 
+    // Runs again after every page and subtree load, so only named handlers are
+    // bound, which the browser adds once per element.
     const copyButtons = document.getElementsByClassName("copy-btn");
     Array.from(copyButtons).forEach(button => {
-        button.addEventListener("click", function () {
-            // Get the text to copy
-            const copyText = button.closest('tr').querySelector('.output');
-            if (copyText) {
-                copyText.select();
-                copyText.setSelectionRange(0, 99999); // For mobile compatibility
-                navigator.clipboard.writeText(copyText.value).then(() => {
-                    // alert("Text copied to clipboard!");
-                }).catch(err => {
-                    console.error("Failed to copy text: ", err);
-                });
-            }
-        });
+        button.removeEventListener("click", copyOutput);
+        button.addEventListener("click", copyOutput);
     });
 }
 
-function updateOutput(event) {
+function copyOutput(event) {
+    // Get the text to copy
+    const copyText = event.target.closest('tr').querySelector('.output');
+    if (copyText) {
+        copyText.select();
+        copyText.setSelectionRange(0, 99999); // For mobile compatibility
+        navigator.clipboard.writeText(copyText.value).then(() => {
+            // alert("Text copied to clipboard!");
+        }).catch(err => {
+            console.error("Failed to copy text: ", err);
+        });
+    }
+}
+
+async function updateOutput(event) {
     const input = event.target;
     const row = input.closest('tr');
-    const subTableRow = row.nextElementSibling;
-
-    if (subTableRow && subTableRow.classList.contains('sub-table-row')) {
-        const subTable = subTableRow.querySelector('.sub-table');
-        const subItems = subTable.querySelectorAll('tr.expandable-row, tr.no-expand');
-
-        // Retrieve the original quantity from the input field's parent row
-        const originalQuantity = parseInt(row.querySelector('.quantity').getAttribute('data-quantity-original') || 1);
-        const newQuantity = parseInt(input.value || 1);
-        const multiplicationFactor = newQuantity / originalQuantity;
-
-        const gatherMap = new Map();
-        const craftMap = new Map();
-
-        subItems.forEach(subItemRow => {
-            const subItemNameElement = subItemRow.querySelector('.item-name');
-            let subItemName = subItemNameElement ? subItemNameElement.textContent.trim() : 'Unknown Item';
-
-            // Remove leading '+' or '-' character if present
-            subItemName = subItemName.replace(/^[+-]/, '').trim();
-
-            const subItemQuantityInput = subItemRow.querySelector('.quantity input');
-            const subItemOriginalQuantity = parseInt(subItemQuantityInput.value || 1);
-            const adjustedQuantity = subItemOriginalQuantity * multiplicationFactor;
-
-            const rarityClass = [...subItemRow.classList].find(cls => cls.startsWith('rarity-'));
-            const rarity = rarityClass ? `rarity: ${rarityClass.split('-')[1]}` : '';
-            const source = subItemNameElement.dataset.source || '';
-            const wiki = subItemNameElement.dataset.wiki || '';
-            const key = `${subItemName}|${rarity}|${source}|${wiki}`;
-
-            const targetMap = subItemRow.classList.contains('expandable-row') ? craftMap : gatherMap;
-
-            if (targetMap.has(key)) {
-                targetMap.set(key, targetMap.get(key) + adjustedQuantity);
-            } else {
-                targetMap.set(key, adjustedQuantity);
-            }
-        });
+    const outputTextarea = row.querySelector('.output');
+    if (!outputTextarea) {
+        return;
+    }
 
-        // Convert maps to sorted arrays
-        const gatherItems = Array.from(gatherMap).map(([key, quantity]) => {
-            const [name, rarity, source, wiki] = key.split('|');
-            return ` - ${name}: ${quantity}${rarity ? `, ${rarity}` : ''}${source ? `, source: ${source}` : ''}${wiki ? `, wiki: ${wiki}` : ''}`;
-        }).sort();
+    // Subtrees are only loaded when expanded, so let the server expand the item.
+    const toCraftItem = decodeURIComponent(row.querySelector('.item-name').dataset.item);
+    const toCraftQuantity = input.value;
+    const query = new URLSearchParams({
+        game: document.getElementById('game-select').value,
+        item: toCraftItem,
+        amount: parseInt(toCraftQuantity || 1),
+    });
 
-        const craftItems = Array.from(craftMap).map(([key, quantity]) => {
-            const [name, rarity, source, wiki] = key.split('|');
-            return ` - ${name}: ${quantity}${rarity ? `, ${rarity}` : ''}${source ? `, source: ${source}` : ''}${wiki ? `, wiki: ${wiki}` : ''}`;
-        }).sort();
+    try {
+        const response = await fetch(`/calculate?${query}`);
+        if (!response.ok) {
+            throw new Error('Network response was not ok');
+        }
+        const data = await response.json();
 
-        let toCraftItem = row.querySelector('.item-name').textContent.trim();
-        // Remove leading '+' or '-' character if present
-        toCraftItem = toCraftItem.replace(/^[+-]/, '').trim();
+        const describe = details => {
+            const rarity = details.rarity ? `, rarity: ${details.rarity.toLowerCase()}` : '';
+            const source = details.source ? `, source: ${details.source}` : '';
+            const wiki = details.wiki ? `, wiki: ${details.wiki}` : '';
+            return ` - ${details.name}: ${details.quantity}${rarity}${source}${wiki}`;
+        };
+        const gatherItems = Object.values(data.shopping_list).map(describe).sort();
+        const craftItems = Object.values(data.intermediates)
+            .filter(details => details.name !== toCraftItem)
+            .map(describe)
+            .sort();
 
-        const toCraftQuantity = row.querySelector('.quantity input').value;
         const toCraftText = `To craft:\n${toCraftItem}: ${toCraftQuantity}`;
         const gatherItemsText = `Gather these items:\n${gatherItems.join('\n')}`;
         const craftItemsText = `Craft these intermediate items:\n${craftItems.join('\n')}`;
 
-        const outputTextarea = row.querySelector('.output');
-        if (outputTextarea) {
-            outputTextarea.value = `${toCraftText}\n\n${gatherItemsText}\n\n${craftItemsText}`;
-            // Auto-size the textarea
-            outputTextarea.style.height = 'auto'; // Reset height
-            outputTextarea.style.height = `${outputTextarea.scrollHeight}px`; // Set height based on content
+        outputTextarea.value = `${toCraftText}\n\n${gatherItemsText}\n\n${craftItemsText}`;
+        // Auto-size the textarea
+        outputTextarea.style.height = 'auto'; // Reset height
+        outputTextarea.style.height = `${outputTextarea.scrollHeight}px`; // Set height based on content
 
-            // Show the copy button
-            const closestTableRow = outputTextarea.closest("tr");
-            closestTableRow.querySelector('.copy-btn').style.display = "block";
-        }
+        // Show the copy button
+        const closestTableRow = outputTextarea.closest("tr");
+        closestTableRow.querySelector('.copy-btn').style.display = "block";
+    } catch (error) {
+        console.error('Error calculating items:', error);
     }
 }
 
@@ -0,0 +1,73 @@
+"""Recipes shared by the tests: a small smithing game with prices and yields."""
+
+import copy
+
+import pytest
+from yaml import safe_dump
+
+from crafting.graph import RecipeGraph
+from crafting.store import RecipeStore, compile_store
+
+GAME = "testgame"
+
+# Ingots are smelted two at a time. Shields list their items in list form.
+RECIPES = [
+    {"name": "Ore", "source": "mining", "buy_from_vendor": 2},
+    {"name": "Wood", "source": "logging", "buy_from_vendor": 1},
+    {
+        "name": "Ingot",
+        "source": "smelter",
+        "quantity": 2,
+        "crafting_cost": 1,
+        "buy_from_vendor": 5,
+        "items": {"Ore": 3},
+    },
+    {
+        "name": "Plank",
+        "source": "sawmill",
+        "crafting_cost": 1,
+        "buy_from_vendor": 2,
+        "items": {"Wood": 2},
+    },
+    {
+        "name": "Sword",
+        "source": "forge",
+        "crafting_cost": 10,
+        "sell_to_vendor": 40,
+        "items": {"Ingot": 1, "Plank": 1},
+    },
+    {
+        "name": "Shield",
+        "source": "forge",
+        "crafting_cost": 5,
+        "items": [{"name": "Ingot", "quantity": 1}, {"name": "Plank", "quantity": 2}],
+    },
+]
+
+
+@pytest.fixture
+def inventory():
+    """The recipes keyed by name, copied so tests may change them."""
+    return {recipe["name"]: recipe for recipe in copy.deepcopy(RECIPES)}
+
+
+@pytest.fixture
+def graph(inventory):
+    return RecipeGraph(inventory)
+
+
+@pytest.fixture
+def game_dir(tmp_path, monkeypatch):
+    """A recipe folder of the test game, with the working directory above it."""
+    path = tmp_path / "recipes" / GAME
+    path.mkdir(parents=True)
+    (path / "smithing.yml").write_text(safe_dump(RECIPES), encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    return path
+
+
+@pytest.fixture
+def store(game_dir):
+    compile_store(GAME)
+    with RecipeStore.open(GAME) as recipe_store:
+        yield recipe_store
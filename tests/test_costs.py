@@ -0,0 +1,49 @@
+"""Tests of the min-cost plan and the cost totals of shopping lists."""
+
+from crafting.costs import BUY, CRAFT, plan_costs
+from crafting_calculator import craft_items
+
+
+def test_plan_buys_items_cheaper_than_crafting(graph):
+    plan = plan_costs(graph)
+    # An ingot costs (1 + 3 ore * 2) / 2 = 3.5 to craft, less than its price.
+    assert plan.unit_costs["Ingot"] == 3.5
+    assert plan.decisions["Ingot"] == CRAFT
+    # A plank costs 1 + 2 wood * 1 = 3 to craft, more than its price.
+    assert plan.unit_costs["Plank"] == 2
+    assert plan.decisions["Plank"] == BUY
+    assert plan.bought == {"Plank"}
+    assert plan.crafted_costs["Sword"] == 16.5
+
+
+def test_min_cost_totals(inventory, graph):
+    shopping_list = craft_items({"Sword": 2}, inventory, min_cost=True, graph=graph)
+    assert shopping_list.decisions == {"Sword": CRAFT, "Ingot": CRAFT, "Plank": BUY}
+    assert sorted(shopping_list.items) == ["Ore", "Plank"]
+    # Swords 2 * 10, one ingot craft 1, planks 2 * 2 and ore 3 * 2.
+    assert shopping_list.total_cost == 31
+    # Crafting the planks costs 2 * 1 plus 4 wood * 1 instead.
+    assert shopping_list.savings == 2
+    assert shopping_list.crafting_cost == 21
+    assert shopping_list.buy_from_vendor == 10
+    assert shopping_list.sell_to_vendor == 80
+    assert shopping_list.crafting_cost + shopping_list.buy_from_vendor == (
+        shopping_list.total_cost
+    )
+
+
+def test_cost_totals_without_min_cost(inventory, graph):
+    shopping_list = craft_items({"Sword": 2}, inventory, graph=graph)
+    assert shopping_list.total_cost is None
+    assert shopping_list.crafting_cost == 23
+    assert shopping_list.buy_from_vendor == 10
+    costs = shopping_list.costs
+    assert costs["items"]["Ingot"]["crafting_cost"] == 1
+    assert costs["sources"]["forge"]["sell_to_vendor"] == 80
+
+
+def test_costs_follow_changes_of_the_list(inventory, graph):
+    shopping_list = craft_items({"Sword": 2}, inventory, graph=graph)
+    assert shopping_list.buy_from_vendor == 10
+    shopping_list.items = {"Ore": {"name": "Ore", "quantity": 1}}
+    assert shopping_list.buy_from_vendor == 2
@@ -0,0 +1,74 @@
+"""Tests of the recipe snapshot diff."""
+
+import copy
+
+import pytest
+
+from crafting.diff import ADDED, CHANGED, REMOVED, _Totals, diff_snapshots
+from crafting.graph import RecipeGraph
+
+
+@pytest.fixture
+def new_graph(inventory):
+    inventory = copy.deepcopy(inventory)
+    inventory["Ore"]["buy_from_vendor"] = 3
+    inventory["Plank"]["items"] = {"Wood": 3}
+    inventory["Axe"] = {"name": "Axe", "items": {"Ingot": 1}}
+    del inventory["Shield"]
+    return RecipeGraph(inventory)
+
+
+def full_totals(graph):
+    """Expand every item of a graph again, without sharing anything."""
+    totals = _Totals(graph, set(graph.names), {})
+    return {name: totals(name) for name in graph.names if graph.is_craftable(name)}
+
+
+def test_diff_lists_changed_recipes(graph, new_graph):
+    report = diff_snapshots(graph, new_graph)
+    assert report["changed"] == {
+        "Axe": ADDED,
+        "Ore": CHANGED,
+        "Plank": CHANGED,
+        "Shield": REMOVED,
+    }
+
+
+def test_diff_reports_materials_and_costs(graph, new_graph):
+    items = diff_snapshots(graph, new_graph)["items"]
+    assert sorted(items) == ["Axe", "Ingot", "Plank", "Shield", "Sword"]
+
+    sword = items["Sword"]
+    assert sword["status"] == CHANGED
+    assert sword["materials"] == {"Wood": {"old": 2.0, "new": 3.0, "delta": 1.0}}
+    # Ingots cost (1 + 3 * 3) / 2 = 5 instead of 3.5, planks 4 instead of 3.
+    assert sword["cost"] == {"old": 16.5, "new": 19.0, "delta": 2.5}
+
+    assert items["Axe"]["status"] == ADDED
+    assert items["Axe"]["materials"] == {"Ore": {"old": 0.0, "new": 1.5, "delta": 1.5}}
+    assert items["Shield"]["status"] == REMOVED
+    assert items["Shield"]["cost"]["new"] == 0.0
+
+
+def test_diff_matches_full_recompute(graph, new_graph):
+    report = diff_snapshots(graph, new_graph)
+    old, new = full_totals(graph), full_totals(new_graph)
+    for item_name in old.keys() | new.keys():
+        old_materials, old_cost = old.get(item_name, ({}, 0.0))
+        new_materials, new_cost = new.get(item_name, ({}, 0.0))
+        details = report["items"].get(item_name)
+        if old_materials == new_materials and old_cost == new_cost:
+            assert details is None
+            continue
+        assert details["cost"]["old"] == pytest.approx(old_cost)
+        assert details["cost"]["new"] == pytest.approx(new_cost)
+        for material, quantity in details["materials"].items():
+            assert quantity["old"] == pytest.approx(old_materials.get(material, 0.0))
+            assert quantity["new"] == pytest.approx(new_materials.get(material, 0.0))
+
+
+def test_diff_of_equal_snapshots_is_empty(graph, inventory):
+    assert diff_snapshots(graph, RecipeGraph(inventory)) == {
+        "changed": {},
+        "items": {},
+    }
@@ -0,0 +1,46 @@
+"""Tests of the recipe graph and its netting pass."""
+
+import pytest
+
+from crafting.costs import plan_costs
+from crafting.graph import RecipeGraph
+
+
+def test_net_requirements_rounds_up_to_whole_crafts(graph):
+    required, used = graph.net_requirements({"Sword": 3}, {})
+    assert required == {"Sword": 3, "Ingot": 3, "Plank": 3, "Ore": 6, "Wood": 6}
+    assert used == {}
+
+
+def test_net_requirements_aggregates_shared_intermediates(graph):
+    # Both targets need one ingot, which is one craft together, not two.
+    required, _ = graph.net_requirements({"Sword": 1, "Shield": 1}, {})
+    assert required["Ingot"] == 2
+    assert required["Ore"] == 3
+    assert required["Wood"] == 6
+
+
+def test_net_requirements_uses_owned_items_first(graph):
+    required, used = graph.net_requirements({"Sword": 3}, {"Ingot": 1, "Wood": 100})
+    assert required == {"Sword": 3, "Ingot": 2, "Plank": 3, "Ore": 3}
+    assert used == {"Ingot": 1, "Wood": 6}
+
+
+def test_net_requirements_does_not_break_down_bought_items(graph):
+    required, _ = graph.net_requirements({"Sword": 1}, {}, buy={"Plank"})
+    assert required == {"Sword": 1, "Ingot": 1, "Plank": 1, "Ore": 3}
+
+
+def test_recipe_cycle_is_rejected():
+    with pytest.raises(ValueError, match="cycle"):
+        RecipeGraph({"A": {"items": {"B": 1}}, "B": {"items": {"A": 1}}})
+
+
+def test_memo_entries_count_every_cached_item(graph):
+    assert graph.memo_entries() == 0
+    graph.used_in_transitively("Ore")
+    graph.used_in_transitively("Wood")
+    graph.used_in_transitively("Ore")
+    assert graph.memo_entries() == 2
+    plan_costs(graph)
+    assert graph.memo_entries() == 3
@@ -0,0 +1,56 @@
+"""Tests of the requirement matrix export."""
+
+import ast
+import csv
+from array import array
+
+from crafting.costs import COST_KEYS
+from crafting.matrix import NPY_ALIGNMENT, export_matrix, requirement_rows
+
+
+def read_npy(path):
+    """Read a .npy file written by write_npy, without NumPy."""
+    data = path.read_bytes()
+    assert data[:8] == b"\x93NUMPY\x01\x00"
+    length = int.from_bytes(data[8:10], "little")
+    assert (10 + length) % NPY_ALIGNMENT == 0
+    header = ast.literal_eval(data[10 : 10 + length].decode("latin1"))
+    values = array("d" if header["descr"] == "<f8" else "q")
+    values.frombytes(data[10 + length :])
+    return header["shape"], list(values)
+
+
+def test_requirement_rows_divide_by_yield(graph):
+    rows = requirement_rows(graph)
+    ore, wood = graph.index["Ore"], graph.index["Wood"]
+    assert rows[graph.index["Sword"]] == {ore: 1.5, wood: 2.0}
+    assert rows[graph.index["Shield"]] == {ore: 1.5, wood: 4.0}
+    assert rows[ore] == {ore: 1.0}
+
+
+def test_export_matrix(graph, tmp_path):
+    export_matrix(graph, tmp_path)
+
+    # Rows are the craftable items and columns the base materials, by name.
+    shape, dense = read_npy(tmp_path / "requirements.npy")
+    assert shape == (4, 2)
+    assert dense == [1.5, 0.0, 0.0, 2.0, 1.5, 4.0, 1.5, 2.0]
+
+    _, rows = read_npy(tmp_path / "requirements_row.npy")
+    _, cols = read_npy(tmp_path / "requirements_col.npy")
+    _, data = read_npy(tmp_path / "requirements_data.npy")
+    assert [dense[row * 2 + col] for row, col in zip(rows, cols)] == data
+    assert len(data) == sum(1 for value in dense if value)
+
+    shape, costs = read_npy(tmp_path / "costs.npy")
+    assert shape == (4, len(COST_KEYS))
+    assert costs[-3:] == [10.0, 0.0, 40.0]
+
+    with open(tmp_path / "items.csv", newline="", encoding="utf-8") as file:
+        items = [row["name"] for row in csv.DictReader(file)]
+    assert items == ["Ingot", "Plank", "Shield", "Sword"]
+    with open(tmp_path / "requirements.csv", newline="", encoding="utf-8") as file:
+        cells = list(csv.reader(file))
+    assert cells[0] == ["item", "material", "quantity"]
+    assert ["Plank", "Wood", "2"] in cells
+    assert ["Sword", "Ore", "1.5"] in cells
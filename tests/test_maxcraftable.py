@@ -0,0 +1,96 @@
+"""Tests of the max-craftable solvers."""
+
+import pytest
+
+from crafting import maxcraftable
+from crafting.graph import RecipeGraph
+from crafting.maxcraftable import (
+    base_requirements,
+    is_craftable_from,
+    max_craftable,
+    max_craftable_mix,
+)
+from crafting_calculator import parse_arguments
+
+
+@pytest.fixture
+def graph():
+    """A sword of an ingot and wood, ingots are smelted two at a time."""
+    return RecipeGraph(
+        {
+            "Sword": {"items": {"Ingot": 1, "Wood": 1}},
+            "Ingot": {"quantity": 2, "items": {"Ore": 3}},
+            "Shield": {"items": {"Ingot": 2}},
+            "Ore": {},
+            "Wood": {},
+        }
+    )
+
+
+def test_base_requirements_divide_by_yield(graph):
+    assert base_requirements(graph, "Sword") == {"Ore": 1.5, "Wood": 1.0}
+
+
+def test_max_craftable_with_yield(graph):
+    on_hand = {"Ore": 6, "Wood": 10}
+    assert is_craftable_from(graph, {"Sword": 4}, on_hand)
+    assert not is_craftable_from(graph, {"Sword": 5}, on_hand)
+    assert max_craftable(graph, "Sword", on_hand) == 4
+
+
+def test_max_craftable_with_owned_intermediates(graph):
+    on_hand = {"Ore": 3, "Ingot": 1, "Wood": 10}
+    assert max_craftable(graph, "Sword", on_hand) == 3
+
+
+def test_max_craftable_of_base_item(graph):
+    assert max_craftable(graph, "Ore", {"Ore": 6}) == 0
+
+
+def test_max_craftable_mix_single_target(graph):
+    amounts, method = max_craftable_mix(graph, {"Sword": 1}, {"Ore": 6, "Wood": 3})
+    assert amounts == {"Sword": 3}
+    assert method == "bottleneck"
+
+
+@pytest.mark.parametrize(
+    "weights, expected",
+    [
+        ({"Sword": 3, "Shield": 5}, {"Sword": 4, "Shield": 0}),
+        ({"Sword": 3, "Shield": 7}, {"Sword": 0, "Shield": 2}),
+    ],
+)
+def test_max_craftable_mix_shares_intermediates(graph, weights, expected):
+    # 6 ore make 4 ingots, shared by swords of one and shields of two ingots.
+    amounts, _ = max_craftable_mix(graph, weights, {"Ore": 6, "Wood": 10})
+    assert amounts == expected
+
+
+@pytest.mark.skipif(maxcraftable.milp is None, reason="scipy is not installed")
+@pytest.mark.parametrize(
+    "on_hand, expected",
+    [
+        ({"Ore": 5, "Wood": 10}, {"Sword": 2, "Shield": 0}),
+        ({"Ore": 6, "Wood": 10}, {"Sword": 4, "Shield": 0}),
+        ({"Ore": 3, "Ingot": 1, "Wood": 10}, {"Sword": 3, "Shield": 0}),
+    ],
+)
+def test_max_craftable_mix_milp_crafts_whole_recipes(graph, on_hand, expected):
+    # 5 ore smelt one batch of two ingots, not 5 / 3 batches of 10 / 3 ingots.
+    amounts, method = max_craftable_mix(graph, {"Sword": 1, "Shield": 1}, on_hand)
+    assert method == "milp"
+    assert amounts == expected
+    assert amounts == maxcraftable._search(graph, {"Sword": 1, "Shield": 1}, on_hand)
+
+
+@pytest.mark.parametrize("weight", ["lots", "0", "-1", "nan", "inf"])
+def test_max_craftable_rejects_invalid_weights(weight, capsys):
+    with pytest.raises(SystemExit):
+        parse_arguments(["--game", "testgame", "--max-craftable", f"Sword={weight}"])
+    assert "argument --max-craftable: weight of Sword" in capsys.readouterr().err
+
+
+def test_max_craftable_weights():
+    argv = ["--game", "testgame", "--max-craftable", "Sword=2.5", "--max-craftable=A"]
+    options = parse_arguments(argv)
+    assert options.weights == {"Sword": 2.5, "A": 1}
@@ -0,0 +1,38 @@
+"""Tests of owned items, checked and subtracted before planning."""
+
+import pytest
+
+from crafting_calculator import craft_items, load_on_hand, validate_on_hand
+
+
+def test_validate_on_hand():
+    assert validate_on_hand({"Ore": 3, "Wood": 0.5}) == {"Ore": 3, "Wood": 0.5}
+
+
+@pytest.mark.parametrize(
+    "content",
+    [{"Ore": "lots"}, {"Ore": -1}, {"Ore": True}, {"Ore": float("nan")}, ["Ore"]],
+)
+def test_validate_on_hand_rejects_invalid_amounts(content):
+    with pytest.raises(ValueError):
+        validate_on_hand(content)
+
+
+def test_load_on_hand_names_the_file(tmp_path):
+    path = tmp_path / "owned.yml"
+    path.write_text("Ore: 3\n", encoding="utf-8")
+    assert load_on_hand(path) == {"Ore": 3}
+    path.write_text("Ore: lots\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="owned.yml"):
+        load_on_hand(path)
+
+
+def test_owned_intermediates_replace_their_children(inventory, graph):
+    shopping_list = craft_items(
+        {"Sword": 3}, inventory, graph=graph, on_hand={"Ingot": 1, "Wood": 100}
+    )
+    assert shopping_list.on_hand_used == {"Ingot": 1, "Wood": 6}
+    assert shopping_list.intermediate_steps["Ingot"]["quantity"] == 2
+    assert shopping_list.items == {
+        "Ore": {**inventory["Ore"], "quantity": 3},
+    }
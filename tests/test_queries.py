@@ -0,0 +1,56 @@
+"""Tests of the queries answered by --stdin."""
+
+import argparse
+import io
+import json
+
+import pytest
+
+from crafting_calculator import answer_queries, parse_query
+
+
+def test_parse_query_formats():
+    assert parse_query('{"item": "Sword", "amount": 2}', 1) == ("Sword", 2, "json")
+    assert parse_query('{"item": "Sword", "amount": "2"}', 1) == ("Sword", 2, "json")
+    assert parse_query("Sword\t3\ttext", 1) == ("Sword", 3, "text")
+    assert parse_query("Sword", 5) == ("Sword", 5, "json")
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        '{"item": "Sword", "amount": null}',
+        '{"item": "Sword", "amount": true}',
+        '{"item": "Sword", "amount": 2.5}',
+        "Sword\t-5",
+        "Sword\t0",
+        "Sword\tmany",
+        '{"amount": 1}',
+        "Sword\t1\tpdf",
+    ],
+)
+def test_parse_query_rejects_invalid_lines(line):
+    with pytest.raises(ValueError):
+        parse_query(line, 1)
+
+
+def test_answer_queries_reports_errors_per_line(graph):
+    options = argparse.Namespace(amount=1, min_cost=False, schedule=False)
+    lines = ['{"item": "Sword", "amount": null}', "Unknown", "", "Sword\t2\ttext"]
+    output = io.StringIO()
+    answer_queries(graph, options, None, lines, output)
+    answers = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert len(answers) == 3
+    assert answers[0]["query"] == lines[0]
+    assert "error" in answers[0]
+    assert answers[1] == {"item": "Unknown", "amount": 1, "error": "unknown item"}
+    assert answers[2]["text"].startswith("You selected:\nSword: quantity: 2")
+
+
+def test_answer_queries_with_schedule(graph):
+    options = argparse.Namespace(amount=1, min_cost=False, schedule=True)
+    output = io.StringIO()
+    answer_queries(graph, options, None, ['{"item": "Sword", "amount": 3}'], output)
+    result = json.loads(output.getvalue())["result"]
+    assert result["shopping_list"]["Ore"]["quantity"] == 6
+    assert result["schedule"]["leftovers"] == {"Ingot": 1}
@@ -0,0 +1,109 @@
+"""Tests of the shopping list renderers."""
+
+import csv
+import io
+
+import pytest
+
+from crafting.render import RENDERERS, ColumnLayout, Renderer, render
+from crafting_calculator import craft_items
+
+
+@pytest.fixture
+def shopping_list(inventory, graph):
+    return craft_items({"Sword": 2}, inventory, graph=graph)
+
+
+def rendered(shopping_list, output_format):
+    stream = io.StringIO()
+    render(shopping_list, output_format, stream)
+    return stream.getvalue()
+
+
+def test_column_layout_orders_keys():
+    layout = ColumnLayout()
+    details = {"name": "Ore", "buy_from_vendor": 2, "source": "mining", "quantity": 3}
+    assert layout.keys(details) == ("quantity", "source", "buy_from_vendor")
+    assert layout.columns([details, {"rarity": "green", "wiki": "url"}]) == (
+        "quantity",
+        "rarity",
+        "source",
+        "wiki",
+        "buy_from_vendor",
+    )
+
+
+def test_renderers_implement_sections():
+    with pytest.raises(TypeError):
+        Renderer(io.StringIO())
+    assert all(issubclass(renderer, Renderer) for renderer in RENDERERS.values())
+
+
+def test_text(shopping_list):
+    text = rendered(shopping_list, "text")
+    assert text == shopping_list.format_for_text_display() + "\n"
+    assert text.splitlines()[:5] == [
+        "You selected:",
+        "Sword: quantity: 2, source: forge, crafting_cost: 10, sell_to_vendor: 40",
+        "",
+        "Gather these items:",
+        "Ore: quantity: 3, source: mining, buy_from_vendor: 2",
+    ]
+
+
+def test_markdown(shopping_list):
+    lines = rendered(shopping_list, "markdown").splitlines()
+    start = lines.index("## Gather these items")
+    assert lines[start + 2 : start + 6] == [
+        "| name | quantity | source | buy_from_vendor |",
+        "| --- | --- | --- | --- |",
+        "| Ore | 3 | mining | 2 |",
+        "| Wood | 4 | logging | 1 |",
+    ]
+
+
+def test_markdown_escapes_pipes():
+    stream = io.StringIO()
+    RENDERERS["markdown"](stream).render_tables([("T", {"A|B": {"quantity": 1}})])
+    assert "| A\\|B | 1 |" in stream.getvalue()
+
+
+def test_csv(shopping_list):
+    rows = list(csv.reader(io.StringIO(rendered(shopping_list, "csv"))))
+    assert rows[0] == [
+        "section",
+        "name",
+        "quantity",
+        "source",
+        "crafting_cost",
+        "sell_to_vendor",
+        "buy_from_vendor",
+    ]
+    assert ["Gather these items", "Ore", "3", "mining", "", "", "2"] in rows
+    assert len(rows) == 1 + 1 + 2 + 3
+
+
+def test_html(shopping_list):
+    document = rendered(shopping_list, "html")
+    assert document.startswith("<!DOCTYPE html>")
+    assert document.endswith("</html>\n")
+    assert document.count("<table>") == 3
+    assert "<tr><td>Ore</td><td>3</td><td>mining</td><td>2</td></tr>" in document
+
+
+def test_html_escapes_names():
+    stream = io.StringIO()
+    RENDERERS["html"](stream).render_tables([("<T>", {"A<B": {"quantity": 1}})])
+    assert "<h2>&lt;T&gt;</h2>" in stream.getvalue()
+    assert "<td>A&lt;B</td>" in stream.getvalue()
+
+
+@pytest.mark.parametrize("output_format", sorted(RENDERERS))
+def test_totals_of_min_cost_lists(inventory, graph, output_format):
+    shopping_list = craft_items({"Sword": 2}, inventory, min_cost=True, graph=graph)
+    output = rendered(shopping_list, output_format)
+    if output_format == "csv":
+        assert "Total cost" not in output
+    else:
+        assert "Total cost" in output
+        assert "31.00" in output
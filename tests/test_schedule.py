@@ -0,0 +1,46 @@
+"""Tests of the crafting schedule."""
+
+from crafting.schedule import CraftingSchedule
+from crafting_calculator import craft_items
+
+
+def schedule_of(inventory, graph, targets):
+    shopping_list = craft_items(targets, inventory, graph=graph)
+    return CraftingSchedule(graph, shopping_list.intermediate_steps)
+
+
+def test_schedule_orders_crafts_after_their_children(inventory, graph):
+    first, second = schedule_of(inventory, graph, {"Sword": 3}).to_json()["steps"]
+    assert sorted(first) == ["sawmill", "smelter"]
+    assert first["smelter"] == [
+        {"name": "Ingot", "crafts": 2, "quantity": 3, "yield": 2}
+    ]
+    assert first["sawmill"] == [
+        {"name": "Plank", "crafts": 3, "quantity": 3, "yield": 1}
+    ]
+    assert [craft["name"] for craft in second["forge"]] == ["Sword"]
+
+
+def test_schedule_groups_crafts_per_station(inventory, graph):
+    steps = schedule_of(inventory, graph, {"Sword": 1, "Shield": 1}).steps
+    assert [craft["name"] for craft in steps[1]["forge"]] == ["Shield", "Sword"]
+
+
+def test_schedule_reports_leftovers_of_whole_crafts(inventory, graph):
+    assert schedule_of(inventory, graph, {"Sword": 3}).leftovers == {"Ingot": 1}
+    assert schedule_of(inventory, graph, {"Sword": 2}).leftovers == {}
+
+
+def test_schedule_text(inventory, graph):
+    text = schedule_of(inventory, graph, {"Sword": 3}).format_for_text_display()
+    assert text.splitlines() == [
+        "Step 1:",
+        "[sawmill] Plank: crafts: 3, quantity: 3",
+        "[smelter] Ingot: crafts: 2, quantity: 3",
+        "",
+        "Step 2:",
+        "[forge] Sword: crafts: 3, quantity: 3",
+        "",
+        "Leftovers:",
+        "Ingot: quantity: 1",
+    ]
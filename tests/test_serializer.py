@@ -0,0 +1,59 @@
+"""Tests that every JSON backend writes the same documents."""
+
+import json
+
+import pytest
+
+from crafting import serializer
+
+BACKENDS = ["json"] + [
+    name
+    for name, module in (("orjson", serializer.orjson), ("ujson", serializer.ujson))
+    if module is not None
+]
+
+DATA = {
+    "name": "Kühlschrank / fridge",
+    "quantity": 3,
+    "yield": 1.5,
+    "items": [{"name": "Ore", "quantity": 2}, None, True],
+    "empty": {},
+}
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("pretty", [False, True])
+@pytest.mark.parametrize("sort_keys", [False, True])
+def test_backends_write_the_same_text(backend, pretty, sort_keys):
+    expected = serializer.dumps(DATA, pretty, sort_keys, backend="json")
+    assert serializer.dumps(DATA, pretty, sort_keys, backend=backend) == expected
+
+
+def test_compact_and_pretty_output():
+    assert serializer.dumps({"a": [1, 2]}, backend="json") == b'{"a":[1,2]}'
+    assert serializer.dumps({"a": 1}, pretty=True, backend="json") == (
+        b'{\n  "a": 1\n}'
+    )
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_iter_dumps_joins_to_compact_output(backend, monkeypatch):
+    monkeypatch.setattr(serializer, "BACKEND", backend)
+    chunks = list(serializer.iter_dumps(DATA, chunk_size=8))
+    assert len(chunks) > 1
+    assert b"".join(chunks) == serializer.dumps(DATA)
+    assert b"".join(serializer.iter_dumps([1, 2])) == b"[1,2]"
+
+
+def test_loads_round_trip():
+    assert serializer.loads(serializer.dumps(DATA)) == DATA
+    assert serializer.loads(serializer.dumps_str(DATA)) == DATA
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_dumps_graph(graph, backend):
+    document = json.loads(serializer.dumps_graph(graph, backend=backend))
+    assert document["names"] == graph.names
+    assert document["yields"] == graph.yields
+    ingot = graph.index["Ingot"]
+    assert document["children"][ingot] == [[graph.index["Ore"], 3]]
@@ -0,0 +1,35 @@
+"""Tests of the request parsing of the web server."""
+
+import os
+
+import pytest
+
+import crafting_calculator
+from crafting_calculator import load_recipe_graph, refresh_recipe_graph
+from crafting_calculator_gui_html_server import parse_amount
+
+
+def test_parse_amount():
+    assert parse_amount(2) == 2
+    assert parse_amount(" 3 ") == 3
+
+
+@pytest.mark.parametrize("value", [0, -1, "0", "-1", 2.5, "2.5", True, None, "many"])
+def test_parse_amount_rejects_invalid_amounts(value):
+    with pytest.raises(ValueError):
+        parse_amount(value)
+
+
+def test_refresh_recipe_graph_keeps_unchanged_games(game_dir, monkeypatch):
+    monkeypatch.setattr(crafting_calculator, "RECIPE_GRAPHS", {})
+    game = game_dir.name
+    graph = load_recipe_graph(game)
+    refresh_recipe_graph(game)
+    assert load_recipe_graph(game) is graph
+
+    recipe_file = game_dir / "smithing.yml"
+    changed = recipe_file.stat().st_mtime_ns + 1_000_000_000
+    os.utime(recipe_file, ns=(changed, changed))
+    refresh_recipe_graph(game)
+    assert game not in crafting_calculator.RECIPE_GRAPHS
+    assert load_recipe_graph(game) is not graph
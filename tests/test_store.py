@@ -0,0 +1,60 @@
+"""Tests that the SQLite recipe store answers like the recipe graph."""
+
+import pytest
+
+from crafting.maxcraftable import base_requirements
+from crafting.store import recipe_version, store_path
+from crafting_calculator import load_recipe_snapshot
+
+
+@pytest.fixture
+def graph_of_files(game_dir):
+    return load_recipe_snapshot(game_dir)
+
+
+def test_store_matches_recipe_version(store, game_dir):
+    assert store.version() == recipe_version(game_dir.name)
+
+
+def test_store_recipes_compile_to_the_same_graph(store, game_dir, graph_of_files):
+    graph = load_recipe_snapshot(store_path(game_dir.name))
+    assert graph.names == graph_of_files.names
+    assert graph.children == graph_of_files.children
+    assert graph.yields == graph_of_files.yields
+
+
+def test_store_edges_match_graph(store, graph_of_files):
+    for item_name in graph_of_files.names:
+        assert item_name in store
+        assert store.is_craftable(item_name) == graph_of_files.is_craftable(item_name)
+        assert sorted(store.child_items(item_name)) == sorted(
+            graph_of_files.child_items(item_name)
+        )
+        assert store.used_in(item_name) == graph_of_files.used_in(item_name)
+    assert "Unknown" not in store
+
+
+def test_store_used_in_transitively_matches_graph(store, graph_of_files):
+    for item_name in graph_of_files.names:
+        expected = graph_of_files.used_in_transitively(item_name)
+        result = store.used_in_transitively(item_name)
+        assert list(result) == list(expected)
+        assert result == pytest.approx(expected)
+
+
+def test_store_expand_matches_graph_without_yields(store, graph_of_files):
+    assert store.expand("Plank", 3) == graph_of_files.expand({"Plank": 3})
+
+
+def test_store_expand_counts_fractional_crafts(store, graph_of_files):
+    # Unlike the graph, the store does not round up to whole crafts.
+    for item_name in graph_of_files.craftable_names():
+        expanded = store.expand(item_name)
+        base = {
+            name: quantity
+            for name, quantity in expanded.items()
+            if not graph_of_files.is_craftable(name)
+        }
+        assert base == pytest.approx(base_requirements(graph_of_files, item_name))
+    assert store.expand("Sword")["Ore"] == 1.5
+    assert graph_of_files.expand({"Sword": 1})["Ore"] == 3
@@ -0,0 +1,41 @@
+"""Tests of calculating several target items together."""
+
+from crafting_calculator import craft_item, craft_items, parse_targets
+
+
+def test_parse_targets_sums_amounts():
+    assert parse_targets(["Sword", "Shield=2", "Sword=3"], 1) == {
+        "Sword": 4,
+        "Shield": 2,
+    }
+    # Only a whole number after the last "=" is an amount.
+    assert parse_targets(["A=B"], 1) == {"A=B": 1}
+
+
+def test_craft_items_shares_intermediates(inventory, graph):
+    shopping_list = craft_items({"Sword": 1, "Shield": 1}, inventory, graph=graph)
+    assert sorted(shopping_list.target_items) == ["Shield", "Sword"]
+    # One ingot craft yields the ingot of each target.
+    assert shopping_list.intermediate_steps["Ingot"]["quantity"] == 2
+    assert shopping_list.items["Ore"]["quantity"] == 3
+    assert shopping_list.items["Wood"]["quantity"] == 6
+
+
+def test_craft_items_sells_each_target_for_its_own_amount(inventory, graph):
+    shopping_list = craft_items({"Sword": 2, "Shield": 1}, inventory, graph=graph)
+    assert shopping_list.target_items["Sword"]["quantity"] == 2
+    assert shopping_list.target_items["Shield"]["quantity"] == 1
+    assert shopping_list.sell_to_vendor == 80
+
+
+def test_craft_item_is_a_single_target(inventory, graph):
+    single = craft_item("Sword", inventory, 3, graph=graph)
+    several = craft_items({"Sword": 3}, inventory, graph=graph)
+    assert single.to_json() == several.to_json()
+
+
+def test_craft_items_builds_the_graph_if_not_given(inventory, graph):
+    assert (
+        craft_items({"Sword": 1}, inventory).to_json()
+        == craft_items({"Sword": 1}, inventory, graph=graph).to_json()
+    )
@@ -0,0 +1,46 @@
+"""Tests of the where used reverse index."""
+
+from crafting.whereused import format_where_used, where_used
+
+
+def test_used_in_lists_direct_parents(graph):
+    assert graph.used_in("Ingot") == {"Shield": 1, "Sword": 1}
+    assert graph.used_in("Sword") == {}
+    assert graph.used_in("Unknown") == {}
+
+
+def test_used_in_transitively_divides_by_yield(graph):
+    # Every sword and shield needs one ingot, half an ingot craft of 3 ore.
+    assert graph.used_in_transitively("Ore") == {
+        "Ingot": 3,
+        "Shield": 1.5,
+        "Sword": 1.5,
+    }
+    assert graph.used_in_transitively("Wood") == {
+        "Plank": 2,
+        "Shield": 4,
+        "Sword": 2,
+    }
+
+
+def test_where_used_report(graph):
+    assert where_used(graph, "Plank") == {
+        "name": "Plank",
+        "used_in": {"Shield": 2, "Sword": 1},
+        "used_in_transitively": {"Shield": 2, "Sword": 1},
+    }
+
+
+def test_format_where_used(graph):
+    assert format_where_used(where_used(graph, "Ore")).splitlines() == [
+        "Ore is used directly in:",
+        "Ingot: 3 per craft",
+        "",
+        "Including intermediates:",
+        "Ingot: 3 per craft",
+        "Shield: 1.5 per craft",
+        "Sword: 1.5 per craft",
+    ]
+    assert format_where_used(where_used(graph, "Sword")) == (
+        "Sword is not used by any recipe."
+    )